@@ -87,18 +87,20 @@ def dataprep(collection: Collection, tracks: Dict[str, Track]) -> pd.DataFrame:
     other_tags = sorted(
         set(collection.get_all_tags()["other"]).difference(EXCLUDE_TAGS)
     )
-    dataset = []
-    for track in tqdm(tracks.values(), desc="Building dataset from tracks"):
-        track_id = track.get_id()
-        tags = set(track.get_tags()).difference(set(track.get_genre_tags()))
-        one_hot = [0] * len(other_tags)
-        for index, tag in enumerate(other_tags):
-            if tag not in tags:
-                continue
-            one_hot[index] = 1
-        dataset.append((track_id, *one_hot))
-    data = pd.DataFrame(dataset, columns=["id"] + other_tags, index=None)
-    data.set_index("id", inplace=True)
+    # The one-hot encoding of each tag is read from the columnar table of the
+    # collection rather than from the tags of every track.
+    table = collection.to_table()
+    rows = table.get_rows(tracks)
+    one_hot = np.zeros((len(rows), len(other_tags)), dtype=np.int64)
+    for index, tag in enumerate(
+        tqdm(other_tags, desc="Building dataset from tracks")
+    ):
+        one_hot[:, index] = table.get_tag_mask(tag)[rows]
+    data = pd.DataFrame(
+        one_hot,
+        columns=other_tags,
+        index=pd.Index(table.ids[rows], name="id"),
+    )
 
     return data
 
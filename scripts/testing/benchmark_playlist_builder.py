@@ -0,0 +1,72 @@
+"""This script measures the time to build playlists with and without reusing
+the combiner playlist results of a previous run.
+
+The collection is loaded once and the playlists are built from it repeatedly:
+first with every combiner playlist evaluated, and then reusing the results
+stored by that first build, so the reported times exclude (de)serializing the
+collection.
+"""
+
+# pylint: disable=duplicate-code
+import time
+from argparse import ArgumentParser
+from pathlib import Path
+
+import yaml
+
+from djtools.collection.config import PlaylistConfig
+from djtools.collection.platform_registry import PLATFORM_REGISTRY
+from djtools.collection.playlist_builder import _build_playlists
+from djtools.configs.config import BaseConfig
+
+
+def main(collection_path, playlist_config_path, runs):
+    """Builds playlists and reports the time of full and incremental builds.
+
+    Args:
+        collection_path: Path to a collection.
+        playlist_config_path: Path to a collection_playlists.yaml.
+        runs: Number of times to build the playlists for each mode.
+    """
+    config = BaseConfig()
+    config.collection.collection_path = Path(collection_path)
+    config.collection.collection_playlists_incremental = True
+    with open(playlist_config_path, mode="r", encoding="utf-8") as _file:
+        config.collection.playlist_config = PlaylistConfig(
+            **yaml.load(_file, Loader=yaml.FullLoader)
+        )
+    collection = PLATFORM_REGISTRY[config.collection.platform]["collection"](
+        path=config.collection.collection_path,
+        loader=config.collection.collection_loader,
+    )
+
+    for rebuild in [True, False]:
+        config.collection.collection_playlists_rebuild = rebuild
+        start = time.time()
+        for _ in range(runs):
+            _build_playlists(config, collection)
+        elapsed = (time.time() - start) / runs
+        print(
+            f"{'Full' if rebuild else 'Incremental'} build of "
+            f"{len(collection.get_tracks())} tracks: {elapsed:.3f}s"
+        )
+
+
+if __name__ == "__main__":
+    arg_parser = ArgumentParser()
+    arg_parser.add_argument(
+        "--collection", required=True, help="Path to a collection."
+    )
+    arg_parser.add_argument(
+        "--playlist-config",
+        required=True,
+        help="Path to a collection_playlists.yaml.",
+    )
+    arg_parser.add_argument(
+        "--runs",
+        type=int,
+        default=5,
+        help="Number of times to build the playlists for each mode.",
+    )
+    args = arg_parser.parse_args()
+    main(args.collection, args.playlist_config, args.runs)
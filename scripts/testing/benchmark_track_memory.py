@@ -0,0 +1,101 @@
+"""This script measures the memory used by the tracks of a collection.
+
+The deep size of every track is computed without double counting objects that
+are shared between tracks (e.g. interned strings) so that the reported number
+of bytes per track reflects the true cost of holding a collection in memory.
+"""
+
+import sys
+import time
+from argparse import ArgumentParser
+from datetime import datetime
+from pathlib import PurePath
+
+from djtools.collection.platform_registry import PLATFORM_REGISTRY
+from djtools.collection.config import CollectionLoader, RegisteredPlatforms
+
+
+def deep_size(obj, seen):
+    """Recursively computes the size of an object and the objects it holds.
+
+    Args:
+        obj: Object to compute the size of.
+        seen: Set of IDs of objects that have already been counted.
+
+    Returns:
+        Number of bytes used by the object that haven't already been counted.
+    """
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, (str, bytes, int, float, bool, datetime, type(None))):
+        return size
+    if isinstance(obj, PurePath):
+        return size + sum(
+            deep_size(getattr(obj, slot), seen)
+            for cls in type(obj).__mro__
+            for slot in getattr(cls, "__slots__", ())
+            if hasattr(obj, slot)
+        )
+    if isinstance(obj, dict):
+        return size + sum(
+            deep_size(key, seen) + deep_size(value, seen)
+            for key, value in obj.items()
+        )
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        return size + sum(deep_size(item, seen) for item in obj)
+    for cls in type(obj).__mro__:
+        for slot in getattr(cls, "__slots__", ()):
+            if slot.startswith("__") and slot not in ("__dict__",):
+                slot = f"_{cls.__name__.lstrip('_')}{slot}"
+            if slot == "__dict__":
+                continue
+            if hasattr(obj, slot):
+                size += deep_size(getattr(obj, slot), seen)
+    if hasattr(obj, "__dict__"):
+        size += deep_size(obj.__dict__, seen)
+
+    return size
+
+
+def main(collection_path, loader, lazy):
+    """Loads a collection and reports the memory used per track.
+
+    Args:
+        collection_path: Path to a collection.
+        loader: Parser used to deserialize the collection.
+        lazy: Whether tracks defer decoding attributes.
+    """
+    start = time.time()
+    collection = PLATFORM_REGISTRY[RegisteredPlatforms.REKORDBOX][
+        "collection"
+    ](collection_path, loader=loader, lazy=lazy)
+    elapsed = time.time() - start
+    tracks = collection.get_tracks()
+    seen = set()
+    total = sum(deep_size(track, seen) for track in tracks.values())
+    print(
+        f"{len(tracks)} tracks loaded in {elapsed:.2f}s using "
+        f"{total / len(tracks):.0f} bytes per track"
+    )
+
+
+if __name__ == "__main__":
+    arg_parser = ArgumentParser()
+    arg_parser.add_argument(
+        "--collection", required=True, help="Path to a collection."
+    )
+    arg_parser.add_argument(
+        "--loader",
+        type=CollectionLoader,
+        default=CollectionLoader.BEAUTIFULSOUP,
+        help="Parser used to deserialize the collection.",
+    )
+    arg_parser.add_argument(
+        "--lazy",
+        action="store_true",
+        help="Defer decoding track attributes until they're accessed.",
+    )
+    args = arg_parser.parse_args()
+    main(args.collection, args.loader, args.lazy)
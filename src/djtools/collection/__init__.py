@@ -3,6 +3,8 @@
 * `base_collection`: abstraction for Collection
 * `base_playlist`: abstraction for Playlist
 * `base_track`: abstraction for Track
+* `combiner_expressions`: compiles and evaluates the boolean algebra
+    expressions of combiner playlists
 * `config`: the configuration object for the `collection` package
 * `copy_playlists`: copies audio files for tracks within a set of
     playlists to a new location and writes a new collection with these
@@ -12,13 +14,25 @@
 * `playlist_builder`: constructs playlists using tags in a Collection and a
     defined playlist structure in
     `collection_playlists.yaml`
+* `playlist_builder_profile`: records the time spent on each step of
+    `playlist_builder`
+* `playlist_builder_state`: persists the results of combiner playlists so
+    that later runs of `playlist_builder` only evaluate those whose inputs
+    changed
 * `playlist_filters`: abstractions and implementations for playlist filters
 * `playlists`: abstractions and implementations for playlists
 * `rekordbox_collection`: implementation of Collection for Rekordbox
 * `rekordbox_playlist`: implementation of Playlist for Rekordbox
 * `rekordbox_track`: implementation of Track for Rekordbox
+* `selector_index`: sorted indexes of the tracks in a Collection for
+    answering combiner playlist selectors
 * `shuffle_playlists`: writes sequential numbers to tags of shuffled tracks
     in playlists to emulate playlist shuffling
+* `tag_index`: index of the tracks having each tag as bitsets of track
+    ordinals
+* `tag_statistics`: histograms of the tags of the tracks in each playlist
+    of a folder
+* `track_table`: columnar representation of the tracks in a Collection
 * `tracks`: abstractions and implementations for tracks
 """
 
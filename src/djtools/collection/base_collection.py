@@ -6,13 +6,14 @@ collection; namely methods for (de)serialization to/from the representation
 recognized by the DJ software for which Collection is being sub-classed.
 """
 
-import re
 from abc import ABC, abstractmethod
 from pathlib import Path
-from typing import Dict, List, Optional, Union
+from typing import Dict, List, Optional, Sequence, Union
 
 from djtools.collection.base_playlist import Playlist
 from djtools.collection.base_track import Track
+from djtools.collection.selector_index import SelectorIndex
+from djtools.collection.track_table import TrackTable
 
 
 class Collection(ABC):
@@ -25,6 +26,12 @@ class Collection(ABC):
         Args:
             path: Path to a serialized collection.
         """
+        # Columnar table and selector index of the tracks which are built on
+        # demand, each along with the number of modifications of the tracks it
+        # was built at.
+        self.__mutations = 0
+        self.__selector_index = (None, None)
+        self.__table = (None, None)
 
     def add_playlist(self, playlist: Playlist):
         """Appends a playlist to the collection.
@@ -54,6 +61,17 @@ class Collection(ABC):
 
         return {"genres": sorted(genre_tags), "other": sorted(other_tags)}
 
+    def get_mutations(self) -> int:
+        """Returns the number of modifications made to the tracks.
+
+        Modifications are counted when the tracks of the collection are set
+        and when any track is modified with a setter.
+
+        Returns:
+            Number of modifications.
+        """
+        return self.__mutations + Track.mutations
+
     def get_playlists(
         self, name: Optional[str] = None, glob: Optional[bool] = False
     ) -> Union[Playlist, List[Playlist]]:
@@ -71,18 +89,31 @@ class Collection(ABC):
         if not name:
             return self._playlists  # pylint:disable=no-member
 
-        exp = re.compile(r".*".join(name.split("*")))
-        playlists = []
-        for playlist in self._playlists:  # pylint:disable=no-member
-            if (glob and re.search(exp, playlist.get_name())) or (
-                not glob and playlist.get_name() == name
-            ):
-                playlists.append(playlist)
-            if playlist.is_folder():
-                for playlist in playlist:
-                    playlists.extend(playlist.get_playlists(name, glob=glob))
+        # The root playlist itself isn't one of the collection's playlists.
+        root = self._playlists  # pylint:disable=no-member
+
+        return [
+            playlist
+            for playlist in root.get_playlists(name, glob=glob)
+            if playlist is not root
+        ]
 
-        return [playlist for playlist in playlists if playlist is not None]
+    def get_playlists_by_path(self, path: Sequence[str]) -> List[Playlist]:
+        """Returns Playlists with a matching folder path.
+
+        Args:
+            path: Names of the folders leading to, and including, the
+                Playlists.
+
+        Returns:
+            The Playlists with the same path.
+        """
+        if not path:
+            return []
+
+        root = self._playlists  # pylint:disable=no-member
+
+        return root.get_playlists_by_path(path)
 
     def get_tracks(self) -> Dict[str, Track]:
         """Returns the tracks in the collection.
@@ -92,6 +123,14 @@ class Collection(ABC):
         """
         return self._tracks
 
+    def remove_playlist(self, playlist: Playlist):
+        """Removes a playlist from the collection.
+
+        Args:
+            playlist: Playlist to remove from the collection.
+        """
+        self._playlists.remove_playlist(playlist)  # pylint:disable=no-member
+
     @abstractmethod
     def serialize(self, *args, **kwargs) -> Path:
         """Serialize a collection into the native format of a DJ software.
@@ -107,3 +146,36 @@ class Collection(ABC):
             tracks: Tracks to set.
         """
         self._tracks = tracks  # pylint:disable=attribute-defined-outside-init
+        self.__mutations += 1
+
+    def to_selector_index(self) -> SelectorIndex:
+        """Returns an index of the tracks in the collection for selectors.
+
+        The index is built the first time it's requested and then cached until
+        the tracks of the collection are modified.
+
+        Returns:
+            SelectorIndex of the collection's tracks.
+        """
+        mutations, index = self.__selector_index
+        if index is None or mutations != self.get_mutations():
+            index = SelectorIndex(self.get_tracks())
+            self.__selector_index = (self.get_mutations(), index)
+
+        return index
+
+    def to_table(self) -> TrackTable:
+        """Returns a columnar table of the tracks in the collection.
+
+        The table is built the first time it's requested and then cached until
+        the tracks of the collection are modified.
+
+        Returns:
+            TrackTable of the collection's tracks.
+        """
+        mutations, table = self.__table
+        if table is None or mutations != self.get_mutations():
+            table = TrackTable(self.get_tracks())
+            self.__table = (self.get_mutations(), table)
+
+        return table
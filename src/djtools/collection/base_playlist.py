@@ -7,8 +7,12 @@ recognized by the DJ software for which Playlist is being sub-classed.
 """
 
 import re
+import weakref
 from abc import ABC, abstractmethod
-from typing import Any, Dict, List, Optional
+from collections import defaultdict
+from functools import lru_cache
+from operator import itemgetter
+from typing import Any, Dict, List, Optional, Pattern, Sequence, Tuple
 
 from djtools.collection.base_track import Track
 
@@ -16,6 +20,185 @@ from djtools.collection.base_track import Track
 # pylint: disable=duplicate-code
 
 
+@lru_cache(maxsize=None)
+def compile_glob(name: str) -> Pattern:
+    """Compiles a playlist name containing "*" into a regular expression.
+
+    Args:
+        name: Playlist name to glob on.
+
+    Returns:
+        Compiled regular expression.
+    """
+    return re.compile(r".*".join(name.split("*")))
+
+
+class PlaylistIndex:
+    "Index of the playlists within a folder by name and by path."
+
+    # Indexes containing each folder so that adding a playlist to, or
+    # removing one from, a folder only makes the indexes containing that
+    # folder stale rather than those of unrelated playlist trees.
+    _folder_indexes = weakref.WeakKeyDictionary()
+
+    def __init__(self, playlist: "Playlist"):
+        """Indexes a playlist and all the playlists within it.
+
+        Args:
+            playlist: Playlist to index.
+        """
+        # Matches of glob lookups keyed by the name being globbed on.
+        self._globs = {}
+        # Lists of (position, playlist) entries keyed by name and by path.
+        # Positions increase in depth-first order so that the results of
+        # lookups are ordered the same as a traversal of the playlist tree.
+        self._names = defaultdict(list)
+        self._paths = defaultdict(list)
+        self._position = 0
+        # Folders within the indexed playlist, so that unpickled indexes can
+        # be registered with them again.
+        self._folders = []
+        self._stale = False
+        self.add(playlist, path=())
+
+    def __setstate__(self, state: Dict[str, Any]):
+        """Restores an unpickled index and registers the folders within it.
+
+        Args:
+            state: Attributes of the pickled index.
+        """
+        self.__dict__.update(state)
+        for folder in self._folders:
+            self._register(folder)
+
+    def add(self, playlist: "Playlist", path: Tuple[str, ...]):
+        """Indexes a playlist, and the playlists within it, after the others.
+
+        Args:
+            playlist: Playlist to index.
+            path: Names of the folders leading to, and including, the playlist
+                relative to the indexed playlist.
+        """
+        stack = [(playlist, path)]
+        while stack:
+            playlist, path = stack.pop()
+            entry = (self._position, playlist)
+            self._position += 1
+            self._names[playlist.get_name()].append(entry)
+            self._paths[path].append(entry)
+            if playlist.is_folder():
+                self._folders.append(playlist)
+                self._register(playlist)
+                stack.extend(
+                    (child, (*path, child.get_name()))
+                    for child in reversed(list(playlist))
+                )
+        self._globs.clear()
+
+    def get_playlists(self, name: str, glob: bool = False) -> List["Playlist"]:
+        """Returns the indexed playlists with a matching name.
+
+        Args:
+            name: Name of the Playlists to return.
+            glob: Glob on playlist name containing "*".
+
+        Returns:
+            The Playlists with a matching name.
+        """
+        if not glob:
+            entries = self._names.get(name, [])
+        else:
+            if name not in self._globs:
+                exp = compile_glob(name)
+                self._globs[name] = sorted(
+                    (
+                        entry
+                        for key, entries in self._names.items()
+                        if re.search(exp, key)
+                        for entry in entries
+                    ),
+                    key=itemgetter(0),
+                )
+            entries = self._globs[name]
+
+        return [playlist for _, playlist in entries]
+
+    def get_playlists_by_path(self, path: Sequence[str]) -> List["Playlist"]:
+        """Returns the indexed playlists at a path.
+
+        Args:
+            path: Names of the folders leading to, and including, the
+                Playlists relative to the indexed playlist.
+
+        Returns:
+            The Playlists at the path.
+        """
+        return [playlist for _, playlist in self._paths.get(tuple(path), [])]
+
+    @classmethod
+    def invalidate(cls, folder: "Playlist"):
+        """Marks the indexes containing a folder as stale.
+
+        Args:
+            folder: Folder that a playlist was added to or removed from.
+        """
+        for index in list(cls._folder_indexes.get(folder, ())):
+            index._stale = True  # pylint: disable=protected-access
+
+    def is_current(self) -> bool:
+        """Returns whether no playlists were added or removed since indexing.
+
+        Returns:
+            Whether this index is current or not.
+        """
+        return not self._stale
+
+    def refresh(self):
+        "Marks this index as current after it was updated in place."
+        self._stale = False
+
+    def _register(self, folder: "Playlist"):
+        """Registers this index as containing a folder.
+
+        Args:
+            folder: Folder within the indexed playlist.
+        """
+        self._folder_indexes.setdefault(folder, weakref.WeakSet()).add(self)
+
+    def remove(self, playlist: "Playlist"):
+        """Removes a playlist, and the playlists within it, from the index.
+
+        Args:
+            playlist: Playlist, within the indexed playlist, to remove.
+        """
+        removed = set()
+        names = set()
+        paths = set()
+        stack = [(playlist, (playlist.get_name(),))]
+        while stack:
+            playlist, path = stack.pop()
+            removed.add(id(playlist))
+            names.add(playlist.get_name())
+            paths.add(path)
+            if playlist.is_folder():
+                stack.extend(
+                    (child, (*path, child.get_name())) for child in playlist
+                )
+        for index, keys in [(self._names, names), (self._paths, paths)]:
+            for key in keys:
+                index[key] = [
+                    entry
+                    for entry in index[key]
+                    if id(entry[1]) not in removed
+                ]
+                if not index[key]:
+                    del index[key]
+        self._folders = [
+            folder for folder in self._folders if id(folder) not in removed
+        ]
+        self._globs.clear()
+
+
 class Playlist(ABC):
     "Abstract base class for a playlist."
 
@@ -24,6 +207,8 @@ class Playlist(ABC):
         self._aggregate = False
         if kwargs.get("enable_aggregation"):
             self._aggregate = True
+        self._dirty = False
+        self._index = None
 
     def __getitem__(self, index: int) -> "Playlist":
         """Gets a Playlist from this Playlist's playlists.
@@ -66,11 +251,20 @@ class Playlist(ABC):
         """
         if not self.is_folder():
             raise RuntimeError("You can't append to a non-folder Playlist")
+        self._dirty = True
+        current = self._index is not None and self._index.is_current()
+        PlaylistIndex.invalidate(self)
         if index is not None:
             self._playlists.insert(index, playlist)
         else:
             self._playlists.append(playlist)
 
+            # Appended playlists are indexed after the others, so the index of
+            # this playlist is kept in sync rather than rebuilt.
+            if current:
+                self._index.add(playlist, (playlist.get_name(),))
+                self._index.refresh()
+
     def aggregate(self) -> bool:
         """whether to aggregate or not.
 
@@ -82,6 +276,20 @@ class Playlist(ABC):
 
         return self._aggregate and len(self) > 1
 
+    def get_index(self) -> PlaylistIndex:
+        """Returns an index of this playlist and the playlists within it.
+
+        The index is cached until a playlist is inserted into, or removed
+        from, a folder within this one.
+
+        Returns:
+            The PlaylistIndex of this playlist.
+        """
+        if self._index is None or not self._index.is_current():
+            self._index = PlaylistIndex(self)
+
+        return self._index
+
     @abstractmethod
     def get_name(self) -> str:
         """Returns the name of this playlist.
@@ -129,17 +337,19 @@ class Playlist(ABC):
                 )
             return list(self)
 
-        exp = re.compile(r".*".join(name.split("*")))
-        playlists = []
-        if (glob and re.search(exp, self.get_name())) or (
-            not glob and self.get_name() == name
-        ):
-            playlists.append(self)
-        if self.is_folder():
-            for playlist in self:
-                playlists.extend(playlist.get_playlists(name, glob=glob))
+        return self.get_index().get_playlists(name, glob=glob)
 
-        return [playlist for playlist in playlists if playlist is not None]
+    def get_playlists_by_path(self, path: Sequence[str]) -> List["Playlist"]:
+        """Returns Playlists with a matching path.
+
+        Args:
+            path: Names of the folders leading to, and including, the
+                Playlists relative to this playlist.
+
+        Returns:
+            The Playlists with the same path.
+        """
+        return self.get_index().get_playlists_by_path(path)
 
     def get_tracks(self) -> Dict[str, Track]:
         """Returns a dict of track IDs and tracks.
@@ -149,6 +359,17 @@ class Playlist(ABC):
         """
         return self._tracks
 
+    def is_dirty(self) -> bool:
+        """Returns whether this playlist was modified since it was deserialized.
+
+        Only the playlist itself is considered; a folder isn't dirty because
+        one of its playlists is.
+
+        Returns:
+            Boolean representing whether this playlist was modified or not.
+        """
+        return self._dirty
+
     @abstractmethod
     def is_folder(self) -> bool:
         """Returns whether this playlist is a folder or a playlist of tracks.
@@ -198,6 +419,15 @@ class Playlist(ABC):
             raise RuntimeError(
                 "Can't remove playlist from a non-folder playlist."
             )
+        self._dirty = True
+        current = self._index is not None and self._index.is_current()
+        PlaylistIndex.invalidate(self)
+        # pylint: disable=access-member-before-definition
+        if current and any(
+            _playlist is playlist for _playlist in self._playlists
+        ):
+            self._index.remove(playlist)
+            self._index.refresh()
         self._playlists = [  # pylint: disable=attribute-defined-outside-init
             _playlist
             for _playlist in self._playlists
@@ -231,4 +461,5 @@ class Playlist(ABC):
         Args:
             tracks: A dict of Tracks to override for this Playlist.
         """
+        self._dirty = True
         self._tracks = tracks  # pylint: disable=attribute-defined-outside-init
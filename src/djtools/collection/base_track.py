@@ -4,11 +4,16 @@ platforms.
 Track is an abstract base class which defines the interface expected of a
 track; namely methods for (de)serialization to/from the representation
 recognized by the DJ software for which Track is being sub-classed.
+
+Track also provides normalized views of the tags of a track which are
+computed once and cached on the track until its tags change. Every
+modification made to a track with a setter is counted so that collections can
+tell when the indexes they cache of their tracks are stale.
 """
 
 from abc import ABC, abstractmethod
 from pathlib import Path
-from typing import Any, List
+from typing import Any, FrozenSet, List, Tuple
 
 
 # pylint: disable=no-member,duplicate-code
@@ -17,9 +22,57 @@ from typing import Any, List
 class Track(ABC):
     "Abstract base class for a track."
 
+    __slots__ = ("_normalized_tags",)
+
+    # Number of modifications made to any track with a setter.
+    mutations = 0
+
     @abstractmethod
     def __init__(self, *args, **kwargs):
         "Deserializes a track from the native format of a DJ software."
+        self._normalized_tags = None
+
+    def __get_normalized_tags(
+        self,
+    ) -> Tuple[List[str], List[str], Tuple[str, ...], FrozenSet[str]]:
+        """Gets the normalized views of the tags of the track.
+
+        The views are cached along with the lists of genre tags and tags they
+        were computed from. They're computed again when either list is
+        replaced or when the tags are modified with a setter, which calls
+        _invalidate_normalized_tags.
+
+        Returns:
+            Tuple of the genre tags and tags the views were computed from, the
+                lowercased genre tags, and the set of non-genre tags.
+        """
+        genre_tags = self.get_genre_tags()
+        tags = self.get_tags()
+        normalized_tags = self._normalized_tags
+        if (
+            normalized_tags is not None
+            and normalized_tags[0] is genre_tags
+            and normalized_tags[1] is tags
+        ):
+            return normalized_tags
+
+        normalized_tags = self._normalized_tags = (
+            genre_tags,
+            tags,
+            tuple(tag.lower() for tag in genre_tags),
+            frozenset(tags).difference(genre_tags),
+        )
+
+        return normalized_tags
+
+    def _invalidate_normalized_tags(self):
+        "Discards the cached views of the tags once the tags are modified."
+        self._normalized_tags = None
+
+    @staticmethod
+    def _mutated():
+        "Counts a modification made to a track with a setter."
+        Track.mutations += 1
 
     @abstractmethod
     def get_artists(self) -> str:
@@ -29,6 +82,14 @@ class Track(ABC):
             A string representing the track's artists.
         """
 
+    @abstractmethod
+    def get_bit_rate(self) -> int:
+        """Gets the track bit rate.
+
+        Returns:
+            The bit rate of the track.
+        """
+
     @abstractmethod
     def get_bpm(self) -> float:
         """Gets the track BPM.
@@ -93,6 +154,30 @@ class Track(ABC):
             The Path for the location of the track.
         """
 
+    def get_lowercase_genre_tags(self) -> Tuple[str, ...]:
+        """Gets the lowercased genre tags of the track.
+
+        Returns:
+            A tuple of the track's lowercased genre tags.
+        """
+        return self.__get_normalized_tags()[2]
+
+    def get_other_tag_set(self) -> FrozenSet[str]:
+        """Gets the set of tags of the track which aren't genre tags.
+
+        Returns:
+            A frozenset of the track's non-genre tags.
+        """
+        return self.__get_normalized_tags()[3]
+
+    @abstractmethod
+    def get_play_count(self) -> int:
+        """Gets the number of times the track was played.
+
+        Returns:
+            The play count of the track.
+        """
+
     @abstractmethod
     def get_rating(self) -> int:
         """Gets the rating of the track.
@@ -109,6 +194,14 @@ class Track(ABC):
             A set of the track's tags.
         """
 
+    @abstractmethod
+    def get_total_time(self) -> int:
+        """Gets the duration of the track.
+
+        Returns:
+            The duration of the track in seconds.
+        """
+
     @abstractmethod
     def get_year(self) -> str:
         """Gets the year of the track.
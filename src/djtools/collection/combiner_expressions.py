@@ -0,0 +1,640 @@
+"""This module contains the CombinerExpressions class.
+
+CombinerExpressions compiles the boolean algebra expressions in the names of
+combiner playlists into syntax trees that share identical sub-expressions, so
+that each is evaluated only once, and evaluates them as bitsets of track
+ordinals using a TagIndex. BooleanNode builds and evaluates the syntax tree of
+a single expression.
+"""
+
+import re
+from concurrent.futures import ProcessPoolExecutor
+from time import perf_counter
+from typing import Callable, Dict, List, Optional, Set, Tuple, Union
+
+from djtools.collection.base_track import Track
+from djtools.collection.config import (
+    PlaylistConfig,
+    PlaylistConfigContent,
+    PlaylistName,
+)
+from djtools.collection.playlist_builder_profile import (
+    PlaylistBuilderProfile,
+)
+from djtools.collection.playlist_builder_state import PlaylistBuilderState
+from djtools.collection.tag_index import (
+    TagIndex,
+    difference,
+    intersection,
+    popcount,
+    union,
+)
+
+
+NUMERICAL_SELECTOR_REGEX = re.compile(r"(?<=\[)[^\[\]]*(?=\])")
+STRING_SELECTOR_REGEX = re.compile(r"(?<={)[^{}]+:[^{}]+(?=})")
+
+
+def is_wildcard(tag: str) -> bool:
+    """Checks if an operand is a tag containing a wildcard, denoted with "*".
+
+    Selectors may contain a "*" without being wildcards.
+
+    Args:
+        tag: Operand of a boolean algebra expression.
+
+    Returns:
+        Whether or not the operand is a wildcard.
+    """
+    return "*" in tag and not (
+        re.search(NUMERICAL_SELECTOR_REGEX, tag)
+        or re.search(STRING_SELECTOR_REGEX, tag)
+    )
+
+
+class BooleanNode:
+    """Node that contains boolean logic for a sub-expression."""
+
+    OPERATORS = {
+        "&": intersection,
+        "|": union,
+        "~": difference,
+    }
+
+    def __init__(
+        self,
+        tags_tracks: Union[Dict[str, Dict[str, Track]], TagIndex],
+        parent: Optional["BooleanNode"] = None,
+    ):
+        """Constructor.
+
+        Args:
+            tags_tracks: Dict of tags to tracks or a TagIndex of them.
+            parent: BooleanNode of which this node is a sub-expression.
+        """
+        self._ops = self.OPERATORS
+        self._parent = parent
+        self._operators = []
+        self._operands = []
+        if not isinstance(tags_tracks, TagIndex):
+            tags_tracks = TagIndex(tags_tracks)
+        self._tag_index = tags_tracks
+
+    def _evaluate_run(
+        self,
+        operator: Callable[[int, int], int],
+        operands: List[Union[str, Dict[str, Track], int]],
+    ) -> int:
+        """Applies an operator to a run of operands.
+
+        Intersections and unions are applied from the smallest operand to the
+        largest and intersections stop as soon as the result is empty. A
+        difference removes the tracks of each operand from the first one
+        until there are no tracks left.
+
+        Args:
+            operator: Set operation.
+            operands: Operands the set operation is applied to.
+
+        Returns:
+            A bitset of track ordinals.
+        """
+        if operator is difference:
+            bitset = self._get_bitset(operands[0])
+            for operand in operands[1:]:
+                if not bitset:
+                    break
+                bitset = operator(bitset, self._get_bitset(operand))
+
+            return bitset
+
+        operands = sorted(operands, key=self._get_cardinality)
+        bitset = self._get_bitset(operands[0])
+        for operand in operands[1:]:
+            if not bitset and operator is intersection:
+                break
+            bitset = operator(bitset, self._get_bitset(operand))
+
+        return bitset
+
+    def _get_bitset(self, operand: Union[str, Dict[str, Track], int]) -> int:
+        """Gets the bitset of track ordinals for an operand.
+
+        If the operand is a tag containing a wildcard, denoted with "*", then
+        the union of tracks with a tag containing the provided tag as a
+        sub-string is returned.
+
+        Args:
+            operand: Tag, dict of tracks, or bitset of track ordinals.
+
+        Returns:
+            Bitset of track ordinals.
+        """
+        if isinstance(operand, int):
+            return operand
+        if isinstance(operand, dict):
+            return self._tag_index.to_bitset(operand)
+        if is_wildcard(operand):
+            return self._tag_index.get_wildcard_bitset(operand)
+
+        return self._tag_index.get_bitset(operand)
+
+    def _get_cardinality(
+        self, operand: Union[str, Dict[str, Track], int]
+    ) -> int:
+        """Gets the number of tracks for an operand.
+
+        Args:
+            operand: Tag, dict of tracks, or bitset of track ordinals.
+
+        Returns:
+            Number of tracks.
+        """
+        if isinstance(operand, int):
+            return popcount(operand)
+        if isinstance(operand, dict):
+            return len(operand)
+        if operand in self._tag_index:
+            return self._tag_index.get_cardinality(operand)
+
+        return popcount(self._get_bitset(operand))
+
+    def _get_tracks(self, tag: str) -> Dict[str, Track]:
+        """Gets the tracks for the provided tag.
+
+        If the tag contains a wildcard, denoted with "*", then the union of
+        tracks with a tag containing the provided tag as a sub-string is
+        returned.
+
+        Args:
+            tag: Tag for indexing tracks.
+
+        Returns:
+            Dict of tracks for the provided tag.
+        """
+        return self._tag_index.to_tracks(self._get_bitset(tag))
+
+    def add_operand(self, operand: Union[str, Dict[str, Track], int]) -> str:
+        """Add operand to BooleanNode.
+
+        Args:
+            operand: Tag, dict of tracks, or bitset of track ordinals to be
+                evaluated.
+
+        Returns:
+            Empty string to reset tag in the parse_expression function.
+        """
+        if isinstance(operand, str):
+            operand = operand.strip()
+            if not operand:
+                return ""
+        self._operands.append(operand)
+
+        return ""
+
+    def add_operator(self, operator: str):
+        """Adds a set operation to the BooleanNode.
+
+        Args:
+            operator: Character representing a set operation.
+        """
+        self._operators.append(self._ops[operator])
+
+    def evaluate(self) -> Dict[str, Track]:
+        """Applies operators to the operands to produce a dict of tracks.
+
+        Returns:
+            A dict of tracks reduced from the boolean expression.
+        """
+        return self._tag_index.to_tracks(self.evaluate_bitset())
+
+    def evaluate_bitset(self) -> int:
+        """Applies operators to the operands to produce a bitset of tracks.
+
+        Operators are applied from left to right, but consecutive
+        intersections or unions are reordered to start with the operands that
+        have the fewest tracks.
+
+        Raises:
+            RuntimeError: The boolean expression is malformed. It must contain
+                one less operator than there are operands.
+
+        Returns:
+            A bitset of track ordinals reduced from the boolean expression.
+        """
+        if len(self._operators) + 1 != len(self._operands):
+            operands = [
+                (
+                    x
+                    if isinstance(x, str)
+                    else f"{popcount(self._get_bitset(x))} tracks"
+                )
+                for x in self._operands
+            ]
+            raise RuntimeError(
+                "Invalid boolean expression:\n"
+                f"\toperands: {operands}\n"
+                f"\toperators: {[x.__name__ for x in self._operators]}"
+            )
+
+        # Runs of the same operator are left-associative so, for the
+        # commutative operators, the result of the preceding runs and the
+        # operands of the run may be combined in any order.
+        bitset = None
+        start = 0
+        while start < len(self._operators):
+            operator = self._operators[start]
+            end = start + 1
+            while (
+                end < len(self._operators) and self._operators[end] is operator
+            ):
+                end += 1
+            operands = self._operands[start + 1 : end + 1]
+            if bitset is None:
+                operands.insert(0, self._operands[0])
+            else:
+                operands.insert(0, bitset)
+            bitset = self._evaluate_run(operator, operands)
+            start = end
+
+        if bitset is None:
+            bitset = self._get_bitset(self._operands[0])
+
+        return bitset
+
+    def get_parent(self) -> "BooleanNode":
+        """Gets the parent of the BooleanNode.
+
+        Returns:
+            Parent BooleanNode.
+        """
+        return self._parent
+
+    def is_operator(self, char: str) -> bool:
+        """Checks if a character is one that represents a set operation.
+
+        Args:
+            char: Character that may represent a set operation.
+
+        Returns:
+            Whether or not the character is an operator.
+        """
+        return char in self._ops
+
+
+class CombinerExpressions:
+    """Compiles and evaluates combiner playlist expressions."""
+
+    def __init__(
+        self,
+        tags_tracks: Union[Dict[str, Dict[str, Track]], TagIndex],
+        state: Optional[PlaylistBuilderState] = None,
+        profile: Optional[PlaylistBuilderProfile] = None,
+    ):
+        """Constructor.
+
+        Syntax trees are hash-consed: each distinct sub-expression is stored
+        once as a tuple of its operators and operands, where operands are
+        either tags or the IDs of other sub-expressions. Expressions that
+        differ only in whitespace around tags compile to the same tree.
+
+        Args:
+            tags_tracks: Dict of tags to tracks or a TagIndex of them.
+            state: Results of a previous run to reuse for expressions whose
+                dependencies haven't changed.
+            profile: Profile to record the time spent evaluating expressions
+                in.
+        """
+        if not isinstance(tags_tracks, TagIndex):
+            tags_tracks = TagIndex(tags_tracks)
+        self._bitsets = {}
+        self._dependencies = {}
+        self._errors = {}
+        self._expressions = {}
+        self._node_ids = {}
+        self._nodes = []
+        self._profile = profile
+        self._state = state
+        self._tag_index = tags_tracks
+
+    def _add_node(
+        self, operators: List[str], operands: List[Union[str, int]]
+    ) -> int:
+        """Gets the ID of a sub-expression, adding it if it's unseen.
+
+        Args:
+            operators: Characters representing set operations.
+            operands: Tags and IDs of sub-expressions.
+
+        Returns:
+            ID of the sub-expression.
+        """
+        node = (tuple(operators), tuple(operands))
+        node_id = self._node_ids.get(node)
+        if node_id is None:
+            node_id = self._node_ids[node] = len(self._nodes)
+            self._nodes.append(node)
+
+        return node_id
+
+    def _evaluate(self, expression: str) -> Dict[str, Track]:
+        """Evaluates a boolean algebra expression, reusing stored results.
+
+        Args:
+            expression: String representing boolean algebra expression.
+
+        Returns:
+            Dict of track IDs and tracks.
+        """
+        if self._state is None:
+            return self._tag_index.to_tracks(self.evaluate_bitset(expression))
+
+        dependencies = self._get_fingerprints(self.compile(expression))
+        track_ids = self._state.get_result(expression, dependencies)
+        if track_ids is not None:
+            return self._tag_index.get_tracks(track_ids)
+
+        tracks = self._tag_index.to_tracks(self.evaluate_bitset(expression))
+        self._state.set_result(expression, dependencies, list(tracks))
+
+        return tracks
+
+    def _evaluate_node(self, node_id: int) -> int:
+        """Evaluates a sub-expression, reusing the result of prior evaluations.
+
+        Args:
+            node_id: ID of the sub-expression.
+
+        Returns:
+            Bitset of track ordinals.
+        """
+        bitset = self._bitsets.get(node_id)
+        if bitset is not None:
+            return bitset
+
+        operators, operands = self._nodes[node_id]
+        node = BooleanNode(self._tag_index)
+        for operator in operators:
+            node.add_operator(operator)
+        for operand in operands:
+            if isinstance(operand, str):
+                node.add_operand(operand)
+                continue
+            # Like parse_expression, sub-expressions without tracks are
+            # dropped.
+            bitset = self._evaluate_node(operand)
+            if bitset:
+                node.add_operand(bitset)
+        bitset = self._bitsets[node_id] = node.evaluate_bitset()
+
+        return bitset
+
+    def _get_dependencies(self, node_id: int) -> Set[str]:
+        """Gets the tags a sub-expression depends on.
+
+        Args:
+            node_id: ID of the sub-expression.
+
+        Returns:
+            Set of tags, selectors, and wildcards.
+        """
+        dependencies = self._dependencies.get(node_id)
+        if dependencies is not None:
+            return dependencies
+
+        dependencies = set()
+        for operand in self._nodes[node_id][1]:
+            if isinstance(operand, str):
+                dependencies.add(operand)
+            else:
+                dependencies.update(self._get_dependencies(operand))
+        self._dependencies[node_id] = dependencies
+
+        return dependencies
+
+    def _get_fingerprints(self, node_id: int) -> Dict[str, str]:
+        """Gets the fingerprints of the tags a sub-expression depends on.
+
+        Args:
+            node_id: ID of the sub-expression.
+
+        Returns:
+            Dict of fingerprints keyed by tag.
+        """
+        return {
+            tag: (
+                self._tag_index.get_wildcard_fingerprint(tag)
+                if is_wildcard(tag)
+                else self._tag_index.get_fingerprint(tag)
+            )
+            for tag in sorted(self._get_dependencies(node_id))
+        }
+
+    def compile(self, expression: str) -> int:
+        """Compiles a boolean algebra expression into a syntax tree.
+
+        Args:
+            expression: String representing boolean algebra expression.
+
+        Raises:
+            RuntimeError: The expression has an unmatched closing parenthesis.
+
+        Returns:
+            ID of the root of the syntax tree.
+        """
+        node_id = self._expressions.get(expression)
+        if node_id is not None:
+            return node_id
+
+        stack = [([], [])]
+        tag = ""
+        for char in expression:
+            if char == "(":
+                stack.append(([], []))
+            elif char in BooleanNode.OPERATORS:
+                operators, operands = stack[-1]
+                if tag.strip():
+                    operands.append(tag.strip())
+                tag = ""
+                operators.append(char)
+            elif char == ")":
+                operators, operands = stack[-1]
+                if tag.strip():
+                    operands.append(tag.strip())
+                tag = ""
+                if len(stack) == 1:
+                    raise RuntimeError(
+                        f"Unbalanced parentheses in expression: {expression}"
+                    )
+                stack.pop()
+                stack[-1][1].append(self._add_node(operators, operands))
+            else:
+                tag += char
+        # Unclosed parentheses are evaluated as they are in parse_expression
+        # where the innermost sub-expression is the result.
+        operators, operands = stack[-1]
+        if tag.strip():
+            operands.append(tag.strip())
+        node_id = self._expressions[expression] = self._add_node(
+            operators, operands
+        )
+
+        return node_id
+
+    def compile_playlist_config(
+        self, content: Union[PlaylistConfig, PlaylistName, str]
+    ):
+        """Compiles every expression in a combiner playlist config.
+
+        Args:
+            content: A component of a playlist config.
+        """
+        if isinstance(content, (PlaylistName, str)):
+            expression = (
+                content.tag_content
+                if isinstance(content, PlaylistName)
+                else content
+            )
+            # Malformed expressions are reported when they're evaluated.
+            try:
+                self.compile(expression)
+            except RuntimeError:
+                pass
+        elif isinstance(content, PlaylistConfigContent):
+            for item in content.playlists:
+                self.compile_playlist_config(item)
+
+    def evaluate_bitset(self, expression: str) -> int:
+        """Evaluates a boolean algebra expression to a bitset of tracks.
+
+        Args:
+            expression: String representing boolean algebra expression.
+
+        Raises:
+            RuntimeError: The expression is malformed.
+
+        Returns:
+            Bitset of track ordinals.
+        """
+        node_id = self.compile(expression)
+        if node_id in self._errors:
+            raise RuntimeError(self._errors[node_id])
+
+        return self._evaluate_node(node_id)
+
+    def evaluate_in_processes(self, processes: int):
+        """Evaluates every compiled expression over a pool of processes.
+
+        Only the bitsets of the tags are sent to the processes, which return
+        the bitsets of the expressions. Results are cached, or errors are
+        recorded, so that `evaluate` doesn't evaluate the expressions again.
+        Expressions that already have a result, either from this run or from
+        the state of a previous run, are skipped.
+
+        Args:
+            processes: Number of processes to evaluate expressions with.
+        """
+        expressions = [
+            expression
+            for expression, node_id in self._expressions.items()
+            if node_id not in self._bitsets
+            and node_id not in self._errors
+            and not (
+                self._state
+                and self._state.has_result(
+                    expression, self._get_fingerprints(node_id)
+                )
+            )
+        ]
+        if not expressions:
+            return
+
+        # Neighbouring expressions in a playlist config tend to share
+        # sub-expressions so each process evaluates a contiguous chunk of them.
+        chunk_size = -(-len(expressions) // (processes * 4))
+        chunks = [
+            expressions[index : index + chunk_size]
+            for index in range(0, len(expressions), chunk_size)
+        ]
+        with ProcessPoolExecutor(
+            max_workers=processes,
+            initializer=_initialize_expressions_process,
+            initargs=(self._tag_index.to_bitsets(),),
+        ) as executor:
+            for chunk, results in zip(
+                chunks, executor.map(_evaluate_expressions_in_process, chunks)
+            ):
+                for expression, (bitset, error) in zip(chunk, results):
+                    node_id = self._expressions[expression]
+                    if error is None:
+                        self._bitsets[node_id] = bitset
+                    else:
+                        self._errors[node_id] = error
+
+    def evaluate(self, expression: str) -> Dict[str, Track]:
+        """Evaluates a boolean algebra expression.
+
+        If there's a state and the fingerprints of the tags the expression
+        depends on are unchanged, the stored result is reused instead.
+
+        Args:
+            expression: String representing boolean algebra expression.
+
+        Returns:
+            Dict of track IDs and tracks.
+        """
+        if not self._profile:
+            return self._evaluate(expression)
+
+        start = perf_counter()
+        tracks = self._evaluate(expression)
+        seconds = perf_counter() - start
+        operands = {
+            tag: (
+                popcount(self._tag_index.get_wildcard_bitset(tag))
+                if is_wildcard(tag)
+                else self._tag_index.get_cardinality(tag)
+            )
+            for tag in sorted(self._get_dependencies(self.compile(expression)))
+        }
+        self._profile.add_playlist(expression, seconds, len(tracks), operands)
+
+        return tracks
+
+
+# Expressions evaluated by a process of the pool used by
+# CombinerExpressions.evaluate_in_processes.
+_PROCESS_EXPRESSIONS = None
+
+
+def _initialize_expressions_process(bitsets: Dict[str, int]):
+    """Builds the expressions evaluated by a process from tag bitsets.
+
+    Args:
+        bitsets: Bitsets of track ordinals keyed by tag.
+    """
+    global _PROCESS_EXPRESSIONS  # pylint: disable=global-statement
+    _PROCESS_EXPRESSIONS = CombinerExpressions(TagIndex.from_bitsets(bitsets))
+
+
+def _evaluate_expressions_in_process(
+    expressions: List[str],
+) -> List[Tuple[Optional[int], Optional[str]]]:
+    """Evaluates expressions in a process of the pool.
+
+    Args:
+        expressions: Boolean algebra expressions.
+
+    Returns:
+        List of the bitset of each expression, or the error evaluating it.
+    """
+    results = []
+    for expression in expressions:
+        try:
+            results.append(
+                (_PROCESS_EXPRESSIONS.evaluate_bitset(expression), None)
+            )
+        except Exception as exc:  # pylint: disable=broad-exception-caught
+            results.append((None, str(exc)))
+
+    return results
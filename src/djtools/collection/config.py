@@ -17,6 +17,38 @@ from djtools.configs.config_formatter import BaseConfigFormatter
 
 logger = logging.getLogger(__name__)
 
+# Location of the playlist config and the template it may be rendered from.
+PLAYLIST_CONFIG_PATH = (
+    Path(__file__).parent.parent / "configs" / "collection_playlists.yaml"
+)
+PLAYLIST_TEMPLATE_PATH = (
+    Path(__file__).parent.parent
+    / "configs"
+    / "playlist_templates"
+    / "collection_playlists.j2"
+)
+
+
+class CollectionLoader(Enum):
+    """CollectionLoader enum."""
+
+    BEAUTIFULSOUP = "beautifulsoup"
+    ITERPARSE = "iterparse"
+
+
+def collection_loader_representer(dumper, data):
+    # pylint: disable=missing-function-docstring
+    return dumper.represent_scalar("!CollectionLoader", data.value)
+
+
+def collection_loader_constructor(loader, node):
+    # pylint: disable=missing-function-docstring
+    return CollectionLoader(loader.construct_scalar(node))
+
+
+yaml.add_representer(CollectionLoader, collection_loader_representer)
+yaml.add_constructor("!CollectionLoader", collection_loader_constructor)
+
 
 class PlaylistFilters(Enum):
     """PlaylistFilters enum."""
@@ -87,12 +119,21 @@ yaml.add_constructor("!RegisteredPlatforms", registered_platforms_constructor)
 class CollectionConfig(BaseConfigFormatter):
     """Configuration object for the collection package."""
 
+    collection_loader: CollectionLoader = CollectionLoader.BEAUTIFULSOUP
+    collection_lazy_decoding: bool = False
     collection_path: Optional[Path] = None
     collection_playlist_filters: List[PlaylistFilters] = []
     collection_playlists: bool = False
+    collection_playlists_incremental: bool = False
+    collection_playlists_processes: Optional[PositiveInt] = None
+    collection_playlists_profile: bool = False
+    collection_playlists_rebuild: bool = False
     collection_playlists_remainder: PlaylistRemainder = (
         PlaylistRemainder.FOLDER
     )
+    collection_playlists_statistics: Optional[Path] = None
+    collection_playlists_watch: bool = False
+    collection_snapshot: bool = False
     copy_playlists: List[str] = []
     copy_playlists_destination: Optional[Path] = None
     minimum_combiner_playlist_tracks: Optional[PositiveInt] = None
@@ -127,58 +168,7 @@ class CollectionConfig(BaseConfigFormatter):
             )
 
         if self.collection_playlists:
-            config_path = Path(__file__).parent.parent / "configs"
-            env = Environment(
-                loader=FileSystemLoader(config_path / "playlist_templates")
-            )
-            playlist_template = None
-            playlist_template_name = "collection_playlists.j2"
-            playlist_config_path = config_path / "collection_playlists.yaml"
-
-            try:
-                playlist_template = env.get_template(playlist_template_name)
-            except TemplateNotFound:
-                pass
-
-            if playlist_template:
-                try:
-                    playlist_config = playlist_template.render()
-                except Exception as exc:
-                    raise RuntimeError(
-                        f"Failed to render {playlist_template_name}: {exc}"
-                    ) from exc
-
-                if playlist_config_path.exists():
-                    logger.warning(
-                        f"Both {playlist_template_name} and "
-                        f"{playlist_config_path.name} exist. Overwriting "
-                        f"{playlist_config_path.name} with the rendered "
-                        "template"
-                    )
-
-                with open(
-                    playlist_config_path, mode="w", encoding="utf-8"
-                ) as _file:
-                    _file.write(playlist_config)
-
-            if not playlist_config_path.exists():
-                raise RuntimeError(
-                    "collection_playlists.yaml must exist to use the "
-                    "collection_playlists feature"
-                )
-
-            try:
-                with open(
-                    playlist_config_path, mode="r", encoding="utf-8"
-                ) as _file:
-                    self.playlist_config = PlaylistConfig(
-                        **yaml.load(_file, Loader=yaml.FullLoader) or {}
-                    )
-            except ValidationError as exc:
-                raise RuntimeError(
-                    "collection_playlists.yaml must be a valid YAML to use "
-                    "the collection_playlists feature"
-                ) from exc
+            self.playlist_config = load_playlist_config()
 
 
 class PlaylistName(BaseModel, extra="forbid"):
@@ -201,3 +191,61 @@ class PlaylistConfig(BaseModel, extra="forbid"):
 
     combiner: Optional[PlaylistConfigContent] = None
     tags: Optional[PlaylistConfigContent] = None
+
+
+def load_playlist_config() -> PlaylistConfig:
+    """Loads the playlist config, rendering it from its template if it exists.
+
+    Raises:
+        RuntimeError: Failed to render collection_playlist.yaml from
+            template.
+        RuntimeError: collection_playlists.yaml must exist.
+        RuntimeError: collection_playlists.yaml must be a valid YAML file.
+
+    Returns:
+        The playlist config.
+    """
+    env = Environment(loader=FileSystemLoader(PLAYLIST_TEMPLATE_PATH.parent))
+    playlist_template = None
+    playlist_template_name = PLAYLIST_TEMPLATE_PATH.name
+    playlist_config_path = PLAYLIST_CONFIG_PATH
+
+    try:
+        playlist_template = env.get_template(playlist_template_name)
+    except TemplateNotFound:
+        pass
+
+    if playlist_template:
+        try:
+            playlist_config = playlist_template.render()
+        except Exception as exc:
+            raise RuntimeError(
+                f"Failed to render {playlist_template_name}: {exc}"
+            ) from exc
+
+        if playlist_config_path.exists():
+            logger.warning(
+                f"Both {playlist_template_name} and "
+                f"{playlist_config_path.name} exist. Overwriting "
+                f"{playlist_config_path.name} with the rendered template"
+            )
+
+        with open(playlist_config_path, mode="w", encoding="utf-8") as _file:
+            _file.write(playlist_config)
+
+    if not playlist_config_path.exists():
+        raise RuntimeError(
+            "collection_playlists.yaml must exist to use the "
+            "collection_playlists feature"
+        )
+
+    try:
+        with open(playlist_config_path, mode="r", encoding="utf-8") as _file:
+            return PlaylistConfig(
+                **yaml.load(_file, Loader=yaml.FullLoader) or {}
+            )
+    except ValidationError as exc:
+        raise RuntimeError(
+            "collection_playlists.yaml must be a valid YAML to use the "
+            "collection_playlists feature"
+        ) from exc
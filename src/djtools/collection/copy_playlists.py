@@ -41,7 +41,10 @@ def copy_playlists(config: BaseConfig, path: Optional[Path] = None):
     """
     # Load collection.
     collection = PLATFORM_REGISTRY[config.collection.platform]["collection"](
-        path=config.collection.collection_path
+        path=config.collection.collection_path,
+        loader=config.collection.collection_loader,
+        lazy=config.collection.collection_lazy_decoding,
+        snapshot=config.collection.collection_snapshot,
     )
 
     # Create destination directory.
@@ -3,10 +3,10 @@
 import logging
 import re
 import shutil
-from collections import defaultdict
 from datetime import datetime
 from operator import itemgetter
 from pathlib import Path
+from time import perf_counter
 from typing import Dict, List, Optional, Set, Tuple, Union
 
 from dateutil.relativedelta import relativedelta
@@ -14,18 +14,28 @@ from dateutil.relativedelta import relativedelta
 from djtools.collection.base_collection import Collection
 from djtools.collection.base_playlist import Playlist
 from djtools.collection.base_track import Track
+from djtools.collection.combiner_expressions import (
+    NUMERICAL_SELECTOR_REGEX,
+    STRING_SELECTOR_REGEX,
+    BooleanNode,
+    CombinerExpressions,
+)
 from djtools.collection.config import (
     PlaylistConfig,
     PlaylistConfigContent,
     PlaylistName,
 )
+from djtools.collection.playlist_builder_profile import (
+    PlaylistBuilderProfile,
+)
 from djtools.collection.playlist_filters import PlaylistFilter
+from djtools.collection.selector_index import SelectorIndex
+from djtools.collection.tag_index import TagIndex, popcount
+from djtools.collection.tag_statistics import TagStatistics
 from djtools.utils.helpers import make_path
 
 
 logger = logging.getLogger(__name__)
-NUMERICAL_SELECTOR_REGEX = re.compile(r"(?<=\[)[^\[\]]*(?=\])")
-STRING_SELECTOR_REGEX = re.compile(r"(?<={)[^{}]+:[^{}]+(?=})")
 DATE_SELECTOR_REGEX = re.compile(r"(>=|>|<=|<)")
 TIMEDELTA_REGEX = re.compile(
     r"^("
@@ -40,6 +50,9 @@ INEQUALITY_MAP = {
     ">=": lambda x, y: x >= y,
     "<=": lambda x, y: x <= y,
 }
+INEQUALITY_SYMBOLS = {
+    inequality: symbol for symbol, inequality in INEQUALITY_MAP.items()
+}
 
 
 # #############################################################################
@@ -79,7 +92,6 @@ def copy_file(track: Track, destination: Path):
 #       component of the PlaylistConfig
 #   - parse_expression: evaluates the boolean algebra logic in combiner
 #       playlists names to populate them with the appropriate tracks
-#   - BooleanNode: used to build and evaluate the boolean algebra parse tree
 #   - print_playlists_tag_statistics: prints ASCII histograms showing tag
 #       frequencies in combiner playlists split by genre and other tag types
 #   - scale_data: scales tag frequencies to normalize histogram height
@@ -186,10 +198,13 @@ def build_tag_playlists(
             return None
 
         # Filter out tracks that aren't pure.
+        lowercase_tag = tag.lower()
         pure_tag_tracks = {
             track_id: track
             for track_id, track in tracks_with_tag.items()
-            if all(tag.lower() in _.lower() for _ in track.get_genre_tags())
+            if all(
+                lowercase_tag in _ for _ in track.get_lowercase_genre_tags()
+            )
         }
         if not pure_tag_tracks:
             logger.warning(
@@ -227,17 +242,19 @@ def build_tag_playlists(
 
 def build_combiner_playlists(
     content: Union[PlaylistConfig, PlaylistName, str],
-    tags_tracks: Dict[str, Dict[str, Track]],
+    tags_tracks: Union[Dict[str, Dict[str, Track]], TagIndex],
     playlist_class: Playlist,
     minimum_tracks: Optional[int] = None,
+    expressions: Optional["CombinerExpressions"] = None,
 ) -> Optional[Playlist]:
     """Recursively traverses a playlist config to generate playlists from tags.
 
     Args:
         content: A component of a playlist config to create a playlist for.
-        tags_tracks: Dict of tags to tracks.
+        tags_tracks: Dict of tags to tracks or a TagIndex of them.
         playlist_class: Playlist implementation class.
         minimum_tracks: Required number of tracks to make a playlist.
+        expressions: Compiled expressions of the playlist config.
 
     Raises:
         ValueError: The user's playlist config must not be malformed.
@@ -248,6 +265,12 @@ def build_combiner_playlists(
     if not isinstance(content, (PlaylistConfigContent, PlaylistName, str)):
         raise ValueError(f"Invalid input type {type(content)}: {content}")
 
+    # Every expression in the playlist config is compiled up front so that
+    # sub-expressions shared between playlists are only evaluated once.
+    if expressions is None:
+        expressions = CombinerExpressions(tags_tracks)
+        expressions.compile_playlist_config(content)
+
     # Folders can opt-in to having an aggregation playlist.
     enable_aggregation = None
 
@@ -262,7 +285,7 @@ def build_combiner_playlists(
     # This is not a folder so a playlist with tracks must be created.
     if isinstance(content, (PlaylistName, str)):
         try:
-            tracks = parse_expression(tag_content, tags_tracks)
+            tracks = expressions.evaluate(tag_content)
         except Exception as exc:
             logger.warning(f"Error parsing expression: {tag_content}\n{exc}")
             return None
@@ -282,6 +305,7 @@ def build_combiner_playlists(
             tags_tracks,
             playlist_class,
             minimum_tracks=minimum_tracks,
+            expressions=expressions,
         )
         if playlist:
             playlists.append(playlist)
@@ -302,37 +326,48 @@ def build_combiner_playlists(
 
 
 def filter_tag_playlists(
-    playlist: Playlist, playlist_filters: List[PlaylistFilter]
+    playlist: Playlist,
+    playlist_filters: List[PlaylistFilter],
+    profile: Optional[PlaylistBuilderProfile] = None,
 ) -> None:
     """Applies a list of PlaylistFilter implementations to the playlist.
 
     If the PlaylistFilter implementations' is_filter_playlist method evaluates
-    to True, then the filter_track method is applied to each track in the
-    playlist. The playlist's tracks are set to remove the tracks that have been
-    filtered out.
+    to True, then the filter_tracks method is applied to the tracks in the
+    playlist. Custom filters without a filter_tracks method have their
+    filter_track method applied to each track instead. The playlist's tracks
+    are set to remove the tracks that have been filtered out.
 
     Args:
         playlist: Playlist to potentially have its tracks filtered.
         playlist_filters: A list of PlaylistFilter implementations used to
             filter playlist tracks.
+        profile: Profile to record the time spent applying filters in.
     """
     # This is a folder so filter its playlists.
     if playlist.is_folder():
         for _playlist in playlist:
-            filter_tag_playlists(_playlist, playlist_filters)
+            filter_tag_playlists(_playlist, playlist_filters, profile)
         return
 
     # Apply each PlaylistFilter to this playlist.
     for playlist_filter in playlist_filters:
-        if not playlist_filter.is_filter_playlist(playlist):
-            continue
-        playlist.set_tracks(
-            tracks={
-                track_id: track
-                for track_id, track in playlist.get_tracks().items()
-                if playlist_filter.filter_track(track)
-            },
-        )
+        start = perf_counter()
+        if playlist_filter.is_filter_playlist(playlist):
+            filter_tracks = getattr(playlist_filter, "filter_tracks", None)
+            if filter_tracks:
+                tracks = filter_tracks(playlist.get_tracks())
+            else:
+                tracks = {
+                    track_id: track
+                    for track_id, track in playlist.get_tracks().items()
+                    if playlist_filter.filter_track(track)
+                }
+            playlist.set_tracks(tracks=tracks)
+        if profile:
+            profile.add_filter(
+                type(playlist_filter).__name__, perf_counter() - start
+            )
 
 
 def aggregate_playlists(
@@ -342,6 +377,10 @@ def aggregate_playlists(
 ) -> Dict[str, Track]:
     """Recursively aggregate tracks from folders into "All" playlists.
 
+    The tracks of each folder are aggregated as a bitset of track ordinals
+    which is the union of the bitsets of its playlists, so each folder's
+    aggregate is computed once and reused by its parent folders.
+
     Args:
         playlist: Playlist which may be a folder or not.
         playlist_class: Playlist implementation class.
@@ -350,21 +389,49 @@ def aggregate_playlists(
     Returns:
         Dict of tracks.
     """
+    # Ordinals are assigned in the order tracks are first aggregated so that
+    # "All" playlists keep the order of the playlists they aggregate.
+    tag_index = TagIndex({})
+
+    return tag_index.to_tracks(
+        _aggregate_playlists(
+            playlist, playlist_class, minimum_tracks, tag_index
+        )
+    )
+
+
+def _aggregate_playlists(
+    playlist: Playlist,
+    playlist_class: Playlist,
+    minimum_tracks: Optional[int],
+    tag_index: TagIndex,
+) -> int:
+    """Recursively aggregate tracks from folders into "All" playlists.
+
+    Args:
+        playlist: Playlist which may be a folder or not.
+        playlist_class: Playlist implementation class.
+        minimum_tracks: Required number of tracks to make a playlist.
+        tag_index: Index assigning ordinals to the aggregated tracks.
+
+    Returns:
+        Bitset of track ordinals.
+    """
     # Get tracks from the playlist if it's not a folder.
     if not playlist.is_folder():
-        return playlist.get_tracks() if playlist.aggregate() else {}
+        if not playlist.aggregate():
+            return 0
+        return tag_index.to_bitset(playlist.get_tracks())
 
     # Recursively get tracks from each playlist within this folder.
-    aggregate_tracks = {
-        track_id: track
-        for p in playlist
-        for track_id, track in aggregate_playlists(
-            p, playlist_class, minimum_tracks
-        ).items()
-    }
+    aggregate_bitset = 0
+    for _playlist in playlist:
+        aggregate_bitset |= _aggregate_playlists(
+            _playlist, playlist_class, minimum_tracks, tag_index
+        )
 
     playlist_too_small = (
-        minimum_tracks and len(aggregate_tracks) < minimum_tracks
+        minimum_tracks and popcount(aggregate_bitset) < minimum_tracks
     )
 
     # Create an "All" playlist in this folder if the folder contains more than
@@ -372,12 +439,13 @@ def aggregate_playlists(
     if playlist.aggregate() and not playlist_too_small:
         playlist.add_playlist(
             playlist_class.new_playlist(
-                name=f"All {playlist.get_name()}", tracks=aggregate_tracks
+                name=f"All {playlist.get_name()}",
+                tracks=tag_index.to_tracks(aggregate_bitset),
             ),
             index=0,
         )
 
-    return aggregate_tracks
+    return aggregate_bitset
 
 
 def add_selectors_to_tags(
@@ -385,6 +453,7 @@ def add_selectors_to_tags(
     tags_tracks: Dict[str, Dict[str, Track]],
     collection: Collection,
     auto_playlists: List[Playlist],
+    profile: Optional[PlaylistBuilderProfile] = None,
 ):
     """Recursively update the track lookup with selectors.
 
@@ -393,12 +462,13 @@ def add_selectors_to_tags(
         tags_tracks: Dict of tags to tracks.
         collection: Collection object.
         auto_playlists: Tag playlists built in this same run.
+        profile: Profile to record the time spent resolving selectors in.
     """
     # This is a folder so parse selectors from playlists within it.
     if isinstance(content, PlaylistConfigContent):
         for playlist in content.playlists:
             add_selectors_to_tags(
-                playlist, tags_tracks, collection, auto_playlists
+                playlist, tags_tracks, collection, auto_playlists, profile
             )
         return
 
@@ -436,53 +506,42 @@ def add_selectors_to_tags(
         if tag in tags_tracks:
             continue
 
-        for track_id, track in collection.get_tracks().items():
-            values = map(
-                str,
-                [round(track.get_bpm()), track.get_rating(), track.get_year()],
+        start = perf_counter()
+        numerical_range = SelectorIndex.get_numerical_range(value)
+        if numerical_range:
+            tracks = collection.to_selector_index().get_numerical_tracks(
+                *numerical_range
+            )
+            if tracks:
+                tags_tracks[tag].update(tracks)
+        if profile:
+            profile.add_selector(
+                tag, perf_counter() - start, len(tags_tracks.get(tag, {}))
             )
-            for val in values:
-                if (isinstance(value, str) and value == val) or (
-                    isinstance(value, tuple) and val in value
-                ):
-                    tags_tracks[tag][track_id] = track
 
     # Add keys for string selectors for tracks having those values.
     for selector, tag in string_value_lookup.items():
         if tag in tags_tracks:
             continue
 
+        start = perf_counter()
         selector_type, selector_value = selector
-        for track_id, track in collection.get_tracks().items():
-            value = getattr(track, string_selector_type_map[selector_type])()
-            if not value:
-                continue
-            if selector_type == "date":
-                inequality, date, date_format = selector_value
-                if not inequality:
-                    if value.strftime(date_format) == date.strftime(
-                        date_format
-                    ):
-                        tags_tracks[tag][track_id] = track
-                    continue
-                # In order for inequalities with lower precision levels than
-                # YYYY-MM-DD to work properly, the date added value for the
-                # track must be converted to the lower precision string and
-                # back into a datetime object.
-                value = datetime.strptime(
-                    value.strftime(date_format), date_format
-                )
-                if not inequality(value, date):
-                    continue
-                tags_tracks[tag][track_id] = track
-                continue
-            if "*" in selector_value:
-                exp = re.compile(r".*".join(selector_value.lower().split("*")))
-                if re.search(exp, value.lower()):
-                    tags_tracks[tag][track_id] = track
-                    continue
-            if value.lower() == selector_value.lower():
-                tags_tracks[tag][track_id] = track
+        # In order for inequalities with lower precision levels than
+        # YYYY-MM-DD to work properly, the date added values of the tracks are
+        # truncated to the precision of the date selector by the index.
+        if selector_type == "date":
+            inequality, date, date_format = selector_value
+            tracks = collection.to_selector_index().get_date_tracks(
+                INEQUALITY_SYMBOLS.get(inequality), date, date_format
+            )
+        else:
+            tracks = collection.to_selector_index().get_string_tracks(
+                string_selector_type_map[selector_type], selector_value
+            )
+        if tracks:
+            tags_tracks[tag].update(tracks)
+        if profile:
+            profile.add_selector(tag, perf_counter() - start, len(tracks))
 
     # Get playlists for the identified playlist selectors. Not only must we get
     # playlists from the collection, but we must also get playlists from the
@@ -494,11 +553,18 @@ def add_selectors_to_tags(
         if playlist_key in tags_tracks:
             continue
 
+        start = perf_counter()
         for playlist_object in [collection, *auto_playlists]:
             for playlist in playlist_object.get_playlists(playlist_name):
                 if playlist.is_folder():
                     continue
                 tags_tracks[playlist_key].update(playlist.get_tracks())
+        if profile:
+            profile.add_selector(
+                playlist_key,
+                perf_counter() - start,
+                len(tags_tracks.get(playlist_key, {})),
+            )
 
 
 def parse_numerical_selectors(
@@ -673,17 +739,20 @@ def parse_timedelta(time_str) -> Optional[datetime]:
 
 
 def parse_expression(
-    expression: str, tags_tracks: Dict[str, Dict[str, Track]]
+    expression: str,
+    tags_tracks: Union[Dict[str, Dict[str, Track]], TagIndex],
 ) -> Dict[str, Track]:
     """Parses a boolean algebra expression by constructing a tree.
 
     Args:
         expression: String representing boolean algebra expression.
-        tags_tracks: Dict of tags to tracks.
+        tags_tracks: Dict of tags to tracks or a TagIndex of them.
 
     Returns:
         Dict of track IDs and tracks.
     """
+    if not isinstance(tags_tracks, TagIndex):
+        tags_tracks = TagIndex(tags_tracks)
     node = BooleanNode(tags_tracks)
     tag = ""
     for char in expression:
@@ -694,7 +763,7 @@ def parse_expression(
             node.add_operator(char)
         elif char == ")":
             tag = node.add_operand(tag)
-            tracks = node.evaluate()
+            tracks = node.evaluate_bitset()
             node = node.get_parent()
             if tracks:
                 node.add_operand(tracks)
@@ -705,179 +774,31 @@ def parse_expression(
     return node.evaluate()
 
 
-class BooleanNode:
-    """Node that contains boolean logic for a sub-expression."""
-
-    def __init__(
-        self,
-        tags_tracks: Dict[str, Dict[str, Track]],
-        parent: Optional["BooleanNode"] = None,
-    ):
-        """Constructor.
-
-        Args:
-            tags_tracks: Dict of tags to tracks.
-            parent: BooleanNode of which this node is a sub-expression.
-        """
-        self._ops = {
-            "&": set.intersection,
-            "|": set.union,
-            "~": set.difference,
-        }
-        self._parent = parent
-        self._operators = []
-        self._operands = []
-        self._tags_tracks = tags_tracks
-
-    def _get_tracks(self, tag: str) -> Set[str]:
-        """Gets set of track IDs for the provided tag.
-
-        If the tag contains a wildcard, denoted with "*", then the union of
-        track IDs with a tag containing the provided tag as a sub-string is
-        returned.
-
-        Args:
-            tag: Tag for indexing tracks.
-
-        Returns:
-            Set of track IDs for the provided tag.
-        """
-        if "*" in tag and not (
-            re.search(NUMERICAL_SELECTOR_REGEX, tag)
-            or re.search(STRING_SELECTOR_REGEX, tag)
-        ):
-            exp = re.compile(r".*".join(tag.split("*")) + "$")
-            tracks = {}
-            for key in self._tags_tracks:
-                if re.match(exp, key):
-                    tracks.update(self._tags_tracks[key])
-            return tracks
-
-        return self._tags_tracks.get(tag, {})
-
-    def add_operand(self, operand: str) -> str:
-        """Add operand to BooleanNode.
-
-        Args:
-            operand: Tag or track set to be evaluated.
-
-        Returns:
-            Empty string to reset tag in the parse_expression function.
-        """
-        if isinstance(operand, str):
-            operand = operand.strip()
-            if not operand:
-                return ""
-        self._operands.append(operand)
-
-        return ""
-
-    def add_operator(self, operator: str):
-        """Adds a set operation to the BooleanNode.
-
-        Args:
-            operator: Character representing a set operation.
-        """
-        self._operators.append(self._ops[operator])
-
-    def evaluate(self) -> Dict[str, Track]:
-        """Applies operators to the operands to produce a dict of tracks.
-
-        Raises:
-            RuntimeError: The boolean expression is malformed. It must contain
-                one less operator than there are operands.
-
-        Returns:
-            A dict of tracks reduced from the boolean expression.
-        """
-        if len(self._operators) + 1 != len(self._operands):
-            operands = [
-                x if isinstance(x, str) else str(len(x)) + " tracks"
-                for x in self._operands
-            ]
-            raise RuntimeError(
-                "Invalid boolean expression:\n"
-                f"\toperands: {operands}\n"
-                f"\toperators: {[x.__name__ for x in self._operators]}"
-            )
-        while self._operators:
-            tracks_a = (
-                self._operands.pop(0)
-                if not isinstance(self._operands[0], str)
-                else self._get_tracks(tag=self._operands.pop(0))
-            )
-            tracks_b = (
-                self._operands.pop(0)
-                if not isinstance(self._operands[0], str)
-                else self._get_tracks(tag=self._operands.pop(0))
-            )
-            operator = self._operators.pop(0)
-            track_ids = operator(set(tracks_a), set(tracks_b))
-            tracks = {
-                track_id: track
-                for track_id, track in {**tracks_a, **tracks_b}.items()
-                if track_id in track_ids
-            }
-            self._operands.insert(0, tracks)
-
-        return next(iter(self._operands), set())
-
-    def get_parent(self) -> "BooleanNode":
-        """Gets the parent of the BooleanNode.
-
-        Returns:
-            Parent BooleanNode.
-        """
-        return self._parent
-
-    def is_operator(self, char: str) -> bool:
-        """Checks if a character is one that represents a set operation.
-
-        Args:
-            char: Character that may represent a set operation.
-
-        Returns:
-            Whether or not the character is an operator.
-        """
-        return char in self._ops
-
-
-def print_playlists_tag_statistics(combiner_playlists: Playlist) -> None:
+def print_playlists_tag_statistics(
+    combiner_playlists: Playlist,
+    statistics: Optional[TagStatistics] = None,
+) -> None:
     """Prints tag statistics for Combiner playlists.
 
     Statistics are split out by Combiner playlist and then by TagParser type.
+    Each statistic is the number of tracks in the playlist having a tag, so a
+    tag repeated on a track is only counted once.
 
     Args:
         combiner_playlists: Playlist object for Combiner playlists.
+        statistics: Tag statistics of the Combiner playlists, which are
+            computed if not provided.
     """
-    playlists = []
-    playlist_stack = [combiner_playlists]
-    while playlist_stack:
-        item = playlist_stack.pop()
-        if item.is_folder():
-            playlist_stack.extend(item.get_playlists())
-            continue
-        playlists.append(item)
-
-    for playlist in playlists:
-        tracks = playlist.get_tracks()
-        if tracks:
-            print(f"\n{playlist.get_name()} tag statistics:")
-        playlist_tags = defaultdict(int)
-        genre_tags = set()
-        other_tags = set()
-        for track in tracks.values():
-            track_all_tags = track.get_tags()
-            track_genre_tags = set(track.get_genre_tags())
-            other_tags.update(set(track_all_tags).difference(track_genre_tags))
-            genre_tags.update(track_genre_tags)
-            for tag in track_all_tags:
-                playlist_tags[tag] += 1
-        for tag_subset, tags in [
-            ("Genre", sorted(genre_tags)),
-            ("Other", sorted(other_tags)),
+    if statistics is None:
+        statistics = TagStatistics(combiner_playlists)
+
+    for playlist_statistics in statistics.statistics:
+        if playlist_statistics["tracks"]:
+            print(f"\n{playlist_statistics['name']} tag statistics:")
+        for tag_subset, data in [
+            ("Genre", playlist_statistics["genre"]),
+            ("Other", playlist_statistics["other"]),
         ]:
-            data = {tag: playlist_tags[tag] for tag in tags}
             if data:
                 print(f"\n{tag_subset}:")
                 print_data(data)
@@ -1,14 +1,23 @@
 "This module is used to automatically generate a playlist structure."
 
 import logging
+import weakref
 from collections import defaultdict
 from pathlib import Path
-from typing import Optional, Type
+from time import sleep
+from typing import Dict, Optional, Tuple, Type
 
 from djtools.collection import playlist_filters
+from djtools.collection.base_collection import Collection
+from djtools.collection.base_playlist import Playlist
+from djtools.collection.base_track import Track
+from djtools.collection.combiner_expressions import CombinerExpressions
 from djtools.collection.config import (
+    PLAYLIST_CONFIG_PATH,
+    PLAYLIST_TEMPLATE_PATH,
     PlaylistConfigContent,
     PlaylistRemainder,
+    load_playlist_config,
 )
 from djtools.collection.helpers import (
     add_selectors_to_tags,
@@ -19,6 +28,12 @@ from djtools.collection.helpers import (
     print_playlists_tag_statistics,
 )
 from djtools.collection.platform_registry import PLATFORM_REGISTRY
+from djtools.collection.playlist_builder_profile import (
+    PlaylistBuilderProfile,
+)
+from djtools.collection.playlist_builder_state import PlaylistBuilderState
+from djtools.collection.tag_index import TagIndex
+from djtools.collection.tag_statistics import TagStatistics
 from djtools.utils.helpers import make_path
 
 
@@ -26,6 +41,16 @@ logger = logging.getLogger(__name__)
 PLAYLIST_NAME = "PLAYLIST_BUILDER"
 BaseConfig = Type["BaseConfig"]
 
+# Seconds between checks for changes to the watched files and seconds the
+# watched files must stop changing for before the playlists are rebuilt.
+WATCH_POLL_SECONDS = 1
+WATCH_DEBOUNCE_SECONDS = 2
+
+# The tracks of each tag of a collection and their TagIndex, along with the
+# number of modifications of the collection's tracks they were built at, so
+# that rebuilding the playlists of an unmodified collection reuses them.
+_tag_indexes = weakref.WeakKeyDictionary()
+
 
 @make_path
 def collection_playlists(config: BaseConfig, path: Optional[Path] = None):
@@ -76,6 +101,10 @@ def collection_playlists(config: BaseConfig, path: Optional[Path] = None):
     to 145
     - AND tagged as "Dark"
 
+    With collection_playlists_watch set, this function keeps running after
+    the playlists are built and rebuilds them whenever the collection or the
+    playlist config changes.
+
     Args:
         config: Configuration object.
         path: Path to write the new collection to.
@@ -91,10 +120,30 @@ def collection_playlists(config: BaseConfig, path: Optional[Path] = None):
         return
 
     # Load the collection.
-    collection = PLATFORM_REGISTRY[config.collection.platform]["collection"](
-        path=config.collection.collection_path
-    )
+    collection = _load_collection(config)
+
+    # Build the playlists and write them into the collection.
+    auto_playlist = _build_playlists(config, collection)
+    path = collection.serialize(path=path)
+    num_playlists = collection.get_playlists().get_number_of_playlists()
+    logger.info(f"{PLAYLIST_NAME} generated with {num_playlists} playlists")
+
+    # Rebuild the playlists whenever the collection or the playlist config
+    # changes.
+    if config.collection.collection_playlists_watch:
+        _watch_collection_playlists(config, collection, path, auto_playlist)
 
+
+def _build_playlists(config: BaseConfig, collection: Collection) -> Playlist:
+    """Builds playlists and inserts them into a collection.
+
+    Args:
+        config: Configuration object.
+        collection: Collection to build playlists from.
+
+    Returns:
+        The playlist containing the built playlists.
+    """
     # Get the Playlist implementation to use for this collection.
     playlist_class = PLATFORM_REGISTRY[config.collection.platform]["playlist"]
 
@@ -104,15 +153,18 @@ def collection_playlists(config: BaseConfig, path: Optional[Path] = None):
         config.collection.minimum_combiner_playlist_tracks
     )
 
-    # Create a dict of tracks keyed by their individual tags.
-    tags_tracks = defaultdict(dict)
-    for track_id, track in collection.get_tracks().items():
-        for tag in track.get_tags():
-            tags_tracks[tag][track_id] = track
+    # Get a dict of tracks keyed by their individual tags.
+    tags_tracks, tag_index = _get_tag_index(collection)
 
     # This will hold the playlists being built.
     auto_playlists = []
 
+    # Timings of selectors, combiner playlists, and filters are recorded in
+    # profile mode.
+    profile = None
+    if config.collection.collection_playlists_profile:
+        profile = PlaylistBuilderProfile()
+
     # List of PlaylistFilter implementations to run against built playlists.
     filters = [
         getattr(playlist_filters, playlist_filter.value)()
@@ -138,7 +190,7 @@ def collection_playlists(config: BaseConfig, path: Optional[Path] = None):
         tag_playlists.set_parent()
 
         # Apply the filtering logic of the configured PlaylistFilter implementations.
-        filter_tag_playlists(tag_playlists, filters)
+        filter_tag_playlists(tag_playlists, filters, profile)
 
         # Recursively traverse the playlist tree and create "all" playlists
         # within each folder containing more than one playlist. These "all"
@@ -194,23 +246,54 @@ def collection_playlists(config: BaseConfig, path: Optional[Path] = None):
             tags_tracks,
             collection,
             auto_playlists,
+            profile,
         )
 
+        # The tracks of each tag and selector are indexed as bitsets of track
+        # ordinals so that the boolean logic of the combiner playlists is
+        # evaluated with bitwise operations.
+
+        # Results of combiner playlists from a previous run are reused if the
+        # tags, selectors, and playlists they depend on haven't changed.
+        state = None
+        if config.collection.collection_playlists_incremental:
+            state = PlaylistBuilderState(
+                config.collection.collection_path,
+                rebuild=config.collection.collection_playlists_rebuild,
+            )
+        expressions = CombinerExpressions(
+            tag_index, state=state, profile=profile
+        )
+        expressions.compile_playlist_config(
+            config.collection.playlist_config.combiner
+        )
+        if config.collection.collection_playlists_processes:
+            expressions.evaluate_in_processes(
+                config.collection.collection_playlists_processes
+            )
+
         # Evaluate the boolean logic of the combiner playlists.
         combiner_playlists = build_combiner_playlists(
             config.collection.playlist_config.combiner,
-            tags_tracks,
+            tag_index,
             playlist_class,
             minimum_tracks=minimum_combiner_tracks,
+            expressions=expressions,
         )
 
+        if state:
+            state.save()
+            logger.info(
+                f"Reused the results of {state.reused} combiner playlists"
+            )
+
         # The tag playlists must have their "parent" attribute set so that
         # PlaylistFilter implementations may apply logic that depends on the
         # relative position of the playlist with the playlist tree.
         combiner_playlists.set_parent()
 
         # Apply the filtering logic of the configured PlaylistFilter implementations.
-        filter_tag_playlists(combiner_playlists, filters)
+        filter_tag_playlists(combiner_playlists, filters, profile)
 
         # Recursively traverse the playlist tree and create "all" playlists
         # within each folder containing more than one playlist. These "all"
@@ -222,15 +305,19 @@ def collection_playlists(config: BaseConfig, path: Optional[Path] = None):
 
         auto_playlists.extend(combiner_playlists)
 
-        # Print tag statistics for each combiner playlist.
-        if config.verbosity and combiner_playlists:
-            print_playlists_tag_statistics(combiner_playlists)
+        # Print and / or export tag statistics for each combiner playlist.
+        statistics_path = config.collection.collection_playlists_statistics
+        if (config.verbosity or statistics_path) and combiner_playlists:
+            statistics = TagStatistics(combiner_playlists)
+            if config.verbosity:
+                print_playlists_tag_statistics(combiner_playlists, statistics)
+            if statistics_path:
+                statistics.save(statistics_path)
 
     # Remove any previous playlist builder playlists.
     previous_playlists = collection.get_playlists(name=PLAYLIST_NAME)
-    root = collection.get_playlists()
     for playlist in previous_playlists:
-        root.remove_playlist(playlist)
+        collection.remove_playlist(playlist)
 
     # Insert a new playlist containing the built playlists.
     auto_playlist = playlist_class.new_playlist(
@@ -238,7 +325,208 @@ def collection_playlists(config: BaseConfig, path: Optional[Path] = None):
     )
     auto_playlist.set_parent(collection.get_playlists())
     collection.add_playlist(auto_playlist)
-    collection.serialize(path=path)
 
-    num_playlists = collection.get_playlists().get_number_of_playlists()
-    logger.info(f"{PLAYLIST_NAME} generated with {num_playlists} playlists")
+    if profile:
+        profile.print_report()
+        profile.save(
+            config.collection.collection_path.with_name(
+                f"{config.collection.collection_path.name}"
+                ".playlist_builder_profile.json"
+            )
+        )
+
+    return auto_playlist
+
+
+def _get_file_stat(path: Path) -> Optional[Tuple[int, int]]:
+    """Gets the size and modification time of a file.
+
+    Args:
+        path: Path to the file.
+
+    Returns:
+        Tuple of the size and modification time, in nanoseconds, of the file
+            or None if it doesn't exist.
+    """
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+
+    return stat.st_size, stat.st_mtime_ns
+
+
+def _get_playlist_signature(playlist: Playlist) -> Tuple:
+    """Gets the names and track IDs of a playlist and those within it.
+
+    Args:
+        playlist: Playlist, or folder of playlists.
+
+    Returns:
+        Tuple of the playlist's name and either the signatures of the
+            playlists within it or the IDs of its tracks.
+    """
+    if playlist.is_folder():
+        return (
+            playlist.get_name(),
+            tuple(_get_playlist_signature(_playlist) for _playlist in playlist),
+        )
+
+    return playlist.get_name(), tuple(playlist.get_tracks())
+
+
+def _get_tag_index(
+    collection: Collection,
+) -> Tuple[Dict[str, Dict[str, Track]], TagIndex]:
+    """Gets the tracks of each tag of a collection and their index.
+
+    Both are built once and then reused until the tracks of the collection
+    are modified. A new dict of tags is returned each time, so that selectors
+    added to it aren't reused, while the dicts of tracks of each tag are
+    shared, so that their bitsets are.
+
+    Args:
+        collection: Collection to index the tags of.
+
+    Returns:
+        Tuple of a dict of tracks keyed by tag and the index of that dict.
+    """
+    mutations = collection.get_mutations()
+    cached = _tag_indexes.get(collection)
+    if cached is None or cached[0] != mutations:
+        tags_tracks = defaultdict(dict)
+        for track_id, track in collection.get_tracks().items():
+            for tag in track.get_tags():
+                tags_tracks[tag][track_id] = track
+        cached = _tag_indexes[collection] = (
+            mutations,
+            dict(tags_tracks),
+            TagIndex(tags_tracks, collection.get_tracks()),
+        )
+
+    _, collection_tags_tracks, tag_index = cached
+    tags_tracks = defaultdict(dict, collection_tags_tracks)
+    tag_index.set_tags_tracks(tags_tracks)
+
+    return tags_tracks, tag_index
+
+
+def _load_collection(config: BaseConfig) -> Collection:
+    """Loads the collection at collection_path.
+
+    Args:
+        config: Configuration object.
+
+    Returns:
+        The collection.
+    """
+    return PLATFORM_REGISTRY[config.collection.platform]["collection"](
+        path=config.collection.collection_path,
+        loader=config.collection.collection_loader,
+        lazy=config.collection.collection_lazy_decoding,
+        snapshot=config.collection.collection_snapshot,
+    )
+
+
+def _watch_collection_playlists(
+    config: BaseConfig,
+    collection: Collection,
+    path: Path,
+    auto_playlist: Playlist,
+):
+    """Rebuilds playlists whenever the collection or playlist config changes.
+
+    The watched files are polled and, once a change is seen, they must stop
+    changing for WATCH_DEBOUNCE_SECONDS before the playlists are rebuilt. The
+    collection, and the index of its tags, is only loaded again if it's the
+    collection that changed, and the output collection is only written again
+    if the playlists it contains changed (or the file itself did). Watching
+    stops on a keyboard interrupt.
+
+    Args:
+        config: Configuration object.
+        collection: Collection the playlists were built from.
+        path: Path the collection with the playlists was written to.
+        auto_playlist: The playlist containing the built playlists.
+    """
+    collection_path = config.collection.collection_path
+    watched_paths = [collection_path, PLAYLIST_CONFIG_PATH]
+    if PLAYLIST_TEMPLATE_PATH.exists():
+        watched_paths.append(PLAYLIST_TEMPLATE_PATH)
+    stats = {_path: _get_file_stat(_path) for _path in watched_paths}
+    signature = _get_playlist_signature(auto_playlist)
+    output_stat = _get_file_stat(path)
+    if path in stats:
+        stats[path] = output_stat
+
+    logger.info(f"Watching {', '.join(map(str, watched_paths))} for changes")
+    try:
+        while True:
+            sleep(WATCH_POLL_SECONDS)
+            if all(
+                _get_file_stat(_path) == stat for _path, stat in stats.items()
+            ):
+                continue
+
+            # Wait for the files to stop changing since they may be written
+            # several times in quick succession.
+            new_stats = {_path: _get_file_stat(_path) for _path in stats}
+            while True:
+                sleep(WATCH_DEBOUNCE_SECONDS)
+                latest_stats = {
+                    _path: _get_file_stat(_path) for _path in stats
+                }
+                if latest_stats == new_stats:
+                    break
+                new_stats = latest_stats
+            changed_paths = {
+                _path
+                for _path, stat in new_stats.items()
+                if stat != stats[_path]
+            }
+            stats = new_stats
+
+            try:
+                if collection_path in changed_paths:
+                    logger.info(f"{collection_path} changed, reloading it")
+                    collection = _load_collection(config)
+                if changed_paths.difference([collection_path]):
+                    logger.info("The playlist config changed, reloading it")
+                    config.collection.playlist_config = load_playlist_config()
+                    # Rendering the playlist template rewrites the playlist
+                    # config which mustn't trigger another rebuild.
+                    stats[PLAYLIST_CONFIG_PATH] = _get_file_stat(
+                        PLAYLIST_CONFIG_PATH
+                    )
+                if not (
+                    config.collection.playlist_config.tags
+                    or config.collection.playlist_config.combiner
+                ):
+                    logger.warning(
+                        "Not building playlists because the playlist config "
+                        "is empty."
+                    )
+                    continue
+                auto_playlist = _build_playlists(config, collection)
+            except Exception as exc:  # pylint: disable=broad-exception-caught
+                logger.error(f"Failed to rebuild playlists: {exc}")
+                continue
+
+            new_signature = _get_playlist_signature(auto_playlist)
+            if (
+                new_signature == signature
+                and _get_file_stat(path) == output_stat
+            ):
+                logger.info(
+                    f"{PLAYLIST_NAME} is unchanged so {path} isn't written"
+                )
+                continue
+
+            collection.serialize(path=path)
+            signature = new_signature
+            output_stat = _get_file_stat(path)
+            if path in stats:
+                stats[path] = output_stat
+            logger.info(f"{PLAYLIST_NAME} rebuilt and written to {path}")
+    except KeyboardInterrupt:
+        logger.info("Stopped watching for changes")
@@ -0,0 +1,127 @@
+"""This module contains the PlaylistBuilderProfile class.
+
+PlaylistBuilderProfile records how long the playlist builder spends
+evaluating each combiner playlist, resolving each selector, and applying each
+PlaylistFilter so that slow parts of a playlist config can be identified. The
+timings are printed as a report sorted from slowest to fastest and written as
+JSON.
+"""
+
+import json
+import logging
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict
+
+
+logger = logging.getLogger(__name__)
+
+
+class PlaylistBuilderProfile:
+    "Timings of the steps of the playlist builder."
+
+    def __init__(self):
+        """Constructor."""
+        self.filters = defaultdict(float)
+        self.playlists = {}
+        self.selectors = {}
+
+    def add_filter(self, name: str, seconds: float):
+        """Records the time spent applying a PlaylistFilter to a playlist.
+
+        Args:
+            name: Name of the PlaylistFilter.
+            seconds: Time spent applying the filter.
+        """
+        self.filters[name] += seconds
+
+    def add_playlist(
+        self,
+        expression: str,
+        seconds: float,
+        tracks: int,
+        operands: Dict[str, int],
+    ):
+        """Records the time spent evaluating a combiner playlist.
+
+        Args:
+            expression: Combiner playlist expression.
+            seconds: Time spent evaluating the expression.
+            tracks: Number of tracks in the result.
+            operands: Number of tracks of each operand keyed by operand.
+        """
+        self.playlists[expression] = {
+            "seconds": seconds,
+            "tracks": tracks,
+            "operands": operands,
+        }
+
+    def add_selector(self, selector: str, seconds: float, tracks: int):
+        """Records the time spent resolving a selector.
+
+        Args:
+            selector: Selector, as it appears in an expression.
+            seconds: Time spent resolving the selector.
+            tracks: Number of tracks selected.
+        """
+        self.selectors[selector] = {"seconds": seconds, "tracks": tracks}
+
+    def print_report(self):
+        """Prints the timings of each step sorted from slowest to fastest."""
+        sections = [
+            ("Combiner playlists", self.playlists),
+            ("Selectors", self.selectors),
+            (
+                "Filters",
+                {
+                    name: {"seconds": seconds}
+                    for name, seconds in self.filters.items()
+                },
+            ),
+        ]
+        for title, timings in sections:
+            if not timings:
+                continue
+            total = sum(timing["seconds"] for timing in timings.values())
+            print(f"\n{title} profile ({total:.4f}s total):")
+            for name, timing in sorted(
+                timings.items(), key=lambda x: x[1]["seconds"], reverse=True
+            ):
+                line = f"{timing['seconds']:10.4f}s  {name}"
+                if "tracks" in timing:
+                    line += f" ({timing['tracks']} tracks)"
+                print(line)
+                operands = timing.get("operands", {})
+                if operands:
+                    print(
+                        " " * 13
+                        + ", ".join(
+                            f"{operand}: {cardinality}"
+                            for operand, cardinality in operands.items()
+                        )
+                    )
+
+    def save(self, path: Path):
+        """Writes the timings as JSON.
+
+        Args:
+            path: Path to write the JSON to.
+        """
+        try:
+            with open(path, mode="w", encoding="utf-8") as _file:
+                json.dump(
+                    {
+                        "playlists": self.playlists,
+                        "selectors": self.selectors,
+                        "filters": self.filters,
+                    },
+                    _file,
+                    indent=2,
+                )
+        except OSError as exc:
+            logger.warning(
+                f"Failed to write the playlist builder profile {path}: {exc}"
+            )
+            return
+
+        logger.info(f"Wrote the playlist builder profile to {path}")
@@ -0,0 +1,149 @@
+"""This module contains the PlaylistBuilderState class.
+
+PlaylistBuilderState persists, next to a collection, the result of every
+combiner playlist expression evaluated by the playlist builder along with the
+fingerprints of the tags, selectors, and playlists it depends on. A later run
+reuses the result of an expression whose dependencies have the same
+fingerprints rather than evaluating it again.
+
+Only the results of combiner playlists are persisted. The tag index and
+selector index are still rebuilt every run: the tag playlists need the tracks
+of every tag anyway, and the fingerprints of dependencies are computed from
+those tracks.
+"""
+
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Dict, List, Optional
+
+
+logger = logging.getLogger(__name__)
+
+# Version of the state format. This must be incremented whenever the format
+# changes or the semantics of combiner expressions change so that stale
+# results are discarded.
+STATE_VERSION = 1
+
+
+class PlaylistBuilderState:
+    "Persisted results of the combiner expressions of the playlist builder."
+
+    def __init__(self, collection_path: Path, rebuild: bool = False):
+        """Loads the state stored next to a collection.
+
+        Args:
+            collection_path: Path to the collection.
+            rebuild: Whether to ignore the stored results so that every
+                expression is evaluated again.
+        """
+        self._path = collection_path.with_name(
+            f"{collection_path.name}.playlist_builder.json"
+        )
+        self._previous = {} if rebuild else self._load()
+        self._results = {}
+        self.reused = 0
+
+    def _load(self) -> Dict[str, Dict]:
+        """Loads the results stored by a previous run.
+
+        Returns:
+            Dict of results keyed by expression.
+        """
+        if not self._path.exists():
+            return {}
+
+        try:
+            with open(self._path, mode="r", encoding="utf-8") as _file:
+                state = json.load(_file)
+        except (OSError, ValueError) as exc:
+            logger.warning(
+                f"Failed to load the playlist builder state {self._path}: "
+                f"{exc}"
+            )
+            return {}
+
+        if state.get("version") != STATE_VERSION:
+            return {}
+
+        return state.get("results", {})
+
+    def get_result(
+        self, expression: str, dependencies: Dict[str, str]
+    ) -> Optional[List[str]]:
+        """Gets the stored result of an expression if it's still valid.
+
+        Args:
+            expression: Combiner playlist expression.
+            dependencies: Fingerprints of the dependencies of the expression
+                keyed by tag.
+
+        Returns:
+            Track IDs of the result or None if the expression must be
+                evaluated.
+        """
+        if not self.has_result(expression, dependencies):
+            return None
+
+        result = self._results[expression] = self._previous[expression]
+        self.reused += 1
+
+        return result["tracks"]
+
+    def has_result(
+        self, expression: str, dependencies: Dict[str, str]
+    ) -> bool:
+        """Checks if an expression has a stored result that's still valid.
+
+        Args:
+            expression: Combiner playlist expression.
+            dependencies: Fingerprints of the dependencies of the expression
+                keyed by tag.
+
+        Returns:
+            Whether or not the stored result can be reused.
+        """
+        result = self._previous.get(expression)
+
+        return bool(result) and result["dependencies"] == dependencies
+
+    def set_result(
+        self,
+        expression: str,
+        dependencies: Dict[str, str],
+        track_ids: List[str],
+    ):
+        """Stores the result of an expression.
+
+        Args:
+            expression: Combiner playlist expression.
+            dependencies: Fingerprints of the dependencies of the expression
+                keyed by tag.
+            track_ids: Track IDs of the result.
+        """
+        self._results[expression] = {
+            "dependencies": dependencies,
+            "tracks": track_ids,
+        }
+
+    def save(self):
+        """Writes the results of this run next to the collection.
+
+        Only the results of the expressions evaluated or reused in this run
+        are kept. The state is written to a temporary file first so that a
+        partially written state is never loaded.
+        """
+        temp_path = self._path.with_name(f"{self._path.name}.tmp")
+        try:
+            with open(temp_path, mode="w", encoding="utf-8") as _file:
+                json.dump(
+                    {"version": STATE_VERSION, "results": self._results},
+                    _file,
+                )
+            os.replace(temp_path, self._path)
+        except OSError as exc:
+            logger.warning(
+                f"Failed to write the playlist builder state {self._path}: "
+                f"{exc}"
+            )
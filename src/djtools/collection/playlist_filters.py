@@ -9,19 +9,84 @@ The 'is_filter_playlist' method, when given a 'Playlist', returns true if that
 
 The 'filter_track' method, when given a 'Track', returns true if that 'Track'
 should remain in the playlist.
+
+The 'filter_tracks' method applies 'filter_track' to every track of a playlist
+at once. Subclasses that set '_MEMOIZE' have the decision for each track
+remembered, for each state set by 'is_filter_playlist' as described by
+'_get_decision_key', so that a track appearing in many filtered playlists is
+only decided once per run.
 """
 
 import re
 from abc import ABC, abstractmethod
-from typing import List, Optional
+from typing import Dict, Hashable, List, Optional
 
 from djtools.collection.base_playlist import Playlist
 from djtools.collection.base_track import Track
 
 
+HOUSE_EXP = re.compile(r".*house.*")
+TECHNO_EXP = re.compile(r".*techno.*")
+COMPLEX_EXP = re.compile(r".*complex.*")
+TRANSITION_EXP = re.compile(r".*transition.*")
+TRANSITION_TOKENS_EXP = re.compile(r"\[([^]]+)\]")
+TRANSITION_PLAYLIST_TYPE_EXPS = {
+    "genre": re.compile(r".*genre.*"),
+    "tempo": re.compile(r".*tempo.*"),
+}
+
+
 class PlaylistFilter(ABC):
     "This class defines an interface for filtering tracks from playlists."
 
+    # Whether the decisions of filter_track are remembered. Filters whose
+    # decisions depend on anything besides the track and the key returned by
+    # _get_decision_key mustn't set this.
+    _MEMOIZE = False
+
+    def __init__(self):
+        """Constructor."""
+        self._decisions = {}
+
+    def _get_decision_key(self) -> Hashable:
+        """Gets the state that the decision of filter_track depends on.
+
+        Decisions are remembered for each distinct key returned after
+        is_filter_playlist is called. By default, decisions depend on the
+        track alone.
+
+        Returns:
+            Hashable key of the state set by is_filter_playlist.
+        """
+        return ()
+
+    def filter_tracks(self, tracks: Dict[str, Track]) -> Dict[str, Track]:
+        """Returns the tracks that should remain in the playlist.
+
+        Args:
+            tracks: Dict of tracks, keyed by track ID, to apply filter to.
+
+        Returns:
+            Dict of the tracks to include in the playlist keyed by track ID.
+        """
+        if not self._MEMOIZE:
+            return {
+                track_id: track
+                for track_id, track in tracks.items()
+                if self.filter_track(track)
+            }
+
+        decisions = self._decisions.setdefault(self._get_decision_key(), {})
+        filtered_tracks = {}
+        for track_id, track in tracks.items():
+            keep = decisions.get(track_id)
+            if keep is None:
+                keep = decisions[track_id] = bool(self.filter_track(track))
+            if keep:
+                filtered_tracks[track_id] = track
+
+        return filtered_tracks
+
     @abstractmethod
     def filter_track(self, track: Track) -> bool:
         """Returns True if this track should remain in the playlist.
@@ -48,6 +113,8 @@ class PlaylistFilter(ABC):
 class HipHopFilter(PlaylistFilter):
     'This class filters playlists called "Hip Hop".'
 
+    _MEMOIZE = True
+
     def filter_track(self, track: Track) -> bool:
         """Returns True if this track should remain in the playlist.
 
@@ -63,19 +130,26 @@ class HipHopFilter(PlaylistFilter):
         Returns:
             Whether or not this track should be included in the playlist.
         """
+        genre_tags = track.get_lowercase_genre_tags()
         pure_hip_hop_with_other_tags = not self._bass_hip_hop and any(
-            "r&b" not in x.lower() and "hip hop" not in x.lower()
-            for x in track.get_genre_tags()
+            "r&b" not in x and "hip hop" not in x for x in genre_tags
         )
         bass_hip_hop_without_other_tags = self._bass_hip_hop and all(
-            "r&b" in x.lower() or "hip hop" in x.lower()
-            for x in track.get_genre_tags()
+            "r&b" in x or "hip hop" in x for x in genre_tags
         )
         if pure_hip_hop_with_other_tags or bass_hip_hop_without_other_tags:
             return False
 
         return True
 
+    def _get_decision_key(self) -> Hashable:
+        """Gets the state that the decision of filter_track depends on.
+
+        Returns:
+            Whether or not the playlist is underneath a "Bass" folder.
+        """
+        return ("bass_hip_hop", self._bass_hip_hop)
+
     def is_filter_playlist(self, playlist: Playlist) -> bool:
         """Returns True if this playlist's name is "Hip Hop".
 
@@ -107,6 +181,8 @@ class HipHopFilter(PlaylistFilter):
 class MinimalDeepTechFilter(PlaylistFilter):
     'This class filters playlists called "Minimal Deep Tech".'
 
+    _MEMOIZE = True
+
     def filter_track(self, track: Track) -> bool:
         """Returns True if this track should remain in the playlist.
 
@@ -122,13 +198,11 @@ class MinimalDeepTechFilter(PlaylistFilter):
         Returns:
             Whether or not this track should be included in the playlist.
         """
-        house_exp = re.compile(r".*house.*")
-        techno_exp = re.compile(r".*techno.*")
         house_tag = techno_tag = False
-        for tag in track.get_genre_tags():
-            if re.search(house_exp, tag.lower()):
+        for tag in track.get_lowercase_genre_tags():
+            if HOUSE_EXP.search(tag):
                 house_tag = True
-            if re.search(techno_exp, tag.lower()):
+            if TECHNO_EXP.search(tag):
                 techno_tag = True
         if (self._techno and not techno_tag) or (
             self._house and not house_tag
@@ -137,6 +211,15 @@ class MinimalDeepTechFilter(PlaylistFilter):
 
         return True
 
+    def _get_decision_key(self) -> Hashable:
+        """Gets the state that the decision of filter_track depends on.
+
+        Returns:
+            Whether or not the playlist is underneath a "Techno" and a "House"
+                folder.
+        """
+        return ("techno_house", self._techno, self._house)
+
     def is_filter_playlist(self, playlist: Playlist) -> bool:
         """Returns True if this playlist's name is "Minimal Deep Tech".
 
@@ -176,6 +259,8 @@ class ComplexTrackFilter(PlaylistFilter):
     the playlist.
     """
 
+    _MEMOIZE = True
+
     def __init__(
         self,
         min_tags_for_complex_track: Optional[int] = 3,
@@ -213,11 +298,7 @@ class ComplexTrackFilter(PlaylistFilter):
         Returns:
             Whether or not this track should be included in the playlist.
         """
-        other_tags = (
-            set(track.get_tags())
-            .difference(set(track.get_genre_tags()))
-            .difference(self._exclude_tags)
-        )
+        other_tags = track.get_other_tag_set().difference(self._exclude_tags)
 
         return (
             other_tags and len(other_tags) >= self._min_tags_for_complex_track
@@ -232,13 +313,12 @@ class ComplexTrackFilter(PlaylistFilter):
         Returns:
             Whether or not to filter this playlist.
         """
-        playlist_exp = re.compile(r".*complex.*")
-        if re.search(playlist_exp, playlist.get_name().lower()):
+        if COMPLEX_EXP.search(playlist.get_name().lower()):
             return True
 
         parent = playlist.get_parent()
         while parent:
-            if re.search(playlist_exp, parent.get_name().lower()):
+            if COMPLEX_EXP.search(parent.get_name().lower()):
                 return True
             parent = parent.get_parent()
 
@@ -254,6 +334,8 @@ class TransitionTrackFilter(PlaylistFilter):
     delimited list of floats, for BPMs, or otherwise, for genres).
     """
 
+    _MEMOIZE = True
+
     def __init__(self, separator: Optional[str] = "/"):
         """Constructor.
 
@@ -277,9 +359,8 @@ class TransitionTrackFilter(PlaylistFilter):
             Whether or not this track should be included in the playlist.
         """
         comments = track.get_comments()
-        transition_exp = re.compile(r"\[([^]]+)\]")
         transition_tokens_match_playlist_type = False
-        for match in re.findall(transition_exp, comments):
+        for match in TRANSITION_TOKENS_EXP.findall(comments):
             try:
                 _ = [
                     float(token.strip())
@@ -293,6 +374,14 @@ class TransitionTrackFilter(PlaylistFilter):
 
         return transition_tokens_match_playlist_type
 
+    def _get_decision_key(self) -> Hashable:
+        """Gets the state that the decision of filter_track depends on.
+
+        Returns:
+            Type of the transition playlist.
+        """
+        return ("transition", self._playlist_type)
+
     def is_filter_playlist(self, playlist: Playlist) -> bool:
         """Returns True if this playlist should be filtered.
 
@@ -308,14 +397,13 @@ class TransitionTrackFilter(PlaylistFilter):
         is_transition_playlist = False
 
         # Check if the given playlist has a substring of "transition".
-        playlist_exp = re.compile(r".*transition.*")
-        if re.search(playlist_exp, playlist.get_name().lower()):
+        if TRANSITION_EXP.search(playlist.get_name().lower()):
             is_transition_playlist = True
 
         # Search parents' names for "transition" substring.
         parent = playlist.get_parent()
         while not is_transition_playlist and parent:
-            if re.search(playlist_exp, parent.get_name().lower()):
+            if TRANSITION_EXP.search(parent.get_name().lower()):
                 is_transition_playlist = True
             parent = parent.get_parent()
 
@@ -325,12 +413,8 @@ class TransitionTrackFilter(PlaylistFilter):
         # Check if the given playlist contains one, and only one, of the
         # supported transition playlist types.
         self._playlist_type = None
-        playlist_type_exprs = {
-            "genre": re.compile(r".*genre.*"),
-            "tempo": re.compile(r".*tempo.*"),
-        }
-        for playlist_type, exp in playlist_type_exprs.items():
-            if not re.search(exp, playlist.get_name().lower()):
+        for playlist_type, exp in TRANSITION_PLAYLIST_TYPE_EXPS.items():
+            if not exp.search(playlist.get_name().lower()):
                 continue
             if self._playlist_type:
                 raise ValueError(
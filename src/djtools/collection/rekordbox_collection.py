@@ -5,52 +5,389 @@ XML format that Rekordbox exports. The CustomSubstitution and
 UnsortedAttributes classes are helpers for serializing a RekordboxCollection.
 """
 
+import hashlib
+import logging
+import mmap
+import os
+import pickle
 import re
-from copy import copy
+from contextlib import ExitStack
+from itertools import chain
 from pathlib import Path
-from typing import Iterator, Optional, Tuple
+from typing import Any, Dict, Iterator, Optional, TextIO, Tuple
 
 import bs4
 from bs4 import BeautifulSoup
 from bs4.dammit import EntitySubstitution
 from bs4.formatter import XMLFormatter
+from lxml import etree
 
 from djtools.collection.base_collection import Collection
+from djtools.collection.config import CollectionLoader
 from djtools.collection.rekordbox_playlist import RekordboxPlaylist
 from djtools.collection.rekordbox_track import RekordboxTrack
 from djtools.utils.helpers import make_path
 
 
+logger = logging.getLogger(__name__)
+
+# Version of the snapshot format. This must be incremented whenever the
+# attributes of RekordboxCollection, RekordboxPlaylist, or RekordboxTrack
+# change so that stale snapshots are discarded.
+SNAPSHOT_VERSION = 4
+
+# Regular expressions matching TRACK and NODE elements of an XML file.
+TRACK_ELEMENT = re.compile(
+    rb'<TRACK\b(?:\s+[^\s=/>]+\s*=\s*"[^"]*")*\s*(?:/>|>.*?</TRACK>)', re.S
+)
+TRACK_ID_ATTRIBUTE = re.compile(rb'\sTrackID\s*=\s*"([^"]*)"')
+NODE_TAG = re.compile(
+    rb'<NODE\b(?:\s+[^\s=/>]+\s*=\s*"[^"]*")*\s*(/?)>|</NODE>'
+)
+
+# Regular expressions used to validate XML files.
+XML_ELEMENT_NAME = re.compile(r"</?[^\s/>]+")
+XML_WHITESPACE = re.compile(r"[ \t\r\n]+")
+
+
 class RekordboxCollection(Collection):
     "Collection implementation for usage with Rekordbox."
 
     @make_path
-    def __init__(self, path: Path):
+    def __init__(
+        self,
+        path: Path,
+        loader: CollectionLoader = CollectionLoader.BEAUTIFULSOUP,
+        lazy: bool = False,
+        snapshot: bool = False,
+    ):
         """Deserializes a Collection from an XML file.
 
         Args:
             path: Path to a serialized collection.
+            loader: Parser used to deserialize the XML file.
+            lazy: Whether tracks defer decoding attributes until they're first
+                accessed.
+            snapshot: Whether to load from, and save to, a snapshot of the
+                deserialized collection stored next to the XML file.
         """
         super().__init__(path=path)
         self._path = path
 
+        if not (snapshot and self._load_snapshot(lazy=lazy)):
+            if CollectionLoader(loader) == CollectionLoader.ITERPARSE:
+                self._iterparse(lazy=lazy)
+            else:
+                self._parse(lazy=lazy)
+
+            if snapshot:
+                self._write_snapshot(lazy=lazy)
+
+        self._record_source()
+
+    def _parse(self, lazy: bool = False):
+        """Deserializes a Collection from a BeautifulSoup document.
+
+        Args:
+            lazy: Whether tracks defer decoding attributes until they're first
+                accessed.
+        """
         # Parse the XML as a BeautifulSoup document.
         with open(self._path, mode="r", encoding="utf-8") as _file:
-            self._collection = BeautifulSoup(_file.read(), "xml")
+            collection = BeautifulSoup(_file.read(), "xml")
+
+        # Only the attributes of the root and product Tags are retained for
+        # serialization.
+        self.__root_attrs = dict(collection.find("DJ_PLAYLISTS").attrs)
+        self.__product_attrs = dict(collection.find("PRODUCT").attrs)
 
         # Create a dict of tracks.
         self._tracks = {
-            track["TrackID"]: RekordboxTrack(track)
-            for track in self._collection.find_all("TRACK")
+            track["TrackID"]: RekordboxTrack(track, lazy=lazy)
+            for track in collection.find_all("TRACK")
             if track.get("Location")
         }
 
         # Instantiate the Playlist(s) in this collection.
         self._playlists = RekordboxPlaylist(
-            self._collection.find("NODE", {"Name": "ROOT", "Type": "0"}),
+            collection.find("NODE", {"Name": "ROOT", "Type": "0"}),
             tracks=self._tracks,
         )
 
+        # Release the document now rather than waiting on the garbage
+        # collector to find its reference cycles.
+        collection.decompose()
+
+    def _record_source(self):
+        """Records the state of the XML file the collection was loaded from.
+
+        The byte ranges of the tracks and playlists in the XML file aren't
+        indexed until the collection is first serialized. Until then, only the
+        size and modification time of the XML file, the tracks, and the
+        playlists in document order are recorded so that modifications made
+        in the meantime don't affect which elements are matched.
+        """
+        stat = self._path.stat()
+        self.__source_stat = (stat.st_size, stat.st_mtime_ns)
+        self.__source_tracks = self._tracks
+        self.__source_playlists = []
+        self.__source_indexed = False
+        self.__track_spans = {}
+        self.__playlist_spans = {}
+
+        stack = [self._playlists] if self._playlists is not None else []
+        while stack:
+            playlist = stack.pop()
+            self.__source_playlists.append((playlist, len(playlist)))
+            if playlist.is_folder():
+                stack.extend(reversed(list(playlist)))
+
+    def _index_source(self, source: mmap.mmap):
+        """Records the byte ranges of the tracks and playlists in the XML file.
+
+        Serializing copies the byte ranges of tracks and playlists that
+        weren't modified straight from the XML file rather than serializing
+        them again. The XML file is scanned for TRACK elements within
+        COLLECTION and for NODE elements within PLAYLISTS. Elements that can't
+        be matched to a track or playlist simply aren't recorded and are
+        serialized as usual.
+
+        Args:
+            source: Memory-mapped XML file.
+        """
+        self.__source_indexed = True
+
+        # Tracks are matched to TRACK elements with the same TrackID.
+        start = source.find(b"<COLLECTION")
+        end = source.find(b"</COLLECTION>", max(start, 0))
+        for match in TRACK_ELEMENT.finditer(source, max(start, 0), end):
+            track_id = TRACK_ID_ATTRIBUTE.search(match.group())
+            track = self.__source_tracks.get(
+                track_id.group(1).decode("utf-8") if track_id else None
+            )
+            if track is not None:
+                self.__track_spans[id(track)] = (
+                    track,
+                    match.start(),
+                    match.end(),
+                )
+
+        # Playlists are matched to NODE elements in document order. A span is
+        # opened when a NODE starts and closed when it ends. The depth of a
+        # NODE is its nesting level below the ROOT NODE.
+        spans = []
+        open_spans = []
+        start = source.find(b"<PLAYLISTS")
+        end = source.find(b"</PLAYLISTS>", max(start, 0))
+        for match in NODE_TAG.finditer(source, max(start, 0), end):
+            if match.group().startswith(b"</"):
+                if not open_spans:
+                    return
+                spans[open_spans.pop()][1] = match.end()
+                continue
+            spans.append([match.start(), match.end(), len(open_spans)])
+            if not match.group(1):
+                open_spans.append(len(spans) - 1)
+        if open_spans or len(self.__source_playlists) != len(spans):
+            return
+        for (playlist, length), (start, end, depth) in zip(
+            self.__source_playlists, spans
+        ):
+            self.__playlist_spans[id(playlist)] = (
+                playlist,
+                start,
+                end,
+                depth,
+                length,
+            )
+
+    def _iterparse(self, lazy: bool = False):
+        """Deserializes a Collection by streaming the XML file.
+
+        Rather than building a document for the entire XML file, TRACK and
+        NODE elements are converted into small, detached BeautifulSoup Tags as
+        soon as they're parsed and then cleared so that memory usage doesn't
+        scale with the size of the XML file. The resulting tracks and playlists
+        are identical to those created from a BeautifulSoup document.
+
+        Args:
+            lazy: Whether tracks defer decoding attributes until they're first
+                accessed.
+        """
+        self.__root_attrs = {}
+        self.__product_attrs = {}
+        self._tracks = {}
+        self._playlists = None
+
+        # Stack of NODE Tags for the playlist tree currently being parsed.
+        playlist_stack = []
+        in_collection = False
+
+        for event, element in etree.iterparse(
+            str(self._path), events=("start", "end"), huge_tree=True
+        ):
+            # Attributes of the root and product Tags are retained for
+            # serialization.
+            if event == "start":
+                if element.tag == "DJ_PLAYLISTS":
+                    self.__root_attrs = dict(element.attrib)
+                elif element.tag == "COLLECTION":
+                    in_collection = True
+                elif element.tag == "NODE":
+                    node_tag = bs4.Tag(name="NODE", attrs=dict(element.attrib))
+                    if playlist_stack:
+                        playlist_stack[-1].append(node_tag)
+                    playlist_stack.append(node_tag)
+                continue
+
+            if element.tag == "PRODUCT":
+                self.__product_attrs = dict(element.attrib)
+            elif element.tag == "COLLECTION":
+                in_collection = False
+            # Tracks of the collection are deserialized as they're parsed.
+            elif element.tag == "TRACK" and in_collection:
+                if element.get("Location"):
+                    self._tracks[element.get("TrackID")] = RekordboxTrack(
+                        _to_tag(element), lazy=lazy
+                    )
+            # Tracks of a playlist are appended to their playlist's Tag.
+            elif element.tag == "TRACK" and playlist_stack:
+                playlist_stack[-1].append(_to_tag(element))
+            # The playlist tree is deserialized once the ROOT NODE is done.
+            elif element.tag == "NODE":
+                node_tag = playlist_stack.pop()
+                if not playlist_stack:
+                    self._playlists = RekordboxPlaylist(
+                        node_tag, tracks=self._tracks
+                    )
+            else:
+                continue
+
+            # Release the element, and any already consumed siblings, now that
+            # it's been deserialized.
+            element.clear()
+            while element.getprevious() is not None:
+                del element.getparent()[0]
+
+    def _get_snapshot_key(self, lazy: bool) -> Tuple:
+        """Gets the key identifying the XML file that a snapshot is valid for.
+
+        Args:
+            lazy: Whether tracks defer decoding attributes until they're first
+                accessed.
+
+        Returns:
+            Tuple of the snapshot version, path, size, and modification time of
+            the XML file as well as the lazy flag.
+        """
+        stat = self._path.stat()
+
+        return (
+            SNAPSHOT_VERSION,
+            str(self._path.resolve()),
+            stat.st_size,
+            stat.st_mtime_ns,
+            lazy,
+        )
+
+    def _get_snapshot_path(self) -> Path:
+        """Gets the path of the snapshot for this Collection's XML file.
+
+        Returns:
+            Path to the snapshot.
+        """
+        return self._path.with_name(f"{self._path.name}.snapshot")
+
+    def _hash_collection(self) -> str:
+        """Hashes the contents of this Collection's XML file.
+
+        Returns:
+            Hex digest of the XML file.
+        """
+        digest = hashlib.sha256()
+        with open(self._path, mode="rb") as _file:
+            for chunk in iter(lambda: _file.read(1 << 20), b""):
+                digest.update(chunk)
+
+        return digest.hexdigest()
+
+    def _load_snapshot(self, lazy: bool) -> bool:
+        """Deserializes a Collection from its snapshot.
+
+        The snapshot is only used if its key and content hash match the
+        current XML file. The key is checked first so that hashing the XML
+        file is skipped when it has obviously changed.
+
+        Args:
+            lazy: Whether tracks defer decoding attributes until they're first
+                accessed.
+
+        Returns:
+            Whether or not the Collection was loaded from the snapshot.
+        """
+        snapshot_path = self._get_snapshot_path()
+        if not snapshot_path.exists():
+            return False
+
+        try:
+            with open(snapshot_path, mode="rb") as _file:
+                key, content_hash = pickle.load(_file)
+                if (
+                    key != self._get_snapshot_key(lazy)
+                    or content_hash != self._hash_collection()
+                ):
+                    return False
+                snapshot = pickle.load(_file)
+        except Exception as exc:  # pylint: disable=broad-exception-caught
+            logger.warning(
+                f"Failed to load the collection snapshot {snapshot_path}: "
+                f"{exc}"
+            )
+            return False
+
+        self.__root_attrs = snapshot["root"]
+        self.__product_attrs = snapshot["product"]
+        self._tracks = snapshot["tracks"]
+        self._playlists = snapshot["playlists"]
+
+        return True
+
+    def _write_snapshot(self, lazy: bool):
+        """Serializes this Collection as a snapshot next to its XML file.
+
+        The snapshot stores a header, containing the key and content hash of
+        the XML file, followed by the deserialized Collection. It's written to
+        a temporary file first so that a partially written snapshot is never
+        loaded.
+
+        Args:
+            lazy: Whether tracks defer decoding attributes until they're first
+                accessed.
+        """
+        snapshot_path = self._get_snapshot_path()
+        temp_path = snapshot_path.with_name(f"{snapshot_path.name}.tmp")
+        snapshot = {
+            "root": self.__root_attrs,
+            "product": self.__product_attrs,
+            "tracks": self._tracks,
+            "playlists": self._playlists,
+        }
+
+        try:
+            with open(temp_path, mode="wb") as _file:
+                pickle.dump(
+                    (self._get_snapshot_key(lazy), self._hash_collection()),
+                    _file,
+                    protocol=pickle.HIGHEST_PROTOCOL,
+                )
+                pickle.dump(snapshot, _file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, snapshot_path)
+        except OSError as exc:
+            logger.warning(
+                f"Failed to write the collection snapshot {snapshot_path}: "
+                f"{exc}"
+            )
+
     def __repr__(self) -> str:
         """Produce a string representation of this Collection.
 
@@ -68,9 +405,8 @@ class RekordboxCollection(Collection):
             key[1:]: value
             for key, value in self.__dict__.items()
             if not (
-                key.startswith(f"_{type(self).__name__}")
+                key.startswith((f"_{type(self).__name__}", "_Collection"))
                 or not key.startswith("_")
-                or key == "_collection"
             )
         }
 
@@ -104,128 +440,302 @@ class RekordboxCollection(Collection):
 
         return string.format(type(self).__name__, body)
 
-    @make_path
-    def serialize(self, *args, path: Optional[Path] = None, **kwargs) -> Path:
-        """Serializes this Collection as an XML file.
+    def _is_unchanged(self, playlist: RekordboxPlaylist) -> bool:
+        """Returns whether a playlist is the same as in the XML file.
 
         Args:
-            path: Path to output serialized collection to.
+            playlist: Playlist to check.
 
         Returns:
-            Path to the serialized collection XML file.
+            Whether or not neither the playlist nor any of the playlists within
+                it were modified since being deserialized.
         """
-        # BeautifulSoup document.
-        doc = BeautifulSoup("", features="xml")
-
-        # Tag that contains all the playlist data.
-        root_tag_name = "DJ_PLAYLISTS"
+        span = self.__playlist_spans.get(id(playlist))
+        if span is None or playlist.is_dirty() or len(playlist) != span[4]:
+            return False
 
-        # Retrieve this root tag from the existing document, rather than
-        # building it from scratch, in case the attributes ever change.
-        root_tag = bs4.Tag(
-            name=root_tag_name,
-            attrs=self._collection.find(root_tag_name).attrs,
+        return not playlist.is_folder() or all(
+            self._is_unchanged(_playlist) for _playlist in playlist
         )
 
-        # Similarly, we want to reference the existing attribute data on the
-        # product Tag.
-        root_tag.extend(
-            [bs4.NavigableString("\n"), copy(self._collection.find("PRODUCT"))]
-        )
+    @make_path
+    def serialize(self, *args, path: Optional[Path] = None, **kwargs) -> Path:
+        """Serializes this Collection as an XML file.
 
-        # Build the collection Tag and serialize each track into it before
-        # adding the collection Tag to the root.
-        collection_tag = bs4.Tag(
-            name="COLLECTION", attrs={"Entries": str(len(self._tracks))}
-        )
-        for track in self._tracks.values():
-            collection_tag.extend(
-                [bs4.NavigableString("\n"), track.serialize()]
-            )
-        collection_tag.append(bs4.NavigableString("\n"))
-        root_tag.extend([bs4.NavigableString("\n"), collection_tag])
-
-        # Build the playlists Tag and serialize each Playlist into it before
-        # adding the playlist Tag to the root.
-        playlists_tag = bs4.Tag(name="PLAYLISTS")
-        playlists_root_tag = bs4.Tag(
-            name="NODE",
-            attrs={"Type": "0", "Name": "ROOT", "Count": len(self._playlists)},
-        )
-        for playlist in self._playlists:
-            playlists_root_tag.extend(
-                [bs4.NavigableString("\n"), playlist.serialize()]
-            )
-        playlists_root_tag.append(bs4.NavigableString("\n"))
-        playlists_tag.extend(
-            [
-                bs4.NavigableString("\n"),
-                playlists_root_tag,
-                bs4.NavigableString("\n"),
-            ]
-        )
-        root_tag.extend(
-            [
-                bs4.NavigableString("\n"),
-                playlists_tag,
-                bs4.NavigableString("\n"),
-            ]
-        )
-        doc.append(root_tag)
+        Tracks and playlists that weren't modified since being deserialized
+        are copied verbatim from the XML file, as long as it hasn't changed in
+        the meantime, while the rest are serialized element by element.
 
+        Args:
+            path: Path to output serialized collection to.
+
+        Returns:
+            Path to the serialized collection XML file.
+        """
         # If no new path is provided, use the original.
         if not path:
             path = self._path
 
-        # Write the serialized Collection to a new file.
-        with open(path, mode="w", encoding="utf-8") as _file:
-            _file.write(
-                doc.prettify(
-                    # UnsortedAttributes formatter ensures attributes are
-                    # serialized in the same order as the original XML file.
-                    formatter=UnsortedAttributes(
-                        indent=2,
-                        # CustomSubstitution is used to substitute an expanded
-                        # character set in the serialized XML file.
-                        entity_substitution=CustomSubstitution.substitute_xml,
+        # The collection is written to a temporary file first since the XML
+        # file that's being copied from may be the one that's overwritten.
+        temp_path = path.with_name(f"{path.name}.tmp")
+
+        with ExitStack() as stack:
+            # Memory-map the XML file if unchanged elements can be copied.
+            source = None
+            if self._path.exists():
+                stat = self._path.stat()
+                if self.__source_stat == (stat.st_size, stat.st_mtime_ns):
+                    source_file = stack.enter_context(
+                        open(self._path, mode="rb")
                     )
-                )
+                    source = stack.enter_context(
+                        mmap.mmap(
+                            source_file.fileno(), 0, access=mmap.ACCESS_READ
+                        )
+                    )
+                    if not self.__source_indexed:
+                        self._index_source(source)
+
+            _file = stack.enter_context(
+                open(temp_path, mode="w", encoding="utf-8")
+            )
+            writer = StreamingXMLWriter(_file)
+            writer.write_declaration()
+
+            # Reference the existing attribute data on the root and product
+            # Tags, rather than building them from scratch, in case the
+            # attributes ever change.
+            writer.start_tag("DJ_PLAYLISTS", self.__root_attrs)
+            writer.empty_tag("PRODUCT", self.__product_attrs)
+
+            # Write each track into the collection Tag.
+            writer.start_tag("COLLECTION", {"Entries": str(len(self._tracks))})
+            for track in self._tracks.values():
+                span = self.__track_spans.get(id(track))
+                if source and span and not track.is_dirty():
+                    writer.write_raw(source[span[1] : span[2]].decode("utf-8"))
+                    continue
+                attrs, children = track.serialize_attrs()
+                if not children:
+                    writer.empty_tag("TRACK", attrs)
+                    continue
+                writer.start_tag("TRACK", attrs)
+                for name, child_attrs in children:
+                    writer.empty_tag(name, child_attrs)
+                writer.end_tag("TRACK")
+            writer.end_tag("COLLECTION")
+
+            # Write each Playlist into the playlists Tag.
+            writer.start_tag("PLAYLISTS", {})
+            writer.start_tag(
+                "NODE",
+                {
+                    "Type": "0",
+                    "Name": "ROOT",
+                    "Count": str(len(self._playlists)),
+                },
             )
+            for playlist in self._playlists:
+                self._write_playlist(writer, playlist, source=source)
+            writer.end_tag("NODE")
+            writer.end_tag("PLAYLISTS")
+            writer.end_tag("DJ_PLAYLISTS")
+
+        os.replace(temp_path, path)
 
         return path
 
+    def _write_playlist(
+        self,
+        writer: "StreamingXMLWriter",
+        playlist: RekordboxPlaylist,
+        source: Optional[mmap.mmap] = None,
+        depth: int = 1,
+    ):
+        """Writes a playlist, and its tracks or sub-playlists, as a NODE Tag.
+
+        Args:
+            writer: Writer of the serialized collection.
+            playlist: Playlist to write.
+            source: Memory-mapped XML file to copy unchanged playlists from.
+            depth: Nesting level of the playlist below the ROOT NODE.
+        """
+        # Unchanged playlists at their original depth are copied so that the
+        # indentation of the nested Tags stays correct.
+        span = self.__playlist_spans.get(id(playlist))
+        if (
+            source
+            and span
+            and span[3] == depth
+            and self._is_unchanged(playlist)
+        ):
+            writer.write_raw(source[span[1] : span[2]].decode("utf-8"))
+            return
+
+        attrs = playlist.serialize_attrs()
+        if len(playlist) == 0:
+            writer.empty_tag("NODE", attrs)
+            return
+
+        writer.start_tag("NODE", attrs)
+        if playlist.is_folder():
+            for sub_playlist in playlist:
+                self._write_playlist(
+                    writer, sub_playlist, source=source, depth=depth + 1
+                )
+        else:
+            for track in playlist.get_tracks().values():
+                writer.empty_tag("TRACK", {"Key": track.get_id()})
+        writer.end_tag("NODE")
+
     @classmethod
-    def validate(cls, input_xml: Path, output_xml: Path):
+    def validate(
+        cls, input_xml: Path, output_xml: Path, chunk_size: int = 1 << 20
+    ):
         """Validate the serialized Collection matches the original.
 
+        Both XML files are streamed in chunks, with runs of whitespace
+        normalized into a single space, so memory usage doesn't scale with
+        the size of the collection. Comparison stops at the first difference.
+
         Args:
             input_xml: Path to an XML containing the original collection.
             output_xml: Path to an XML containing the serialized collection.
+            chunk_size: Number of characters to read from each file at once.
 
         Raises:
             AssertionError: A serialized Collection must exactly match the
-                original XML used to deserialize from.
+                original XML used to deserialize from. The line and element
+                of the first difference are reported.
         """
-        # Read the original and serialized collection XML files as
-        # strings.
-        with open(input_xml, mode="r", encoding="utf-8") as _file:
-            input_xml_string = _file.read()
-        with open(output_xml, mode="r", encoding="utf-8") as _file:
-            output_xml_string = _file.read()
+        with open(input_xml, mode="r", encoding="utf-8") as input_file, open(
+            output_xml, mode="r", encoding="utf-8"
+        ) as output_file:
+            input_chunks = _normalize_xml(input_file, chunk_size=chunk_size)
+            output_chunks = _normalize_xml(output_file, chunk_size=chunk_size)
+            input_chunk = output_chunk = ""
+            # Number of normalized characters which are the same in both files.
+            offset = 0
+
+            while True:
+                # Refill whichever chunks have been compared completely.
+                while input_chunk == "":
+                    input_chunk = next(input_chunks, None)
+                while output_chunk == "":
+                    output_chunk = next(output_chunks, None)
+                if input_chunk is None or output_chunk is None:
+                    if input_chunk == output_chunk:
+                        return
+                    break
+
+                # Compare the part of the chunks that both files have read.
+                length = min(len(input_chunk), len(output_chunk))
+                if input_chunk[:length] != output_chunk[:length]:
+                    offset += len(
+                        os.path.commonprefix(
+                            [input_chunk[:length], output_chunk[:length]]
+                        )
+                    )
+                    break
+                offset += length
+                input_chunk = input_chunk[length:]
+                output_chunk = output_chunk[length:]
+
+        raise AssertionError(
+            "Failed RekordboxCollection validation! The first difference is "
+            f"{_locate_xml_difference(input_xml, offset)} of {input_xml} and "
+            f"{_locate_xml_difference(output_xml, offset)} of {output_xml}."
+        )
+
 
-        # Rekordbox capitalizes "UTF-8" in the file declaration while
-        # BeautifulSoup does not.
-        xml_declaration = input_xml_string[:38]
-        output_xml_string = xml_declaration + output_xml_string[38:]
+def _locate_xml_difference(path: Path, offset: int) -> str:
+    """Describes the location of a normalized offset within an XML file.
 
-        # Replace multiple occurrences of whitespace with a single whitespace.
-        whitespace = re.compile(r"/\s{2,}/g")
-        input_xml_string = re.sub(whitespace, input_xml_string, " ")
-        output_xml_string = re.sub(whitespace, output_xml_string, " ")
+    Args:
+        path: Path to an XML file.
+        offset: Offset into the XML file after normalizing its whitespace.
 
-        assert (
-            input_xml_string == output_xml_string
-        ), "Failed RekordboxCollection validation!"
+    Returns:
+        Description of the line, column, and element at the offset.
+    """
+    position = 0
+    with open(path, mode="r", encoding="utf-8") as _file:
+        for line_number, line in enumerate(_normalize_xml(_file), 1):
+            if position + len(line) <= offset:
+                position += len(line)
+                continue
+            column = offset - position
+            elements = (
+                XML_ELEMENT_NAME.findall(line[: column + 1])
+                or XML_ELEMENT_NAME.findall(line, column)[:1]
+            )
+            snippet = line[max(column - 20, 0) : column + 20].strip()
+            location = f"at line {line_number}, column {column}"
+            if elements:
+                location += f" in the {elements[-1]}> element"
+
+            return f'{location} ("{snippet}")'
+
+    return "at the end"
+
+
+def _normalize_xml(
+    _file: TextIO, chunk_size: Optional[int] = None
+) -> Iterator[str]:
+    """Yields the contents of an XML file with its whitespace normalized.
+
+    Runs of whitespace, including those spanning more than one chunk, are
+    normalized into a single space and trailing whitespace is ignored.
+    Rekordbox capitalizes "UTF-8" in the XML declaration while BeautifulSoup
+    does not, so the declaration is lowercased.
+
+    Args:
+        _file: XML file to read.
+        chunk_size: Number of characters to read at once. If not provided,
+            the file is read line by line.
+
+    Yields:
+        Normalized chunk of the XML file.
+    """
+    declaration = _file.readline()
+    if declaration.startswith("<?xml"):
+        declaration = declaration.lower()
+    chunks = (
+        _file
+        if chunk_size is None
+        else iter(lambda: _file.read(chunk_size), "")
+    )
+    # Trailing whitespace is held back until the next chunk so that it's
+    # ignored at the end of the file.
+    pending_space = False
+    for chunk in chain([declaration], chunks):
+        chunk = XML_WHITESPACE.sub(" ", chunk)
+        if pending_space and chunk and not chunk.startswith(" "):
+            chunk = f" {chunk}"
+        if chunk:
+            pending_space = chunk.endswith(" ")
+        yield chunk[:-1] if chunk and pending_space else chunk
+
+
+def _to_tag(element: etree._Element) -> bs4.element.Tag:
+    """Converts a parsed XML element into a detached BeautifulSoup Tag.
+
+    Args:
+        element: Element parsed from the XML file.
+
+    Returns:
+        BeautifulSoup Tag with the same attributes and child elements.
+    """
+    tag = bs4.Tag(
+        name=element.tag,
+        attrs=dict(element.attrib),
+        can_be_empty_element=True,
+    )
+    for child in element:
+        tag.append(_to_tag(child))
+
+    return tag
 
 
 class CustomSubstitution(EntitySubstitution):
@@ -258,6 +768,92 @@ class CustomSubstitution(EntitySubstitution):
         return value
 
 
+class StreamingXMLWriter:
+    """Helper class to write Tags directly to a file.
+
+    Tags are written in the same format as prettifying a BeautifulSoup document
+    with the UnsortedAttributes formatter and CustomSubstitution entity
+    substitution; i.e. one Tag per line, indented by two spaces per level, with
+    attributes in their original order.
+    """
+
+    def __init__(self, _file: TextIO, indent: int = 2):
+        """Initializes the writer.
+
+        Args:
+            _file: File to write Tags to.
+            indent: Number of spaces to indent each level of Tags by.
+        """
+        self._file = _file
+        self._indent = indent
+        self._depth = 0
+
+    def _write_tag(self, name: str, attrs: Dict[str, Any], end: str):
+        """Writes the opening of a Tag.
+
+        Args:
+            name: Name of the Tag.
+            attrs: Attributes of the Tag.
+            end: Characters closing the Tag.
+        """
+        line = [" " * self._indent * self._depth, "<", name]
+        for key, value in attrs.items():
+            if value is None:
+                line.extend([" ", key])
+                continue
+            line.extend(
+                [
+                    " ",
+                    key,
+                    '="',
+                    CustomSubstitution.substitute_xml(str(value)),
+                    '"',
+                ]
+            )
+        line.append(end)
+        self._file.write("".join(line))
+
+    def empty_tag(self, name: str, attrs: Dict[str, Any]):
+        """Writes a Tag without children.
+
+        Args:
+            name: Name of the Tag.
+            attrs: Attributes of the Tag.
+        """
+        self._write_tag(name, attrs, "/>\n")
+
+    def end_tag(self, name: str):
+        """Writes the closing of a Tag with children.
+
+        Args:
+            name: Name of the Tag.
+        """
+        self._depth -= 1
+        self._file.write(f"{' ' * self._indent * self._depth}</{name}>\n")
+
+    def start_tag(self, name: str, attrs: Dict[str, Any]):
+        """Writes the opening of a Tag with children.
+
+        Args:
+            name: Name of the Tag.
+            attrs: Attributes of the Tag.
+        """
+        self._write_tag(name, attrs, ">\n")
+        self._depth += 1
+
+    def write_raw(self, text: str):
+        """Writes a Tag that's already serialized on a line of its own.
+
+        Args:
+            text: Serialized Tag.
+        """
+        self._file.write(f"{' ' * self._indent * self._depth}{text}\n")
+
+    def write_declaration(self):
+        "Writes the XML declaration."
+        self._file.write('<?xml version="1.0" encoding="utf-8"?>\n')
+
+
 class UnsortedAttributes(XMLFormatter):
     "Helper class to serialize Tag attributes in their original order."
 
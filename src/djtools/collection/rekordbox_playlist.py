@@ -107,6 +107,8 @@ class RekordboxPlaylist(Playlist):
                 or not key.startswith("_")
                 or key == "_parent"
                 or key == "_aggregate"
+                or key == "_dirty"
+                or key == "_index"
             )
         }
 
@@ -243,54 +245,71 @@ class RekordboxPlaylist(Playlist):
             BeautifulSoup Tag representing this playlist.
         """
         # BeautifulSoup Tag to populate with attributes of this playlist.
-        playlist_tag = bs4.Tag(name="NODE", can_be_empty_element=True)
+        playlist_tag = bs4.Tag(
+            name="NODE",
+            attrs=self.serialize_attrs(),
+            can_be_empty_element=True,
+        )
+
+        # Playlists and tracks are serialized as nested Tag objects.
+        value = self._playlists if self.is_folder() else self._tracks
+        if not value:
+            return playlist_tag
+
+        # Iterate and serialize nested playlists.
+        if self.is_folder():
+            for val in value:
+                playlist_tag.extend(
+                    [bs4.NavigableString("\n"), val.serialize()]
+                )
+        # Iterate and serialize tracks.
+        else:
+            for val in value.values():
+                playlist_tag.extend(
+                    [
+                        bs4.NavigableString("\n"),
+                        val.serialize(playlist=True),
+                    ]
+                )
+
+        # Append a final newline character.
+        playlist_tag.append(bs4.NavigableString("\n"))
+
+        return playlist_tag
 
+    def serialize_attrs(self) -> Dict[str, str]:
+        """Serializes this playlist as the attributes of a NODE Tag.
+
+        This allows a collection to write its playlists without building a
+        BeautifulSoup Tag for each of them.
+
+        Returns:
+            Dict of the NODE Tag attributes in their original order.
+        """
         # Dunder members aren't serialized. Public members (i.e. methods)
-        # aren't serialized either.
+        # aren't serialized either. Playlists and tracks are serialized as
+        # nested Tags.
         serialize_attrs = {
             key[1:]: value
             for key, value in self.__dict__.items()
             if not (
                 key.startswith(f"_{type(self).__name__}")
                 or not key.startswith("_")
-                or key == "_parent"
-                or key == "_aggregate"
+                or key
+                in [
+                    "_aggregate",
+                    "_dirty",
+                    "_index",
+                    "_parent",
+                    "_playlists",
+                    "_tracks",
+                ]
             )
         }
 
-        # Serialize attributes into a NODE Tag.
-        for key, value in serialize_attrs.items():
-            # Playlists and tracks are serialized as nested Tag objects.
-            if key in ["playlists", "tracks"]:
-                if not value:
-                    continue
-
-                # Iterate and serialize nested playlists.
-                if self.is_folder():
-                    for val in value:
-                        playlist_tag.extend(
-                            [bs4.NavigableString("\n"), val.serialize()]
-                        )
-                # Iterate and serialize tracks.
-                else:
-                    for val in value.values():
-                        playlist_tag.extend(
-                            [
-                                bs4.NavigableString("\n"),
-                                val.serialize(playlist=True),
-                            ]
-                        )
-
-                # Append a final newline character.
-                playlist_tag.append(bs4.NavigableString("\n"))
-                continue
-
-            # Otherwise the data is serialized as NODE Tag attributes.
-            playlist_tag[key] = value
-
         # Update the Count or Entries attribute.
-        playlist_tag["Count" if self.is_folder() else "Entries"] = str(
+        serialize_attrs["Count" if self.is_folder() else "Entries"] = str(
             len(self)
         )
 
-        return playlist_tag
+        return serialize_attrs
@@ -8,7 +8,7 @@ import os
 import re
 from datetime import datetime
 from pathlib import Path
-from typing import Any, List
+from typing import Any, Dict, Iterator, List, Tuple
 from urllib.parse import quote, unquote
 
 import bs4
@@ -20,75 +20,225 @@ from djtools.utils.helpers import make_path
 # pylint: disable=no-member,duplicate-code
 
 
-class RekordboxTrack(Track):
+# TRACK Tag attributes exported by Rekordbox.
+TRACK_ATTRIBUTES = (
+    "TrackID",
+    "Name",
+    "Artist",
+    "Composer",
+    "Album",
+    "Grouping",
+    "Genre",
+    "Kind",
+    "Size",
+    "TotalTime",
+    "DiscNumber",
+    "TrackNumber",
+    "Year",
+    "AverageBpm",
+    "DateModified",
+    "DateAdded",
+    "BitRate",
+    "SampleRate",
+    "Comments",
+    "PlayCount",
+    "LastPlayed",
+    "Rating",
+    "Location",
+    "Remixer",
+    "Tonality",
+    "Label",
+    "Mix",
+    "Colour",
+)
+
+# TRACK Tag attributes that are deserialized as integers.
+INTEGER_ATTRIBUTES = {
+    "BitRate",
+    "DiscNumber",
+    "PlayCount",
+    "SampleRate",
+    "Size",
+    "TotalTime",
+    "TrackNumber",
+}
+
+# TRACK Tag attributes that are deserialized as something other than a string.
+DECODED_ATTRIBUTES = INTEGER_ATTRIBUTES | {
+    "AverageBpm",
+    "DateAdded",
+    "Genre",
+    "Location",
+    "Rating",
+}
+
+# Attributes derived from the TRACK Tag rather than copied from it.
+DERIVED_ATTRIBUTES = ("MyTags", "Tags", "beat_grid", "hot_cues")
+
+# Orders of TRACK Tag attributes which are shared by all the tracks having the
+# same order.
+_ATTRIBUTE_ORDERS = {}
+
+
+# Tracks have a getter for each of the attributes used by playlists and
+# selectors on top of the setters of the attributes that may be modified.
+class RekordboxTrack(Track):  # pylint: disable=too-many-public-methods
     "Track implementation for usage with Rekordbox."
 
-    def __init__(self, track: bs4.element.Tag):
+    # Known attributes are stored in slots rather than a per-track dict. The
+    # __dict__ slot holds attributes unknown to this class and is only
+    # allocated for tracks that have them.
+    __slots__ = (
+        *(f"_{key}" for key in TRACK_ATTRIBUTES + DERIVED_ATTRIBUTES),
+        "__attributes",
+        "__dirty",
+        "__original_date_added",
+        "__dict__",
+    )
+
+    # Prefix of the path to the audio file corresponding to this track.
+    __location_prefix = (
+        "file://localhost" if os.name == "posix" else "file://localhost/"
+    )
+
+    def __init__(self, track: bs4.element.Tag, lazy: bool = False):
         """Deserialize a track from a BeautifulSoup TRACK Tag.
 
         Args:
             track: BeautifulSoup Tag representing a track.
+            lazy: Whether to defer decoding attributes until they're first
+                accessed.
         """
-        # Prefix of the path to the audio file corresponding to this track.
         super().__init__()
-        self.__location_prefix = (
-            "file://localhost" if os.name == "posix" else "file://localhost/"
-        )
+        self.__dirty = False
 
-        # Set class attributes from TRACK Tag attributes.
+        # Set class attributes from TRACK Tag attributes. Attributes that need
+        # decoding hold their raw string until they're decoded.
         for key, value in track.attrs.items():
-            if key in [
-                "BitRate",
-                "DiscNumber",
-                "PlayCount",
-                "SampleRate",
-                "Size",
-                "TotalTime",
-                "TrackNumber",
-            ]:
-                value = int(value)
-            if key == "AverageBpm":
-                value = float(value)
             if key == "DateAdded":
                 # We need to keep the original date added string because
                 # Rekordbox doesn't format date strings consistently i.e.
                 # ensuring perfect serialization symmetry is not possible
                 # without this.
                 self.__original_date_added = value
-                value = datetime.strptime(value, "%Y-%m-%d")
-            if key == "Genre":
-                value = [x.strip() for x in value.split("/")]
-            if key == "Location":
-                value = Path(unquote(value).split(self.__location_prefix)[-1])
-            if key == "Rating":
-                value = {
-                    "0": 0,
-                    "51": 1,
-                    "102": 2,
-                    "153": 3,
-                    "204": 4,
-                    "255": 5,
-                }.get(value)
             setattr(self, f"_{key}", value)
 
-        # Parse MyTag data from Comments attribute.
-        my_tags = re.search(r"(?<=\/\*).*(?=\*\/)", self._Comments)
-        self._MyTags = (  # pylint: disable=invalid-name
-            [x.strip() for x in my_tags.group().split("/")] if my_tags else []
+        # The order of the attributes is retained so that serialization is
+        # symmetrical.
+        attributes = tuple(track.attrs)
+        self.__attributes = _ATTRIBUTE_ORDERS.setdefault(
+            attributes, attributes
         )
 
-        # Merge Genre and MyTag data into a new attribute.
-        self._Tags = self._Genre + self._MyTags  # pylint: disable=invalid-name
+        # MyTag data is parsed from the Comments attribute and merged with the
+        # Genre data into a new attribute.
+        self._MyTags = None  # pylint: disable=invalid-name
+        self._Tags = None  # pylint: disable=invalid-name
+
+        # Parse TEMPO and POSITION_MARK Tags as the beat grid and hot cues
+        # attributes, respectively.
+        self._beat_grid = []
+        self._hot_cues = []
+        for child in track.children:
+            if child.name == "TEMPO":
+                self._beat_grid.append(child.attrs)
+            elif child.name == "POSITION_MARK":
+                self._hot_cues.append(child.attrs)
+
+        if not lazy:
+            for key in self.__attributes + DERIVED_ATTRIBUTES:
+                self.__get(key)
+
+    def __attribute_items(self) -> Iterator[Tuple[str, Any]]:
+        """Yields the attributes of this track in their original order.
+
+        Yields:
+            Tuple containing an attribute's name and value.
+        """
+        for key in self.__attributes + DERIVED_ATTRIBUTES:
+            yield key, getattr(self, f"_{key}")
+
+    def __decode(self, key: str):
+        """Decodes an attribute from the raw string of the TRACK Tag.
+
+        Args:
+            key: Name of the attribute to decode.
+        """
+        value = getattr(self, f"_{key}")
+        if key in INTEGER_ATTRIBUTES:
+            value = int(value)
+        elif key == "AverageBpm":
+            value = float(value)
+        elif key == "DateAdded":
+            value = datetime.strptime(value, "%Y-%m-%d")
+        elif key == "Genre":
+            value = [x.strip() for x in value.split("/")]
+        elif key == "Location":
+            value = Path(unquote(value).split(self.__location_prefix)[-1])
+        elif key == "Rating":
+            value = {
+                "0": 0,
+                "51": 1,
+                "102": 2,
+                "153": 3,
+                "204": 4,
+                "255": 5,
+            }.get(value)
+        elif key == "MyTags":
+            my_tags = re.search(r"(?<=\/\*).*(?=\*\/)", self._Comments)
+            value = (
+                [x.strip() for x in my_tags.group().split("/")]
+                if my_tags
+                else []
+            )
+        elif key == "Tags":
+            value = self.__get("Genre") + self.__get("MyTags")
+        setattr(self, f"_{key}", value)
+
+    def __get(self, key: str) -> Any:
+        """Gets an attribute, decoding it first if that hasn't been done yet.
+
+        Args:
+            key: Name of the attribute to get.
 
-        # Parse TEMPO Tags as the beat grid attribute.
-        self._beat_grid = track.find_all("TEMPO")
-        if self._beat_grid:
-            self._beat_grid = [point.attrs for point in self._beat_grid]
+        Returns:
+            The decoded attribute.
+        """
+        if self.__is_undecoded(key):
+            self.__decode(key)
 
-        # Parse POSITION_MARK Tags as the hot cues attribute.
-        self._hot_cues = track.find_all("POSITION_MARK")
-        if self._hot_cues:
-            self._hot_cues = [hot_cue.attrs for hot_cue in self._hot_cues]
+        return getattr(self, f"_{key}")
+
+    def __get_integer(self, key: str) -> int:
+        """Gets an integer attribute which not every TRACK Tag has.
+
+        Args:
+            key: Name of the attribute to get.
+
+        Returns:
+            The decoded attribute or zero if the track doesn't have it.
+        """
+        if key not in self.__attributes:
+            return 0
+
+        return self.__get(key)
+
+    def __is_undecoded(self, key: str) -> bool:
+        """Returns whether an attribute still needs to be decoded.
+
+        Attributes that are decoded are never strings so those that are
+        strings still hold the raw string from the TRACK Tag.
+
+        Args:
+            key: Name of the attribute.
+
+        Returns:
+            Whether or not the attribute still needs to be decoded.
+        """
+        if key in DECODED_ATTRIBUTES:
+            return isinstance(getattr(self, f"_{key}"), str)
+
+        return key in ["MyTags", "Tags"] and getattr(self, f"_{key}") is None
 
     def __repr__(self) -> str:
         """Produces a string representation of this track.
@@ -103,15 +253,10 @@ class RekordboxTrack(Track):
         # Body of the repr string to fill out with track contents.
         body = " " * 4
 
-        # Dunder members aren't represented. Public members (i.e. methods)
-        # aren't represented either.
+        # Represent every attribute in its decoded form.
         repr_attrs = {
-            key[1:]: value
-            for key, value in self.__dict__.items()
-            if not (
-                key.startswith(f"_{type(self).__name__}")
-                or not key.startswith("_")
-            )
+            key: self.__get(key)
+            for key in self.__attributes + DERIVED_ATTRIBUTES
         }
 
         # Build a representation of this track.
@@ -157,13 +302,21 @@ class RekordboxTrack(Track):
         """
         return self._Artist
 
+    def get_bit_rate(self) -> int:
+        """Gets the track bit rate.
+
+        Returns:
+            The bit rate of the track.
+        """
+        return self.__get_integer("BitRate")
+
     def get_bpm(self) -> float:
         """Gets the track BPM.
 
         Returns:
             A float representing BPM.
         """
-        return self._AverageBpm
+        return self.__get("AverageBpm")
 
     def get_comments(self) -> str:
         """Gets the track comments.
@@ -179,7 +332,7 @@ class RekordboxTrack(Track):
         Returns:
             A datetime representing the track's date added.
         """
-        return self._DateAdded
+        return self.__get("DateAdded")
 
     def get_genre_tags(self) -> List[str]:
         """Gets the genre tags of the track.
@@ -187,7 +340,7 @@ class RekordboxTrack(Track):
         Returns:
             A list of the track's genre tags.
         """
-        return self._Genre
+        return self.__get("Genre")
 
     def get_id(self) -> str:
         """Get the track ID.
@@ -219,7 +372,15 @@ class RekordboxTrack(Track):
         Returns:
             The Path for the location of the track.
         """
-        return self._Location
+        return self.__get("Location")
+
+    def get_play_count(self) -> int:
+        """Gets the number of times the track was played.
+
+        Returns:
+            The play count of the track.
+        """
+        return self.__get_integer("PlayCount")
 
     def get_rating(self) -> int:
         """Gets the rating of the track.
@@ -227,7 +388,7 @@ class RekordboxTrack(Track):
         Returns:
             The rating of the track.
         """
-        return self._Rating
+        return self.__get("Rating")
 
     def get_tags(self) -> List[str]:
         """Gets the tags of the track.
@@ -235,7 +396,15 @@ class RekordboxTrack(Track):
         Returns:
             A set of the track's tags.
         """
-        return self._Tags
+        return self.__get("Tags")
+
+    def get_total_time(self) -> int:
+        """Gets the duration of the track.
+
+        Returns:
+            The duration of the track in seconds.
+        """
+        return self.__get_integer("TotalTime")
 
     def get_year(self) -> str:
         """Gets the year of the track.
@@ -245,6 +414,14 @@ class RekordboxTrack(Track):
         """
         return self._Year
 
+    def is_dirty(self) -> bool:
+        """Returns whether the track was modified since it was deserialized.
+
+        Returns:
+            Boolean representing whether this track was modified or not.
+        """
+        return self.__dirty
+
     def serialize(
         self, *args, playlist: bool = False, **kwargs
     ) -> bs4.element.Tag:
@@ -271,42 +448,59 @@ class RekordboxTrack(Track):
 
             return track_tag
 
-        # Dunder members aren't serialized. Public members (i.e. methods)
-        # aren't serialized either.
-        serialize_attrs = {
-            key[1:]: value
-            for key, value in self.__dict__.items()
-            if not (
-                key.startswith(f"_{type(self).__name__}")
-                or not key.startswith("_")
-                or key in ["_MyTags", "_Tags"]
-            )
-        }
+        # Serialize attributes into a TRACK Tag and its children.
+        attrs, children = self.serialize_attrs()
+        track_tag.attrs = attrs
+        for name, child_attrs in children:
+            tag = bs4.Tag(name=name, can_be_empty_element=True)
+            tag.attrs = child_attrs
+            track_tag.extend([bs4.NavigableString("\n"), tag])
+
+        # If this TRACK Tag has children, append a final newline character.
+        if children:
+            track_tag.append(bs4.NavigableString("\n"))
+
+        return track_tag
+
+    def serialize_attrs(
+        self,
+    ) -> Tuple[Dict[str, Any], List[Tuple[str, Dict[str, str]]]]:
+        """Serializes this track as the attributes and children of a TRACK Tag.
+
+        This allows a collection to write its tracks without building a
+        BeautifulSoup Tag for each of them.
+
+        Raises:
+            ValueError: The DateAdded attribute must serialize into its
+                original format.
+
+        Returns:
+            Tuple of the TRACK Tag attributes, in their original order, and a
+                list of the names and attributes of its TEMPO and
+                POSITION_MARK children.
+        """
+        attrs = {}
+        children = []
+
+        for key, value in self.__attribute_items():
+            # MyTags and Tags are derived from other attributes.
+            if key in ["MyTags", "Tags"]:
+                continue
 
-        # Serialize attributes into a TRACK Tag.
-        for key, value in serialize_attrs.items():
             # Beat grid and hot cue data is serialized as TEMPO and
             # POSITION_MARK Tags, respectively.
             if key in ["beat_grid", "hot_cues"]:
-                for val in value:
-                    tag = bs4.Tag(
-                        name="POSITION_MARK" if key == "hot_cues" else "TEMPO",
-                        can_be_empty_element=True,
-                    )
-                    tag.attrs = val
-                    track_tag.extend([bs4.NavigableString("\n"), tag])
+                name = "POSITION_MARK" if key == "hot_cues" else "TEMPO"
+                children.extend((name, val) for val in value)
+                continue
+
+            # Attributes that were never decoded are serialized as they were.
+            if self.__is_undecoded(key):
+                attrs[key] = value
                 continue
 
             # Cast integers back into a string.
-            if key in [
-                "BitRate",
-                "DiscNumber",
-                "PlayCount",
-                "SampleRate",
-                "Size",
-                "TotalTime",
-                "TrackNumber",
-            ]:
+            if key in INTEGER_ATTRIBUTES:
                 value = str(value)
 
             # Increase BPM precision to make serialization 100% symmetrical.
@@ -360,13 +554,21 @@ class RekordboxTrack(Track):
                 }.get(value)
 
             # Otherwise the data is serialized as TRACK Tag attributes.
-            track_tag[key] = value
+            attrs[key] = value
 
-        # If this TRACK Tag has children, append a final newline character.
-        if len(track_tag) > 1:
-            track_tag.append(bs4.NavigableString("\n"))
+        return attrs, children
 
-        return track_tag
+    def set_genre_tags(self, genre_tags: List[str]):
+        """Sets the genre tags of a track.
+
+        Args:
+            genre_tags: Genre tags to set.
+        """
+        self.__dirty = True
+        self._Genre = list(genre_tags)  # pylint: disable=attribute-defined-outside-init,invalid-name
+        self._Tags = self._Genre + self.__get("MyTags")
+        self._invalidate_normalized_tags()
+        self._mutated()
 
     @make_path
     def set_location(self, location: Path):
@@ -375,7 +577,9 @@ class RekordboxTrack(Track):
         Args:
             location: New location of the track.
         """
+        self.__dirty = True
         self._Location = location  # pylint: disable=attribute-defined-outside-init,invalid-name
+        self._mutated()
 
     def set_track_number(self, number: int):
         """Sets the track number of a track.
@@ -383,4 +587,6 @@ class RekordboxTrack(Track):
         Args:
             number: Number to set for TrackNumber.
         """
+        self.__dirty = True
         self._TrackNumber = number  # pylint: disable=attribute-defined-outside-init,invalid-name
+        self._mutated()
@@ -0,0 +1,307 @@
+"""This module contains the SelectorIndex class.
+
+SelectorIndex answers the selectors of combiner playlists without visiting
+every track of a Collection. The values of each numerical field (BPM, rating,
+and year) are stored in a sorted list alongside the ordinals of the tracks
+having them, so the tracks matching a value or range of values are a slice
+found by binary search. Likewise, the ordinals of the tracks are sorted by
+their date added with that date truncated to the year, month, and day so that
+date selectors of any precision are answered by binary search.
+
+String fields (artist, comment, key, and label) are lowercased and indexed by
+their trigrams. A wildcard selector is then only verified against the tracks
+having every trigram of its literal parts.
+
+The index of each field is built the first time a selector for that field is
+answered so that lazily decoded tracks only decode the fields being selected.
+"""
+
+import re
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set, Tuple, Union
+
+from djtools.collection.base_track import Track
+from djtools.collection.tag_index import REGEX_SPECIAL_CHARACTERS
+
+
+DATE_TRUNCATIONS = {
+    "%Y": lambda date: datetime(date.year, 1, 1),
+    "%Y-%m": lambda date: datetime(date.year, date.month, 1),
+    "%Y-%m-%d": lambda date: datetime(date.year, date.month, date.day),
+}
+
+NUMERICAL_FIELDS = ("bpm", "rating", "year")
+
+
+class SelectorIndex:
+    "Sorted indexes of the tracks in a collection for answering selectors."
+
+    def __init__(self, tracks: Dict[str, Track]):
+        """Constructor.
+
+        Args:
+            tracks: Dict of tracks keyed by track ID.
+        """
+        self._track_ids = list(tracks)
+        self._tracks = list(tracks.values())
+
+        # Sorted indexes of numerical fields and dates added, and trigram
+        # indexes of string fields, which are built on demand.
+        self._numerical = {}
+        self._dates = None
+        self._strings = {}
+
+    def __len__(self) -> int:
+        """Returns the number of tracks in the index.
+
+        Returns:
+            Number of tracks.
+        """
+        return len(self._tracks)
+
+    def _get_date_index(self) -> Tuple[List[int], Dict[str, List[datetime]]]:
+        """Gets the index of the dates added, building it if it's unseen.
+
+        Truncating dates preserves their order so one sort serves every
+        precision.
+
+        Returns:
+            Tuple of the ordinals of the tracks sorted by date added and the
+                sorted dates added truncated to each date format.
+        """
+        if self._dates is not None:
+            return self._dates
+
+        dates = sorted(
+            (track.get_date_added(), ordinal)
+            for ordinal, track in enumerate(self._tracks)
+            if track.get_date_added()
+        )
+        self._dates = (
+            [ordinal for _, ordinal in dates],
+            {
+                date_format: [truncate(date) for date, _ in dates]
+                for date_format, truncate in DATE_TRUNCATIONS.items()
+            },
+        )
+
+        return self._dates
+
+    def _get_numerical_index(self, field: str) -> Tuple[List[int], List[int]]:
+        """Gets the index of a numerical field, building it if it's unseen.
+
+        Args:
+            field: One of "bpm", "rating", or "year".
+
+        Returns:
+            Tuple of the sorted values of the field and the ordinals of the
+                tracks having them.
+        """
+        index = self._numerical.get(field)
+        if index is not None:
+            return index
+
+        column = []
+        for ordinal, track in enumerate(self._tracks):
+            if field == "bpm":
+                column.append((round(track.get_bpm()), ordinal))
+            elif field == "rating":
+                rating = track.get_rating()
+                if isinstance(rating, int):
+                    column.append((rating, ordinal))
+            else:
+                # Years that aren't a plain number can never match a selector.
+                year = str(track.get_year())
+                if year.isdigit() and year == str(int(year)):
+                    column.append((int(year), ordinal))
+        column.sort()
+        index = self._numerical[field] = (
+            [value for value, _ in column],
+            [ordinal for _, ordinal in column],
+        )
+
+        return index
+
+    def _get_string_index(
+        self, getter: str
+    ) -> Tuple[Dict[int, str], Dict[str, List[int]], Dict[str, Set[int]]]:
+        """Gets the index of a string field, building it if it's unseen.
+
+        Args:
+            getter: Name of the Track method that gets the field.
+
+        Returns:
+            Tuple of the lowercased values keyed by track ordinal, the
+                ordinals of the tracks keyed by value, and the ordinals of the
+                tracks keyed by the trigrams of their value.
+        """
+        index = self._strings.get(getter)
+        if index is not None:
+            return index
+
+        values = {}
+        exact = defaultdict(list)
+        trigrams = defaultdict(set)
+        for ordinal, track in enumerate(self._tracks):
+            value = getattr(track, getter)()
+            if not value:
+                continue
+            value = value.lower()
+            values[ordinal] = value
+            exact[value].append(ordinal)
+            for start in range(len(value) - 2):
+                trigrams[value[start : start + 3]].add(ordinal)
+        index = self._strings[getter] = (values, dict(exact), dict(trigrams))
+
+        return index
+
+    def _to_tracks(self, ordinals: Iterable[int]) -> Dict[str, Track]:
+        """Maps track ordinals back to tracks.
+
+        Args:
+            ordinals: Track ordinals.
+
+        Returns:
+            Dict of tracks, in collection order, keyed by track ID.
+        """
+        return {
+            self._track_ids[ordinal]: self._tracks[ordinal]
+            for ordinal in sorted(ordinals)
+        }
+
+    def get_date_tracks(
+        self, inequality: Optional[str], date: datetime, date_format: str
+    ) -> Dict[str, Track]:
+        """Gets the tracks with a date added matching a date selector.
+
+        Dates added are truncated to the precision of the date format before
+        they're compared with the date.
+
+        Args:
+            inequality: One of ">", ">=", "<", "<=" or None to select tracks
+                added on the same date.
+            date: Date to compare dates added with.
+            date_format: Format of the date, "%Y", "%Y-%m", or "%Y-%m-%d".
+
+        Returns:
+            Dict of tracks, in collection order, keyed by track ID.
+        """
+        date_ordinals, truncated_dates = self._get_date_index()
+        dates = truncated_dates[date_format]
+        if not inequality:
+            date = DATE_TRUNCATIONS[date_format](date)
+            ordinals = date_ordinals[
+                bisect_left(dates, date) : bisect_right(dates, date)
+            ]
+        elif inequality == ">":
+            ordinals = date_ordinals[bisect_right(dates, date) :]
+        elif inequality == ">=":
+            ordinals = date_ordinals[bisect_left(dates, date) :]
+        elif inequality == "<":
+            ordinals = date_ordinals[: bisect_left(dates, date)]
+        else:
+            ordinals = date_ordinals[: bisect_right(dates, date)]
+
+        return self._to_tracks(ordinals)
+
+    @staticmethod
+    def get_numerical_range(
+        value: Union[str, Tuple[str, ...]],
+    ) -> Optional[Tuple[int, int]]:
+        """Gets the range of a parsed numerical selector.
+
+        Args:
+            value: A numerical value or a tuple of the values in a range, as
+                parsed by `parse_numerical_selectors`.
+
+        Returns:
+            Smallest and largest values of the range or None if no track value
+                can match the selector.
+        """
+        if isinstance(value, str):
+            # Values are compared as strings, so a number with leading zeros
+            # never matches.
+            if value != str(int(value)):
+                return None
+            return int(value), int(value)
+
+        if not value:
+            return None
+
+        return int(value[0]), int(value[-1])
+
+    def get_numerical_tracks(self, low: int, high: int) -> Dict[str, Track]:
+        """Gets the tracks with a BPM, rating, or year within a range.
+
+        BPMs are rounded to the nearest integer.
+
+        Args:
+            low: Smallest value in the range.
+            high: Largest value in the range.
+
+        Returns:
+            Dict of tracks, in collection order, keyed by track ID.
+        """
+        ordinals = set()
+        for field in NUMERICAL_FIELDS:
+            values, field_ordinals = self._get_numerical_index(field)
+            ordinals.update(
+                field_ordinals[
+                    bisect_left(values, low) : bisect_right(values, high)
+                ]
+            )
+
+        return self._to_tracks(ordinals)
+
+    def get_string_tracks(
+        self, getter: str, selector_value: str
+    ) -> Dict[str, Track]:
+        """Gets the tracks with a string field matching a string selector.
+
+        Matching is case-insensitive. A "*" in the selector matches any
+        sub-string and the rest of the selector may match anywhere in the
+        field.
+
+        Args:
+            getter: Name of the Track method that gets the field.
+            selector_value: Value of the string selector.
+
+        Returns:
+            Dict of tracks, in collection order, keyed by track ID.
+        """
+        values, exact, trigrams = self._get_string_index(getter)
+        selector_value = selector_value.lower()
+        if "*" not in selector_value:
+            return self._to_tracks(exact.get(selector_value, []))
+
+        # A matching value contains every literal part of the selector, and
+        # so every trigram of those parts. Selectors with special characters
+        # are matched as regular expressions, where an alternation in one
+        # part may match without the other parts, so they can't narrow the
+        # candidates.
+        parts = selector_value.split("*")
+        if any(
+            char in part for part in parts for char in REGEX_SPECIAL_CHARACTERS
+        ):
+            parts = []
+        candidates = None
+        for part in parts:
+            for start in range(len(part) - 2):
+                ordinals = trigrams.get(part[start : start + 3], set())
+                candidates = (
+                    ordinals
+                    if candidates is None
+                    else candidates.intersection(ordinals)
+                )
+        if candidates is None:
+            candidates = values
+
+        exp = re.compile(r".*".join(selector_value.split("*")))
+
+        return self._to_tracks(
+            ordinal
+            for ordinal in candidates
+            if exp.search(values[ordinal]) or values[ordinal] == selector_value
+        )
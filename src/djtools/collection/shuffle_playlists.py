@@ -17,6 +17,9 @@ from djtools.collection.platform_registry import PLATFORM_REGISTRY
 from djtools.utils.helpers import make_path
 
 
+# pylint: disable=duplicate-code
+
+
 logger = logging.getLogger(__name__)
 BaseConfig = Type["BaseConfig"]
 
@@ -32,7 +35,10 @@ def shuffle_playlists(config: BaseConfig, path: Optional[Path] = None):
     """
     # Load collection.
     collection = PLATFORM_REGISTRY[config.collection.platform]["collection"](
-        path=config.collection.collection_path
+        path=config.collection.collection_path,
+        loader=config.collection.collection_loader,
+        lazy=config.collection.collection_lazy_decoding,
+        snapshot=config.collection.collection_snapshot,
     )
 
     # Build a dict of tracks to shuffle from the provided list of playlists.
@@ -0,0 +1,400 @@
+"""This module contains the TagIndex class.
+
+TagIndex indexes the tracks having each tag as a bitset: a Python int where
+bit `i` is set if the track with ordinal `i` has the tag. Track ordinals are
+dense integers assigned in the order tracks are first seen. Boolean
+expressions over tags are then evaluated with bitwise operations rather than
+by hashing track IDs, and the results are mapped back to tracks only when
+they're needed.
+"""
+
+import hashlib
+import re
+from bisect import bisect_left
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional
+
+from djtools.collection.base_track import Track
+
+
+REGEX_SPECIAL_CHARACTERS = set(".^$*+?{}[]\\|()")
+
+
+def intersection(bitset_a: int, bitset_b: int) -> int:
+    """Returns the tracks in both bitsets.
+
+    Args:
+        bitset_a: Bitset of track ordinals.
+        bitset_b: Bitset of track ordinals.
+
+    Returns:
+        Bitset of track ordinals.
+    """
+    return bitset_a & bitset_b
+
+
+def union(bitset_a: int, bitset_b: int) -> int:
+    """Returns the tracks in either bitset.
+
+    Args:
+        bitset_a: Bitset of track ordinals.
+        bitset_b: Bitset of track ordinals.
+
+    Returns:
+        Bitset of track ordinals.
+    """
+    return bitset_a | bitset_b
+
+
+def difference(bitset_a: int, bitset_b: int) -> int:
+    """Returns the tracks in the first bitset but not the second.
+
+    Args:
+        bitset_a: Bitset of track ordinals.
+        bitset_b: Bitset of track ordinals.
+
+    Returns:
+        Bitset of track ordinals.
+    """
+    return bitset_a & ~bitset_b
+
+
+def iter_ordinals(bitset: int) -> Iterator[int]:
+    """Yields the track ordinals in a bitset in ascending order.
+
+    Args:
+        bitset: Bitset of track ordinals.
+
+    Yields:
+        Track ordinal.
+    """
+    # The binary string is reversed so that the index of each "1" is the
+    # ordinal it represents.
+    bits = bin(bitset)[:1:-1]
+    ordinal = bits.find("1")
+    while ordinal != -1:
+        yield ordinal
+        ordinal = bits.find("1", ordinal + 1)
+
+
+def popcount(bitset: int) -> int:
+    """Returns the number of tracks in a bitset.
+
+    Args:
+        bitset: Bitset of track ordinals.
+
+    Returns:
+        Number of tracks.
+    """
+    return bin(bitset).count("1")
+
+
+def to_bitset(ordinals: Iterable[int]) -> int:
+    """Builds a bitset from track ordinals.
+
+    Args:
+        ordinals: Track ordinals.
+
+    Returns:
+        Bitset of track ordinals.
+    """
+    ordinals = list(ordinals)
+    if not ordinals:
+        return 0
+
+    # Setting bits in a bytearray avoids creating a new int for every
+    # ordinal.
+    buffer = bytearray(max(ordinals) // 8 + 1)
+    for ordinal in ordinals:
+        buffer[ordinal >> 3] |= 1 << (ordinal & 7)
+
+    return int.from_bytes(buffer, "little")
+
+
+class TagIndex:
+    "Index of the tracks having each tag as bitsets of track ordinals."
+
+    def __init__(
+        self,
+        tags_tracks: Mapping[str, Dict[str, Track]],
+        tracks: Optional[Dict[str, Track]] = None,
+    ):
+        """Constructor.
+
+        Bitsets are built the first time a tag is looked up.
+
+        Args:
+            tags_tracks: Dict of tags to tracks.
+            tracks: Tracks to assign the first ordinals to, in order, which is
+                typically all the tracks in a collection.
+        """
+        self._bitsets = {}
+        self._cardinalities = {}
+        self._fingerprints = {}
+        self._ordinals = {}
+        self._sorted_tags = None
+        self._track_ids = []
+        self._tracks = []
+        self._tags_tracks = tags_tracks
+        self._wildcard_bitsets = {}
+        self._wildcard_tags = {}
+        self._add_tracks(tracks or {})
+
+    def __contains__(self, tag: str) -> bool:
+        """Returns whether any tracks are indexed for a tag.
+
+        Args:
+            tag: Tag to look for.
+
+        Returns:
+            Whether the tag is indexed or not.
+        """
+        return tag in self._tags_tracks
+
+    def __iter__(self) -> Iterator[str]:
+        """Yields the indexed tags.
+
+        Yields:
+            Tag.
+        """
+        yield from self._tags_tracks
+
+    def __len__(self) -> int:
+        """Returns the number of tracks that have an ordinal.
+
+        Returns:
+            Number of tracks.
+        """
+        return len(self._track_ids)
+
+    @classmethod
+    def from_bitsets(cls, bitsets: Dict[str, int]) -> "TagIndex":
+        """Builds an index from the bitsets of another index.
+
+        The index has no tracks so its bitsets can be evaluated but not mapped
+        back to tracks.
+
+        Args:
+            bitsets: Bitsets of track ordinals keyed by tag.
+
+        Returns:
+            TagIndex of the bitsets.
+        """
+        index = cls(dict.fromkeys(bitsets, {}))
+        index._bitsets.update(bitsets)  # pylint: disable=protected-access
+
+        return index
+
+    def _add_tracks(self, tracks: Dict[str, Track]) -> List[int]:
+        """Gets the ordinals of tracks, assigning new ones to unseen tracks.
+
+        Args:
+            tracks: Dict of tracks keyed by track ID.
+
+        Returns:
+            List of track ordinals.
+        """
+        ordinals = []
+        for track_id, track in tracks.items():
+            ordinal = self._ordinals.get(track_id)
+            if ordinal is None:
+                ordinal = self._ordinals[track_id] = len(self._track_ids)
+                self._track_ids.append(track_id)
+                self._tracks.append(track)
+            ordinals.append(ordinal)
+
+        return ordinals
+
+    def get_bitset(self, tag: str) -> int:
+        """Returns the bitset of the tracks having a tag.
+
+        Args:
+            tag: Tag to get tracks for.
+
+        Returns:
+            Bitset of track ordinals.
+        """
+        bitset = self._bitsets.get(tag)
+        if bitset is None:
+            bitset = self._bitsets[tag] = self.to_bitset(
+                self._tags_tracks.get(tag, {})
+            )
+
+        return bitset
+
+    def get_cardinality(self, tag: str) -> int:
+        """Returns the number of tracks having a tag.
+
+        Args:
+            tag: Tag to count tracks for.
+
+        Returns:
+            Number of tracks.
+        """
+        cardinality = self._cardinalities.get(tag)
+        if cardinality is None:
+            cardinality = self._cardinalities[tag] = popcount(
+                self.get_bitset(tag)
+            )
+
+        return cardinality
+
+    def get_fingerprint(self, tag: str) -> str:
+        """Returns a fingerprint of the tracks having a tag.
+
+        The fingerprint is a hash of the IDs of the tracks having the tag so
+        it changes whenever those tracks do.
+
+        Args:
+            tag: Tag to fingerprint the tracks of.
+
+        Returns:
+            Hex digest of the tracks.
+        """
+        fingerprint = self._fingerprints.get(tag)
+        if fingerprint is None:
+            digest = hashlib.sha1()
+            for track_id in self._tags_tracks.get(tag, {}):
+                digest.update(f"{track_id}\n".encode())
+            fingerprint = self._fingerprints[tag] = digest.hexdigest()
+
+        return fingerprint
+
+    def get_tracks(self, track_ids: Iterable[str]) -> Dict[str, Track]:
+        """Returns the tracks for some track IDs.
+
+        Args:
+            track_ids: IDs of the tracks.
+
+        Returns:
+            Dict of tracks keyed by track ID.
+        """
+        return {
+            track_id: self._tracks[self._ordinals[track_id]]
+            for track_id in track_ids
+            if track_id in self._ordinals
+        }
+
+    def get_wildcard_bitset(self, pattern: str) -> int:
+        """Returns the bitset of the tracks having a tag matching a pattern.
+
+        A "*" in the pattern matches any sub-string. Each distinct pattern is
+        resolved once.
+
+        Args:
+            pattern: Tag containing wildcards.
+
+        Returns:
+            Bitset of track ordinals.
+        """
+        bitset = self._wildcard_bitsets.get(pattern)
+        if bitset is None:
+            bitset = 0
+            for tag in self.get_wildcard_tags(pattern):
+                bitset |= self.get_bitset(tag)
+            self._wildcard_bitsets[pattern] = bitset
+
+        return bitset
+
+    def get_wildcard_fingerprint(self, pattern: str) -> str:
+        """Returns a fingerprint of the tracks having a tag matching a pattern.
+
+        Args:
+            pattern: Tag containing wildcards.
+
+        Returns:
+            Hex digest of the matching tags and their fingerprints.
+        """
+        digest = hashlib.sha1()
+        for tag in self.get_wildcard_tags(pattern):
+            digest.update(f"{tag}\n{self.get_fingerprint(tag)}\n".encode())
+
+        return digest.hexdigest()
+
+    def get_wildcard_tags(self, pattern: str) -> List[str]:
+        """Returns the tags matching a pattern.
+
+        A "*" in the pattern matches any sub-string. When the pattern doesn't
+        start with a wildcard, only the tags sharing its prefix are matched
+        against it.
+
+        Args:
+            pattern: Tag containing wildcards.
+
+        Returns:
+            Sorted list of tags.
+        """
+        tags = self._wildcard_tags.get(pattern)
+        if tags is not None:
+            return tags
+
+        if self._sorted_tags is None:
+            self._sorted_tags = sorted(self._tags_tracks)
+        exp = re.compile(r".*".join(pattern.split("*")) + "$")
+        prefix = pattern.split("*", maxsplit=1)[0]
+        # The pattern is a regular expression so a prefix with special
+        # characters can't be used to narrow the candidate tags.
+        if any(char in prefix for char in REGEX_SPECIAL_CHARACTERS):
+            prefix = ""
+        tags = self._wildcard_tags[pattern] = []
+        for index in range(
+            bisect_left(self._sorted_tags, prefix), len(self._sorted_tags)
+        ):
+            tag = self._sorted_tags[index]
+            if not tag.startswith(prefix):
+                break
+            if exp.match(tag):
+                tags.append(tag)
+
+        return tags
+
+    def set_tags_tracks(self, tags_tracks: Mapping[str, Dict[str, Track]]):
+        """Replaces the tags of the index, keeping the ordinals of its tracks.
+
+        The bitsets, cardinalities, and fingerprints of tags whose tracks are
+        the very same dict as before are kept while those of every other tag,
+        and every resolved wildcard pattern, are discarded.
+
+        Args:
+            tags_tracks: Dict of tags to tracks.
+        """
+        for cache in [self._bitsets, self._cardinalities, self._fingerprints]:
+            for tag in list(cache):
+                if tags_tracks.get(tag) is not self._tags_tracks.get(tag):
+                    del cache[tag]
+        self._sorted_tags = None
+        self._tags_tracks = tags_tracks
+        self._wildcard_bitsets = {}
+        self._wildcard_tags = {}
+
+    def to_bitset(self, tracks: Dict[str, Track]) -> int:
+        """Builds the bitset of some tracks.
+
+        Args:
+            tracks: Dict of tracks keyed by track ID.
+
+        Returns:
+            Bitset of track ordinals.
+        """
+        return to_bitset(self._add_tracks(tracks))
+
+    def to_bitsets(self) -> Dict[str, int]:
+        """Returns the bitset of every tag.
+
+        Returns:
+            Bitsets of track ordinals keyed by tag.
+        """
+        return {tag: self.get_bitset(tag) for tag in self._tags_tracks}
+
+    def to_tracks(self, bitset: int) -> Dict[str, Track]:
+        """Maps a bitset back to tracks.
+
+        Args:
+            bitset: Bitset of track ordinals.
+
+        Returns:
+            Dict of tracks, ordered by ordinal, keyed by track ID.
+        """
+        return {
+            self._track_ids[ordinal]: self._tracks[ordinal]
+            for ordinal in iter_ordinals(bitset)
+        }
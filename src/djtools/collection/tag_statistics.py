@@ -0,0 +1,153 @@
+"""This module contains the TagStatistics class.
+
+TagStatistics computes the histogram of the genre and other tags of the tracks
+in every playlist within a folder. Rather than visiting the tags of each track
+of each playlist, the tracks having each tag and the tracks in each playlist
+are indexed as bitsets of track ordinals so that the number of tracks in a
+playlist having a tag is the popcount of the intersection of two bitsets.
+
+The histograms are used for the verbose output of the playlist builder and may
+be written as JSON or CSV.
+"""
+
+import csv
+import json
+import logging
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from djtools.collection.base_playlist import Playlist
+from djtools.collection.base_track import Track
+from djtools.collection.tag_index import TagIndex, intersection, popcount
+
+
+logger = logging.getLogger(__name__)
+
+
+class TagStatistics:
+    "Histograms of the tags of the tracks in each playlist of a folder."
+
+    def __init__(self, playlist: Playlist):
+        """Computes the tag histogram of each playlist.
+
+        Args:
+            playlist: Playlist, or folder of playlists, to compute the tag
+                histograms of.
+        """
+        playlists = self._get_playlists(playlist)
+
+        # Index the tracks having each tag, as a genre tag or otherwise, with
+        # the same ordinals as the tracks in each playlist.
+        tracks = {}
+        for _, _playlist in playlists:
+            tracks.update(_playlist.get_tracks())
+        genre_tags_tracks = defaultdict(dict)
+        other_tags_tracks = defaultdict(dict)
+        for track_id, track in tracks.items():
+            for tag in track.get_genre_tags():
+                genre_tags_tracks[tag][track_id] = track
+            for tag in track.get_other_tag_set():
+                other_tags_tracks[tag][track_id] = track
+        tag_index = TagIndex({}, tracks)
+        genre_bitsets = self._to_bitsets(tag_index, genre_tags_tracks)
+        other_bitsets = self._to_bitsets(tag_index, other_tags_tracks)
+        tag_bitsets = {
+            tag: genre_bitsets.get(tag, 0) | other_bitsets.get(tag, 0)
+            for tag in set(genre_bitsets).union(other_bitsets)
+        }
+
+        self.statistics = []
+        for path, _playlist in playlists:
+            bitset = tag_index.to_bitset(_playlist.get_tracks())
+            histograms = {}
+            for tag_subset, bitsets in [
+                ("genre", genre_bitsets),
+                ("other", other_bitsets),
+            ]:
+                histograms[tag_subset] = {
+                    tag: popcount(intersection(bitset, tag_bitsets[tag]))
+                    for tag, tag_bitset in bitsets.items()
+                    if intersection(bitset, tag_bitset)
+                }
+            self.statistics.append(
+                {
+                    "name": _playlist.get_name(),
+                    "path": path,
+                    "tracks": popcount(bitset),
+                    **histograms,
+                }
+            )
+
+    @staticmethod
+    def _get_playlists(playlist: Playlist) -> List[Tuple[List[str], Playlist]]:
+        """Gets the playlists within a folder.
+
+        Args:
+            playlist: Playlist, or folder of playlists.
+
+        Returns:
+            List of the names of the folders leading to, and including, each
+                playlist and the playlist.
+        """
+        playlists = []
+        playlist_stack = [([playlist.get_name()], playlist)]
+        while playlist_stack:
+            path, item = playlist_stack.pop()
+            if item.is_folder():
+                playlist_stack.extend(
+                    (path + [_playlist.get_name()], _playlist)
+                    for _playlist in item.get_playlists()
+                )
+                continue
+            playlists.append((path, item))
+
+        return playlists
+
+    @staticmethod
+    def _to_bitsets(
+        tag_index: TagIndex, tags_tracks: Dict[str, Dict[str, Track]]
+    ) -> Dict[str, int]:
+        """Builds the bitsets of the tracks having each tag.
+
+        Args:
+            tag_index: Index assigning ordinals to tracks.
+            tags_tracks: Dict of tags to tracks.
+
+        Returns:
+            Bitsets of track ordinals keyed by tag, in sorted order.
+        """
+        return {
+            tag: tag_index.to_bitset(tags_tracks[tag])
+            for tag in sorted(tags_tracks)
+        }
+
+    def save(self, path: Path):
+        """Writes the tag histograms as JSON or, for a ".csv" path, CSV.
+
+        Args:
+            path: Path to write the tag histograms to.
+        """
+        try:
+            with open(path, mode="w", encoding="utf-8", newline="") as _file:
+                if path.suffix.lower() == ".csv":
+                    writer = csv.writer(_file)
+                    writer.writerow(["playlist", "tag_type", "tag", "tracks"])
+                    for statistics in self.statistics:
+                        for tag_subset in ["genre", "other"]:
+                            for tag, count in statistics[tag_subset].items():
+                                writer.writerow(
+                                    [
+                                        "/".join(statistics["path"]),
+                                        tag_subset,
+                                        tag,
+                                        count,
+                                    ]
+                                )
+                else:
+                    json.dump(self.statistics, _file, indent=2)
+        except OSError as exc:
+            logger.warning(f"Failed to write the tag statistics {path}: {exc}")
+            return
+
+        logger.info(f"Wrote the tag statistics to {path}")
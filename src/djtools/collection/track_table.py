@@ -0,0 +1,177 @@
+"""This module contains the TrackTable class.
+
+TrackTable is a columnar representation of the tracks in a Collection. Every
+column is a NumPy array with one element per track, ordered the same as the
+tracks of the Collection, so that analytics and selectors may be computed with
+vectorized operations rather than by calling the getters of every track.
+
+Track tags, of which each track may have any number, are stored in compressed
+sparse row (CSR) form: the tags of the track at row `i` are the ordinals
+`tag_indices[tag_indptr[i]:tag_indptr[i + 1]]` into the sorted `tags`
+vocabulary.
+"""
+
+from typing import Dict, Iterable, List
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+from djtools.collection.base_track import Track
+
+
+class TrackTable:
+    "Columnar representation of the tracks in a collection."
+
+    def __init__(self, tracks: Dict[str, Track]):
+        """Builds the columns of the table from a dict of tracks.
+
+        Args:
+            tracks: Dict of tracks keyed by track ID.
+
+        Raises:
+            RuntimeError: NumPy must be installed.
+        """
+        if np is None:
+            raise RuntimeError(
+                "NumPy is required to build a TrackTable; install it with "
+                '`pip install "djtools[analytics]"`'
+            )
+
+        self._tracks = list(tracks.values())
+        self._rows = {track_id: row for row, track_id in enumerate(tracks)}
+        self.ids = np.array(list(tracks), dtype=object)
+
+        # Collect every column in a single pass over the tracks.
+        columns = {
+            "bpm": [],
+            "rating": [],
+            "year": [],
+            "date_added": [],
+            "play_count": [],
+            "bit_rate": [],
+            "total_time": [],
+        }
+        vocabulary = {}
+        tag_indices = []
+        tag_indptr = [0]
+        for track in self._tracks:
+            columns["bpm"].append(track.get_bpm())
+            # Unrecognized ratings and years are represented as zero.
+            columns["rating"].append(track.get_rating() or 0)
+            year = str(track.get_year())
+            columns["year"].append(int(year) if year.isdigit() else 0)
+            columns["date_added"].append(track.get_date_added())
+            columns["play_count"].append(track.get_play_count())
+            columns["bit_rate"].append(track.get_bit_rate())
+            columns["total_time"].append(track.get_total_time())
+            tag_indices.extend(
+                vocabulary.setdefault(tag, len(vocabulary))
+                for tag in track.get_tags()
+            )
+            tag_indptr.append(len(tag_indices))
+
+        self.bpm = np.array(columns["bpm"], dtype=np.float64)
+        self.rating = np.array(columns["rating"], dtype=np.int64)
+        self.year = np.array(columns["year"], dtype=np.int64)
+        # Dates added are stored as the number of days since the Unix epoch.
+        self.date_added = np.array(
+            columns["date_added"], dtype="datetime64[D]"
+        ).astype(np.int64)
+        self.play_count = np.array(columns["play_count"], dtype=np.int64)
+        self.bit_rate = np.array(columns["bit_rate"], dtype=np.int64)
+        self.total_time = np.array(columns["total_time"], dtype=np.int64)
+
+        # Ordinals are assigned in the order tags are first seen, so they're
+        # remapped onto a sorted vocabulary.
+        self.tags = sorted(vocabulary)
+        remap = np.empty(len(vocabulary), dtype=np.int64)
+        remap[[vocabulary[tag] for tag in self.tags]] = np.arange(
+            len(self.tags)
+        )
+        self.tag_indices = remap[np.array(tag_indices, dtype=np.int64)]
+        self.tag_indptr = np.array(tag_indptr, dtype=np.int64)
+        self._tag_ordinals = {
+            tag: index for index, tag in enumerate(self.tags)
+        }
+
+    def __len__(self) -> int:
+        """Returns the number of tracks in the table.
+
+        Returns:
+            Number of tracks.
+        """
+        return len(self._tracks)
+
+    def get_rows(self, track_ids: Iterable[str]) -> "np.ndarray":
+        """Returns the rows of the table for some tracks.
+
+        Args:
+            track_ids: IDs of the tracks.
+
+        Returns:
+            Array of row indices.
+        """
+        return np.array(
+            [self._rows[track_id] for track_id in track_ids], dtype=np.int64
+        )
+
+    def get_tag_counts(self) -> Dict[str, int]:
+        """Returns the number of occurrences of each tag.
+
+        Returns:
+            Dict of tag counts keyed by tag.
+        """
+        counts = np.bincount(self.tag_indices, minlength=len(self.tags))
+
+        return dict(zip(self.tags, counts.tolist()))
+
+    def get_tag_mask(self, tag: str) -> "np.ndarray":
+        """Returns a boolean mask of the tracks having a tag.
+
+        Args:
+            tag: Tag to look for.
+
+        Returns:
+            Boolean array which is True for the rows having the tag.
+        """
+        mask = np.zeros(len(self), dtype=bool)
+        ordinal = self._tag_ordinals.get(tag)
+        if ordinal is None:
+            return mask
+
+        # Map the positions of matching tag entries back to their rows.
+        positions = np.flatnonzero(self.tag_indices == ordinal)
+        mask[np.searchsorted(self.tag_indptr, positions, side="right") - 1] = (
+            True
+        )
+
+        return mask
+
+    def get_tracks(self, mask: "np.ndarray") -> Dict[str, Track]:
+        """Returns the tracks selected by a boolean mask.
+
+        Args:
+            mask: Boolean array with one element per row.
+
+        Returns:
+            Dict of the selected tracks keyed by track ID.
+        """
+        return {
+            self.ids[row]: self._tracks[row]
+            for row in np.flatnonzero(mask).tolist()
+        }
+
+    def get_track_tags(self, row: int) -> List[str]:
+        """Returns the tags of the track at a row.
+
+        Args:
+            row: Row of the track.
+
+        Returns:
+            List of the track's tags.
+        """
+        start, end = self.tag_indptr[row], self.tag_indptr[row + 1]
+
+        return [self.tags[index] for index in self.tag_indices[start:end]]
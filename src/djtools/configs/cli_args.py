@@ -67,6 +67,24 @@ def get_arg_parser() -> ArgumentParser:
         ),
         formatter_class=RawTextHelpFormatter,
     )
+    collection_parser.add_argument(
+        "--collection-loader",
+        type=str,
+        choices=["beautifulsoup", "iterparse"],
+        help=(
+            "Parser used to deserialize the collection. The iterparse loader "
+            "streams the collection incrementally which is faster and uses "
+            "far less memory for large collections."
+        ),
+    )
+    collection_parser.add_argument(
+        "--collection-lazy-decoding",
+        action="store_true",
+        help=(
+            "Flag to defer decoding track attributes until they're first "
+            "used so that operations only pay for the attributes they need."
+        ),
+    )
     collection_parser.add_argument(
         "--collection-path",
         type=_convert_to_paths,
@@ -87,6 +105,39 @@ def get_arg_parser() -> ArgumentParser:
         action="store_true",
         help="Flag to trigger building collection playlists.",
     )
+    collection_parser.add_argument(
+        "--collection-playlists-incremental",
+        action="store_true",
+        help=(
+            "Flag to store the results of combiner playlists next to the "
+            "collection so that later runs only evaluate those whose tags, "
+            "selectors, or referenced playlists changed."
+        ),
+    )
+    collection_parser.add_argument(
+        "--collection-playlists-processes",
+        type=int,
+        help=(
+            "Number of processes to evaluate combiner playlists with. By "
+            "default, they're evaluated in this process."
+        ),
+    )
+    collection_parser.add_argument(
+        "--collection-playlists-profile",
+        action="store_true",
+        help=(
+            "Flag to print the time spent on each combiner playlist, selector, "
+            "and playlist filter and write it as JSON next to the collection."
+        ),
+    )
+    collection_parser.add_argument(
+        "--collection-playlists-rebuild",
+        action="store_true",
+        help=(
+            "Flag to evaluate every combiner playlist even if "
+            '"--collection-playlists-incremental" has stored results for it.'
+        ),
+    )
     collection_parser.add_argument(
         "--collection-playlists-remainder",
         type=str,
@@ -98,6 +149,32 @@ def get_arg_parser() -> ArgumentParser:
             '(one for each tag) or an "Other" playlist based on this option.'
         ),
     )
+    collection_parser.add_argument(
+        "--collection-playlists-statistics",
+        type=_convert_to_paths,
+        help=(
+            "Path to write the tag statistics of each combiner playlist to as "
+            'JSON or, if the path ends with ".csv", CSV.'
+        ),
+    )
+    collection_parser.add_argument(
+        "--collection-playlists-watch",
+        action="store_true",
+        help=(
+            "Flag to keep running after building collection playlists and "
+            "rebuild them whenever the collection or the playlist config "
+            "changes."
+        ),
+    )
+    collection_parser.add_argument(
+        "--collection-snapshot",
+        action="store_true",
+        help=(
+            "Flag to cache the deserialized collection in a snapshot file "
+            "next to the collection so that later runs load it without "
+            "parsing the XML until the collection changes."
+        ),
+    )
     collection_parser.add_argument(
         "--copy-playlists",
         type=str,
@@ -100,7 +100,10 @@ def rewrite_track_paths(config: BaseConfig, other_user_collection: Path):
     """
     music_path = Path("DJ Music")
     collection = PLATFORM_REGISTRY[config.collection.platform]["collection"](
-        path=other_user_collection
+        path=other_user_collection,
+        loader=config.collection.collection_loader,
+        lazy=config.collection.collection_lazy_decoding,
+        snapshot=config.collection.collection_snapshot,
     )
     for track in collection.get_tracks().values():
         loc = track.get_location().as_posix()
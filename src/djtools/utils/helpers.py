@@ -313,7 +313,8 @@ def make_path(func: Callable) -> Callable:
         path_types = (pathlib.Path, typing.Union[pathlib.Path, None])
         num_args = 0
         num_kwargs = 0
-        type_hints = list(typing.get_type_hints(func).values())
+        type_hints_lookup = typing.get_type_hints(func)
+        type_hints = list(type_hints_lookup.values())
         sig = inspect.signature(func)
         for parameter in sig.parameters.values():
             if parameter.name == "self":
@@ -323,7 +324,8 @@ def make_path(func: Callable) -> Callable:
             else:
                 num_args += 1
         arg_type_hints = type_hints[:num_args]
-        kwarg_type_hints = type_hints[:num_kwargs]
+        # Keyword args are matched with their annotations by name.
+        kwarg_type_hints = [type_hints_lookup.get(key) for key in kwargs]
 
         # Convert each arg to a Path if the annotation type is pathlib.Path.
         args = list(args)
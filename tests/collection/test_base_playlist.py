@@ -1,8 +1,12 @@
 """Testing for the playlists module."""
 
+import pickle
+import re
+
 import pytest
 
-from djtools.collection.base_playlist import Playlist
+from djtools.collection.base_playlist import Playlist, PlaylistIndex
+from djtools.collection.rekordbox_playlist import RekordboxPlaylist
 
 
 # pylint:disable=missing-class-docstring,no-method-argument,arguments-differ,protected-access
@@ -36,3 +40,132 @@ def test_playlist_adds_aggregate_attribute(enable_aggregation):
 
     playlist = ConcretePlaylist(enable_aggregation=enable_aggregation)
     assert playlist._aggregate == enable_aggregation
+
+
+def _walk(playlist):
+    """Yields a playlist and the playlists within it in depth-first order."""
+    yield playlist
+    if playlist.is_folder():
+        for child in playlist:
+            yield from _walk(child)
+
+
+@pytest.fixture(name="playlist_tree")
+def playlist_tree_fixture():
+    """Fixture for a tree of playlists with repeated names."""
+    return RekordboxPlaylist.new_playlist(
+        "ROOT",
+        playlists=[
+            RekordboxPlaylist.new_playlist(
+                "Bass",
+                playlists=[
+                    RekordboxPlaylist.new_playlist("Dubstep", tracks={}),
+                    RekordboxPlaylist.new_playlist("Techno", tracks={}),
+                ],
+            ),
+            RekordboxPlaylist.new_playlist("Techno", tracks={}),
+            RekordboxPlaylist.new_playlist(
+                "Techno",
+                playlists=[
+                    RekordboxPlaylist.new_playlist("Dub Techno", tracks={})
+                ],
+            ),
+        ],
+    )
+
+
+@pytest.mark.parametrize(
+    "name,glob",
+    [
+        ("Techno", False),
+        ("ROOT", False),
+        ("missing", False),
+        ("*Techno", True),
+        ("Dub*", True),
+        ("*", True),
+    ],
+)
+def test_playlistindex_get_playlists(name, glob, playlist_tree):
+    """Test PlaylistIndex class."""
+    exp = re.compile(r".*".join(name.split("*")))
+    expected = [
+        playlist
+        for playlist in _walk(playlist_tree)
+        if (glob and re.search(exp, playlist.get_name()))
+        or (not glob and playlist.get_name() == name)
+    ]
+    assert PlaylistIndex(playlist_tree).get_playlists(name, glob) == expected
+    assert playlist_tree.get_playlists(name, glob=glob) == expected
+
+
+def test_playlistindex_get_playlists_by_path(playlist_tree):
+    """Test PlaylistIndex class."""
+    index = playlist_tree.get_index()
+    assert index.get_playlists_by_path([]) == [playlist_tree]
+    assert index.get_playlists_by_path(["Bass", "Techno"]) == [
+        playlist_tree[0][1]
+    ]
+    assert index.get_playlists_by_path(["Techno"]) == list(playlist_tree)[1:]
+    assert not index.get_playlists_by_path(["Dub Techno"])
+
+
+def test_playlist_index_is_kept_in_sync(playlist_tree):
+    """Test Playlist class."""
+    index = playlist_tree.get_index()
+    folder = RekordboxPlaylist.new_playlist(
+        "House", playlists=[RekordboxPlaylist.new_playlist("Tech", tracks={})]
+    )
+
+    # Appending to and removing from the indexed playlist updates its index
+    # in place.
+    playlist_tree.add_playlist(folder)
+    assert playlist_tree.get_index() is index
+    assert playlist_tree.get_playlists("Tech") == [folder[0]]
+    assert playlist_tree.get_playlists_by_path(["House", "Tech"]) == [
+        folder[0]
+    ]
+    assert playlist_tree.get_playlists("*Tech*", glob=True)[-1] is folder[0]
+    playlist_tree.remove_playlist(playlist_tree[1])
+    playlist_tree.remove_playlist(folder)
+    assert playlist_tree.get_index() is index
+    assert not playlist_tree.get_playlists("Tech")
+    assert not playlist_tree.get_playlists_by_path(["House"])
+    assert playlist_tree.get_playlists("Techno") == [
+        playlist_tree[0][1],
+        playlist_tree[1],
+    ]
+
+    # Inserting into, or modifying, the playlists within the indexed playlist
+    # makes its index stale.
+    playlist_tree.add_playlist(folder, index=0)
+    assert playlist_tree.get_index() is not index
+    assert playlist_tree.get_playlists("Tech") == [folder[0]]
+    index = playlist_tree.get_index()
+    folder.remove_playlist(folder[0])
+    assert playlist_tree.get_index() is not index
+    assert not playlist_tree.get_playlists("Tech")
+
+
+def test_playlist_index_is_only_invalidated_by_its_folders(playlist_tree):
+    """Test Playlist class."""
+    index = playlist_tree.get_index()
+    other_tree = RekordboxPlaylist.new_playlist(
+        "ROOT",
+        playlists=[RekordboxPlaylist.new_playlist("Techno", tracks={})],
+    )
+    other_index = other_tree.get_index()
+
+    # Modifying another playlist tree leaves the index current.
+    other_tree.add_playlist(
+        RekordboxPlaylist.new_playlist("House", tracks={}), index=0
+    )
+    assert playlist_tree.get_index() is index
+    assert other_tree.get_index() is not other_index
+
+    # An unpickled index is invalidated by the folders within it.
+    playlist_tree = pickle.loads(pickle.dumps(playlist_tree))
+    index = playlist_tree.get_index()
+    assert index.is_current()
+    playlist_tree[0].remove_playlist(playlist_tree[0][0])
+    assert playlist_tree.get_index() is not index
+    assert playlist_tree.get_playlists_by_path(["Bass", "Dubstep"]) == []
@@ -0,0 +1,357 @@
+"""Testing for the combiner_expressions module."""
+
+import re
+from unittest import mock
+
+import pytest
+
+from djtools.collection.combiner_expressions import (
+    BooleanNode,
+    CombinerExpressions,
+    _evaluate_expressions_in_process,
+    _initialize_expressions_process,
+)
+from djtools.collection.config import PlaylistConfigContent, PlaylistName
+from djtools.collection.helpers import parse_expression
+from djtools.collection.tag_index import TagIndex
+
+
+@pytest.mark.parametrize(
+    "operators,tags,expected",
+    [
+        (
+            ["&", "|", "~"],
+            ["Jungle", "Breaks", "Techno", "Tech House"],
+            {11, 12},
+        ),
+        (["~"], ["*House", "Bass House"], {3, 5, 6, 7, 8}),
+        (["&"], ["{All DnB}", "Dark"], {2}),
+    ],
+)
+def test_booleannode_evaluate(operators, tags, expected):
+    """Test for the BooleanNode class."""
+    tracks = {
+        "{All DnB}": [1, 2, 3],
+        "Acid House": [7, 8],
+        "Bass House": [9, 10],
+        "Breaks": [3, 4],
+        "Dark": [2, 11],
+        "Jungle": [1, 3],
+        "Tech House": [3, 5, 6],
+        "Techno": [11, 12],
+    }
+    tracks = {k: {x: None for x in v} for k, v in tracks.items()}
+    node = BooleanNode(tracks)
+    for operator in operators:
+        node.add_operator(operator)
+    for tag in tags:
+        node.add_operand(tag)
+    result = node.evaluate().keys()
+    assert result == expected
+
+
+@pytest.mark.parametrize(
+    "track_ids,operator,expected",
+    [
+        ([1, 1], "&", {1}),
+        ([1, 2], "&", {}),
+        ([1, 1], "|", {1}),
+        ([1, 2], "|", {1, 2}),
+        ([1, 1], "~", {}),
+        ([1, 2], "~", {1}),
+    ],
+)
+def test_booleannode_evaluates_two_sets_of_tracks_with_each_kind_of_operator(
+    track_ids, operator, expected
+):
+    """Test for the BooleanNode class."""
+    node = BooleanNode({})
+    for track_id in track_ids:
+        node.add_operand({track_id: None})
+    node.add_operator(operator)
+    result = node.evaluate().keys()
+    assert (result if result else dict(result)) == expected
+
+
+@pytest.mark.parametrize(
+    "tag,expected",
+    [
+        ("Techno", {1: None}),
+        ("*Techno", {1: None, 2: None}),
+        ("Techno*", {1: None, 3: None}),
+        ("*Techno*", {1: None, 2: None, 3: None}),
+    ],
+)
+def test_booleannode_gets_tracks(tag, expected):
+    """Test for the BooleanNode class."""
+    tags_tracks = {
+        "Techno": {1: None},
+        "Hard Techno": {2: None},
+        "Techno Stuff": {3: None},
+    }
+    node = BooleanNode(tags_tracks)
+    assert (
+        node._get_tracks(tag) == expected  # pylint: disable=protected-access
+    )
+
+
+@pytest.mark.parametrize(
+    "operators",
+    [
+        ["&", "&", "&"],
+        ["|", "&", "&"],
+        ["&", "~", "|"],
+        ["~", "~", "&"],
+        ["|", "|", "~"],
+        ["~", "|", "|"],
+    ],
+)
+def test_booleannode_reordering_preserves_left_to_right_semantics(operators):
+    """Test for the BooleanNode class."""
+    tags = ["Techno", "Dark", "Jungle", "Breaks"]
+    tracks = {
+        "Breaks": [3, 4],
+        "Dark": [2, 11],
+        "Jungle": [1, 2, 3, 5, 6, 11],
+        "Techno": [1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12],
+    }
+    set_ops = {"&": set.intersection, "|": set.union, "~": set.difference}
+    expected = set(tracks[tags[0]])
+    for operator, tag in zip(operators, tags[1:]):
+        expected = set_ops[operator](expected, tracks[tag])
+    tracks = {k: {x: None for x in v} for k, v in tracks.items()}
+    node = BooleanNode(tracks)
+    for operator in operators:
+        node.add_operator(operator)
+    for tag in tags:
+        node.add_operand(tag)
+    assert set(node.evaluate()) == expected
+
+
+@pytest.mark.parametrize("operator", ["&", "~"])
+def test_booleannode_short_circuits_empty_results(operator):
+    """Test for the BooleanNode class."""
+    tracks = {"Dark": {}, "Techno": {1: None, 2: None}, "Jungle": {1: None}}
+    node = BooleanNode(tracks)
+    for _ in range(2):
+        node.add_operator(operator)
+    for tag in tracks:
+        node.add_operand(tag)
+    with mock.patch.object(
+        BooleanNode, "_get_bitset", autospec=True, side_effect=[0]
+    ):
+        assert node.evaluate_bitset() == 0
+
+
+def test_booleannode_orders_wildcards_by_cardinality():
+    """Test for the BooleanNode class."""
+    tracks = {
+        "Acid House": {1: None, 2: None},
+        "Bass House": {3: None},
+        "Techno": {1: None},
+    }
+    node = BooleanNode(tracks)
+    node.add_operator("&")
+    node.add_operand("*House")
+    node.add_operand("Techno")
+    assert (
+        node._get_cardinality("*House")  # pylint: disable=protected-access
+        == 3
+    )
+    assert set(node.evaluate()) == {1}
+
+
+def test_booleannode_raises_runtime_eror():
+    """Test for the BooleanNode class.
+
+    A valid expression must contain one more operand than there are operators.
+    """
+    node = BooleanNode({})
+    node.add_operator("|")
+    node.add_operand("tag")
+    with pytest.raises(
+        RuntimeError,
+        match=(
+            "Invalid boolean expression:\n"
+            + re.escape("\toperands: ['tag']\n")
+            + re.escape("\toperators: ['union']")
+        ),
+    ):
+        node.evaluate()
+
+
+@pytest.mark.parametrize(
+    "expression,expected",
+    [
+        ("House | Techno", ["t1", "t2", "t3"]),
+        ("Techno | House", ["t1", "t2", "t3"]),
+        ("Techno & House | Techno", ["t1", "t3"]),
+    ],
+)
+def test_combinerexpressions_evaluates_tracks_in_collection_order(
+    expression, expected
+):
+    """Test for the CombinerExpressions class.
+
+    Tracks are ordered as they are in the collection rather than by the
+    operands of the expression they were first found in.
+    """
+    tracks = {"1": "t1", "2": "t2", "3": "t3"}
+    tags_tracks = {
+        "House": {"2": "t2"},
+        "Techno": {"3": "t3", "1": "t1"},
+    }
+    expressions = CombinerExpressions(TagIndex(tags_tracks, tracks))
+    assert list(expressions.evaluate(expression).values()) == expected
+
+
+@pytest.mark.parametrize(
+    "expression",
+    [
+        "Techno",
+        "Jungle & Breaks | Techno ~ Tech House",
+        "(Jungle | Breaks) & ({All DnB} ~ Dark)",
+        "Techno & (Dark | (Jungle & Breaks))",
+        "*House ~ Bass House",
+        "Techno | (Jungle & Breaks)",
+        "(Jungle | Dark",
+    ],
+)
+def test_combinerexpressions_matches_parse_expression(expression):
+    """Test for the CombinerExpressions class."""
+    tracks = {
+        "{All DnB}": [1, 2, 3],
+        "Acid House": [7, 8],
+        "Bass House": [9, 10],
+        "Breaks": [3, 4],
+        "Dark": [2, 11],
+        "Jungle": [1, 3],
+        "Tech House": [3, 5, 6],
+        "Techno": [11, 12],
+    }
+    tracks = {k: {x: None for x in v} for k, v in tracks.items()}
+    expressions = CombinerExpressions(tracks)
+    assert set(expressions.evaluate(expression)) == set(
+        parse_expression(expression, tracks)
+    )
+
+
+def test_combinerexpressions_shares_sub_expressions():
+    """Test for the CombinerExpressions class."""
+    tags_tracks = {"House": {1: None}, "Techno": {2: None}, "Dark": {1: None}}
+    expressions = CombinerExpressions(tags_tracks)
+    expressions.compile_playlist_config(
+        PlaylistConfigContent(
+            name="playlists",
+            playlists=[
+                "(House | Techno) & Dark",
+                PlaylistName(tag_content="Dark ~ ( House|Techno )"),
+                "(House",
+                "House)",
+            ],
+        )
+    )
+    assert expressions.compile("(House | Techno) & Dark") == 1
+    assert expressions.compile("Dark ~ ( House|Techno )") == 2
+    with mock.patch.object(
+        BooleanNode, "evaluate_bitset", autospec=True, return_value=0
+    ) as mock_evaluate_bitset:
+        expressions.evaluate("(House | Techno) & Dark")
+        expressions.evaluate("Dark ~ (House | Techno)")
+        expressions.evaluate("Dark ~ (House | Techno)")
+    assert mock_evaluate_bitset.call_count == 3
+
+
+def test_combinerexpressions_evaluate_in_processes():
+    """Test for the CombinerExpressions class."""
+    tracks = {
+        "{All DnB}": [1, 2, 3],
+        "Acid House": [7, 8],
+        "Bass House": [9, 10],
+        "Breaks": [3, 4],
+        "Dark": [2, 11],
+        "Jungle": [1, 3],
+        "Tech House": [3, 5, 6],
+        "Techno": [11, 12],
+    }
+    tracks = {k: {x: None for x in v} for k, v in tracks.items()}
+    playlist_content = PlaylistConfigContent(
+        name="playlists",
+        playlists=[
+            "Jungle & Breaks | Techno ~ Tech House",
+            "(Jungle | Breaks) & ({All DnB} ~ Dark)",
+            "*House ~ Bass House",
+            "Invalid ~",
+        ],
+    )
+    expected = [
+        CombinerExpressions(tracks).evaluate(expression)
+        for expression in playlist_content.playlists[:-1]
+    ]
+    expressions = CombinerExpressions(tracks)
+    expressions.compile_playlist_config(playlist_content)
+    expressions.evaluate_in_processes(2)
+    with mock.patch.object(
+        BooleanNode, "evaluate_bitset"
+    ) as mock_evaluate_bitset:
+        assert [
+            expressions.evaluate(expression)
+            for expression in playlist_content.playlists[:-1]
+        ] == expected
+        with pytest.raises(RuntimeError, match="Invalid boolean expression"):
+            expressions.evaluate("Invalid ~")
+    mock_evaluate_bitset.assert_not_called()
+
+
+def test_combinerexpressions_evaluate_in_processes_skips_evaluated():
+    """Test for the CombinerExpressions class."""
+    expressions = CombinerExpressions({"House": {1: None}})
+    expressions.compile("House")
+    expressions.evaluate("House")
+    with mock.patch(
+        "djtools.collection.combiner_expressions.ProcessPoolExecutor"
+    ) as mock_executor:
+        expressions.evaluate_in_processes(2)
+    mock_executor.assert_not_called()
+
+
+def test_evaluate_expressions_in_process():
+    """Test for the _evaluate_expressions_in_process function."""
+    tracks = {
+        "Acid House": [7, 8],
+        "Bass House": [9, 10],
+        "Dark": [2, 7],
+        "Techno": [2, 11],
+    }
+    tracks = {k: {x: None for x in v} for k, v in tracks.items()}
+    tag_index = TagIndex(tracks)
+    expressions = [
+        "*House ~ Bass House",
+        "(Techno | Acid House) & Dark",
+        "Invalid ~",
+    ]
+    expected = [
+        CombinerExpressions(tag_index).evaluate_bitset(expression)
+        for expression in expressions[:-1]
+    ]
+    # The expressions of this process are restored after evaluating.
+    with mock.patch(
+        "djtools.collection.combiner_expressions._PROCESS_EXPRESSIONS", None
+    ):
+        _initialize_expressions_process(tag_index.to_bitsets())
+        results = _evaluate_expressions_in_process(expressions)
+    assert [bitset for bitset, _ in results[:-1]] == expected
+    assert all(error is None for _, error in results[:-1])
+    bitset, error = results[-1]
+    assert bitset is None
+    assert error.startswith("Invalid boolean expression")
+
+
+def test_combinerexpressions_raises_runtime_error():
+    """Test for the CombinerExpressions class."""
+    expression = "House | Techno)"
+    with pytest.raises(
+        RuntimeError,
+        match=re.escape(f"Unbalanced parentheses in expression: {expression}"),
+    ):
+        CombinerExpressions({}).compile(expression)
@@ -19,7 +19,6 @@ from djtools.collection.config import (
 from djtools.collection.helpers import (
     add_selectors_to_tags,
     aggregate_playlists,
-    BooleanNode,
     build_combiner_playlists,
     build_tag_playlists,
     copy_file,
@@ -301,11 +300,11 @@ def test_build_combiner_playlists_raises_exception_for_invalid_input():
 
 
 @mock.patch(
-    "djtools.collection.helpers.parse_expression",
-    side_effect=lambda x, y: {1: None},
+    "djtools.collection.helpers.CombinerExpressions.evaluate",
+    return_value={1: None},
 )
 def test_build_combiner_playlists_evaluates_correctly(
-    mock_parse_expression,
+    mock_evaluate,
 ):
     """Test the build_combiner_playlists function."""
     expected_num_playlists = 4
@@ -331,7 +330,7 @@ def test_build_combiner_playlists_evaluates_correctly(
     playlists = build_combiner_playlists(
         playlist_content, {"Tag": {1: None}}, RekordboxPlaylist
     )
-    assert mock_parse_expression.call_count == expected_num_playlists
+    assert mock_evaluate.call_count == expected_num_playlists
     assert len(playlists.get_playlists("Tag | Tag")) == 3
     assert len(playlists.get_playlists("Inner playlist")) == 1
     assert len(playlists.get_playlists("sub-playlists")) == 1
@@ -469,6 +468,88 @@ def test_aggregate_playlists(rekordbox_collection):
         assert track_id in tracks_in_playlist
 
 
+@mock.patch(
+    "djtools.collection.rekordbox_playlist.RekordboxPlaylist.aggregate",
+    return_value=True,
+)
+def test_aggregate_playlists_nested_folders(
+    mock_aggregate, rekordbox_collection
+):
+    """Test for the aggregate_playlists function."""
+    # pylint: disable=unused-argument
+    tracks = list(rekordbox_collection.get_tracks().items())
+    playlist = RekordboxPlaylist.new_playlist(
+        "Genres",
+        playlists=[
+            RekordboxPlaylist.new_playlist(
+                "Bass",
+                playlists=[
+                    RekordboxPlaylist.new_playlist(
+                        "Dubstep", tracks=dict(tracks[2:])
+                    ),
+                    RekordboxPlaylist.new_playlist(
+                        "Jungle", tracks=dict(tracks[:1])
+                    ),
+                ],
+            ),
+            RekordboxPlaylist.new_playlist("Techno", tracks=dict(tracks[1:])),
+        ],
+    )
+
+    aggregate_tracks = aggregate_playlists(playlist, RekordboxPlaylist)
+
+    # Aggregated tracks keep the order in which their playlists are visited.
+    expected = dict(tracks[2:] + tracks[:2])
+    assert list(aggregate_tracks) == list(expected)
+    all_genres = playlist.get_playlists("All Genres")[0]
+    assert list(all_genres.get_tracks()) == list(expected)
+    all_bass = playlist.get_playlists("All Bass")[0]
+    assert list(all_bass.get_tracks()) == list(dict(tracks[2:] + tracks[:1]))
+
+    # Folders with fewer tracks than the minimum don't get an "All" playlist.
+    playlist = RekordboxPlaylist.new_playlist(
+        "Genres",
+        playlists=[
+            RekordboxPlaylist.new_playlist(
+                "Bass",
+                playlists=[
+                    RekordboxPlaylist.new_playlist(
+                        "Jungle", tracks=dict(tracks[:1])
+                    ),
+                ],
+            ),
+            RekordboxPlaylist.new_playlist("Techno", tracks=dict(tracks[1:])),
+        ],
+    )
+    aggregate_playlists(playlist, RekordboxPlaylist, minimum_tracks=2)
+    assert not playlist.get_playlists("All Bass")
+    assert playlist.get_playlists("All Genres")
+
+
+@mock.patch(
+    "djtools.collection.rekordbox_playlist.RekordboxPlaylist.aggregate",
+    autospec=True,
+    side_effect=lambda playlist: playlist.get_name() != "Jungle",
+)
+def test_aggregate_playlists_skips_playlists_without_aggregation(
+    mock_aggregate, rekordbox_collection
+):
+    """Test for the aggregate_playlists function."""
+    # pylint: disable=unused-argument
+    tracks = list(rekordbox_collection.get_tracks().items())
+    playlist = RekordboxPlaylist.new_playlist(
+        "Genres",
+        playlists=[
+            RekordboxPlaylist.new_playlist("Jungle", tracks=dict(tracks[:1])),
+            RekordboxPlaylist.new_playlist("Techno", tracks=dict(tracks[1:])),
+        ],
+    )
+    aggregate_tracks = aggregate_playlists(playlist, RekordboxPlaylist)
+    assert list(aggregate_tracks) == list(dict(tracks[1:]))
+    all_genres = playlist.get_playlists("All Genres")[0]
+    assert list(all_genres.get_tracks()) == list(dict(tracks[1:]))
+
+
 @pytest.mark.parametrize(
     "playlist_content,expected_tags,expected_tracks",
     [
@@ -715,104 +796,6 @@ def test_parse_expression(rekordbox_track):
     assert tracks == track_dict
 
 
-@pytest.mark.parametrize(
-    "operators,tags,expected",
-    [
-        (
-            ["&", "|", "~"],
-            ["Jungle", "Breaks", "Techno", "Tech House"],
-            {11, 12},
-        ),
-        (["~"], ["*House", "Bass House"], {3, 5, 6, 7, 8}),
-        (["&"], ["{All DnB}", "Dark"], {2}),
-    ],
-)
-def test_booleannode_evaluate(operators, tags, expected):
-    """Test for the BooleanNode class."""
-    tracks = {
-        "{All DnB}": [1, 2, 3],
-        "Acid House": [7, 8],
-        "Bass House": [9, 10],
-        "Breaks": [3, 4],
-        "Dark": [2, 11],
-        "Jungle": [1, 3],
-        "Tech House": [3, 5, 6],
-        "Techno": [11, 12],
-    }
-    tracks = {k: {x: None for x in v} for k, v in tracks.items()}
-    node = BooleanNode(tracks)
-    for operator in operators:
-        node.add_operator(operator)
-    for tag in tags:
-        node.add_operand(tag)
-    result = node.evaluate().keys()
-    assert result == expected
-
-
-@pytest.mark.parametrize(
-    "track_ids,operator,expected",
-    [
-        ([1, 1], "&", {1}),
-        ([1, 2], "&", {}),
-        ([1, 1], "|", {1}),
-        ([1, 2], "|", {1, 2}),
-        ([1, 1], "~", {}),
-        ([1, 2], "~", {1}),
-    ],
-)
-def test_booleannode_evaluates_two_sets_of_tracks_with_each_kind_of_operator(
-    track_ids, operator, expected
-):
-    """Test for the BooleanNode class."""
-    node = BooleanNode({})
-    for track_id in track_ids:
-        node.add_operand({track_id: None})
-    node.add_operator(operator)
-    result = node.evaluate().keys()
-    assert (result if result else dict(result)) == expected
-
-
-@pytest.mark.parametrize(
-    "tag,expected",
-    [
-        ("Techno", {1: None}),
-        ("*Techno", {1: None, 2: None}),
-        ("Techno*", {1: None, 3: None}),
-        ("*Techno*", {1: None, 2: None, 3: None}),
-    ],
-)
-def test_booleannode_gets_tracks(tag, expected):
-    """Test for the BooleanNode class."""
-    tags_tracks = {
-        "Techno": {1: None},
-        "Hard Techno": {2: None},
-        "Techno Stuff": {3: None},
-    }
-    node = BooleanNode(tags_tracks)
-    assert (
-        node._get_tracks(tag) == expected  # pylint: disable=protected-access
-    )
-
-
-def test_booleannode_raises_runtime_eror():
-    """Test for the BooleanNode class.
-
-    A valid expression must contain one more operand than there are operators.
-    """
-    node = BooleanNode({})
-    node.add_operator("|")
-    node.add_operand("tag")
-    with pytest.raises(
-        RuntimeError,
-        match=(
-            "Invalid boolean expression:\n"
-            + re.escape("\toperands: ['tag']\n")
-            + re.escape("\toperators: ['union']")
-        ),
-    ):
-        node.evaluate()
-
-
 @mock.patch("djtools.collection.helpers.print_data")
 def test_print_playlists_tag_statistics(
     mock_print_data, rekordbox_xml, capsys
@@ -1,5 +1,10 @@
 """Testing for the playlist_builder module."""
 
+import csv
+import json
+import os
+import shutil
+from pathlib import Path
 from unittest import mock
 
 import pytest
@@ -7,14 +12,17 @@ import pytest
 from djtools.collection.config import (
     PlaylistConfig,
     PlaylistConfigContent,
+    PlaylistFilters,
     PlaylistRemainder,
 )
 from djtools.collection.playlist_builder import (
+    _load_collection,
     collection_playlists,
     PLAYLIST_NAME,
 )
 from djtools.collection.rekordbox_collection import RekordboxCollection
 from djtools.collection.rekordbox_playlist import RekordboxPlaylist
+from djtools.collection.tag_index import TagIndex
 
 
 @pytest.mark.parametrize(
@@ -147,6 +155,277 @@ def test_collection_playlists_handles_error_parsing_expression(
     )
 
 
+def test_collection_playlists_incremental(
+    config, rekordbox_xml, playlist_config_obj
+):
+    """Test for the collection_playlists function."""
+    config.collection.collection_path = rekordbox_xml
+    config.collection.collection_playlists_incremental = True
+    config.collection.playlist_config = playlist_config_obj
+    new_path = rekordbox_xml.parent / "test_collection"
+
+    collection_playlists(config, path=new_path)
+    assert (
+        rekordbox_xml.parent / f"{rekordbox_xml.name}.playlist_builder.json"
+    ).exists()
+    expected = new_path.read_text(encoding="utf-8")
+
+    # Every combiner playlist is reused when nothing has changed...
+    with mock.patch(
+        "djtools.collection.combiner_expressions.BooleanNode.evaluate_bitset"
+    ) as mock_evaluate_bitset:
+        collection_playlists(config, path=new_path)
+    mock_evaluate_bitset.assert_not_called()
+    assert new_path.read_text(encoding="utf-8") == expected
+
+    # ...unless a full rebuild is forced.
+    config.collection.collection_playlists_rebuild = True
+    with mock.patch(
+        "djtools.collection.combiner_expressions.BooleanNode.evaluate_bitset",
+        return_value=0,
+    ) as mock_evaluate_bitset:
+        collection_playlists(config, path=new_path)
+    mock_evaluate_bitset.assert_called()
+
+
+def test_collection_playlists_in_processes(
+    config, rekordbox_xml, playlist_config_obj
+):
+    """Test for the collection_playlists function."""
+    config.collection.collection_path = rekordbox_xml
+    config.collection.playlist_config = playlist_config_obj
+    new_path = rekordbox_xml.parent / "test_collection"
+    collection_playlists(config, path=new_path)
+    expected = new_path.read_text(encoding="utf-8")
+
+    config.collection.collection_playlists_processes = 2
+    collection_playlists(config, path=new_path)
+    assert new_path.read_text(encoding="utf-8") == expected
+
+
+def test_collection_playlists_profile(
+    config, rekordbox_xml, playlist_config_obj, capsys
+):
+    """Test for the collection_playlists function."""
+    config.collection.collection_path = rekordbox_xml
+    config.collection.collection_playlists_profile = True
+    config.collection.collection_playlist_filters = [
+        PlaylistFilters.HIPHOP_FILTER
+    ]
+    config.collection.playlist_config = playlist_config_obj
+
+    collection_playlists(config, path=rekordbox_xml.parent / "test_collection")
+
+    cap = capsys.readouterr()
+    assert "Combiner playlists profile" in cap.out
+    assert "Selectors profile" in cap.out
+    assert "Filters profile" in cap.out
+    profile_path = (
+        rekordbox_xml.parent
+        / f"{rekordbox_xml.name}.playlist_builder_profile.json"
+    )
+    with open(profile_path, mode="r", encoding="utf-8") as _file:
+        report = json.load(_file)
+    assert report["playlists"]["Dark & [2-5]"]["operands"].keys() == {
+        "Dark",
+        "[2-5]",
+    }
+    assert "[2-5]" in report["selectors"]
+    assert "HipHopFilter" in report["filters"]
+
+
+@pytest.mark.parametrize("suffix", [".csv", ".json"])
+def test_collection_playlists_statistics(
+    suffix, config, rekordbox_xml, playlist_config_obj
+):
+    """Test for the collection_playlists function."""
+    statistics_path = rekordbox_xml.parent / f"statistics{suffix}"
+    config.collection.collection_path = rekordbox_xml
+    config.collection.collection_playlists_statistics = statistics_path
+    config.collection.playlist_config = playlist_config_obj
+
+    collection_playlists(config, path=rekordbox_xml.parent / "test_collection")
+
+    with open(statistics_path, mode="r", encoding="utf-8") as _file:
+        if suffix == ".csv":
+            rows = list(csv.DictReader(_file))
+            playlists = {row["playlist"].split("/")[-1] for row in rows}
+        else:
+            playlists = {item["name"] for item in json.load(_file)}
+    assert "Dark & [2-5]" in playlists
+
+
+def test_collection_playlists_watch(
+    config, rekordbox_xml, playlist_config_obj, tmpdir
+):
+    """Test for the collection_playlists function."""
+    collection_path = Path(tmpdir) / "rekordbox.xml"
+    shutil.copy(rekordbox_xml, collection_path)
+    playlist_config_path = Path(tmpdir) / "collection_playlists.yaml"
+    playlist_config_path.write_text("", encoding="utf-8")
+    output_path = Path(tmpdir) / "test_collection"
+    config.collection.collection_path = collection_path
+    config.collection.collection_playlists_watch = True
+    config.collection.playlist_config = playlist_config_obj
+    new_playlist_config = PlaylistConfig(
+        tags=PlaylistConfigContent(name="Tags", playlists=["Dark"])
+    )
+
+    def touch(path):
+        stat = path.stat()
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    # Each call to sleep happens after polling for changes or waiting for
+    # changes to settle.
+    actions = [
+        lambda: None,
+        lambda: touch(playlist_config_path),
+        lambda: None,
+        lambda: touch(collection_path),
+        lambda: touch(collection_path),
+        lambda: None,
+        lambda: touch(playlist_config_path),
+        lambda: None,
+    ]
+
+    def sleep(_):
+        if not actions:
+            raise KeyboardInterrupt
+        actions.pop(0)()
+
+    serialize = RekordboxCollection.serialize
+    serialized_paths = []
+
+    def mock_serialize(self, *args, **kwargs):
+        path = serialize(self, *args, **kwargs)
+        serialized_paths.append(path)
+        return path
+
+    with (
+        mock.patch(
+            "djtools.collection.playlist_builder.PLAYLIST_CONFIG_PATH",
+            playlist_config_path,
+        ),
+        mock.patch(
+            "djtools.collection.playlist_builder.load_playlist_config",
+            side_effect=[playlist_config_obj, new_playlist_config],
+        ),
+        mock.patch("djtools.collection.playlist_builder.sleep", sleep),
+        mock.patch.object(RekordboxCollection, "serialize", mock_serialize),
+        mock.patch(
+            "djtools.collection.playlist_builder._load_collection",
+            side_effect=_load_collection,
+        ) as mock_load_collection,
+        mock.patch(
+            "djtools.collection.playlist_builder.TagIndex",
+            side_effect=TagIndex,
+        ) as mock_tag_index,
+    ):
+        collection_playlists(config, path=output_path)
+
+    # The collection, and the index of its tags, is only reloaded once after
+    # it stops changing and the output is only rewritten when the playlists
+    # change.
+    assert mock_load_collection.call_count == 2
+    assert mock_tag_index.call_count == 2
+    assert serialized_paths == [output_path, output_path]
+    collection = RekordboxCollection(output_path)
+    assert [
+        playlist.get_name()
+        for playlist in collection.get_playlists(PLAYLIST_NAME)[0]
+    ] == ["Dark", "Unused Tags"]
+
+
+def test_collection_playlists_watch_handles_bad_playlist_configs(
+    config, rekordbox_xml, playlist_config_obj, tmpdir, caplog
+):
+    """Test for the collection_playlists function."""
+    playlist_config_path = Path(tmpdir) / "collection_playlists.yaml"
+    playlist_config_path.write_text("", encoding="utf-8")
+    output_path = Path(tmpdir) / "test_collection"
+    config.collection.collection_path = rekordbox_xml
+    config.collection.collection_playlists_watch = True
+    config.collection.playlist_config = playlist_config_obj
+    actions = [
+        lambda: playlist_config_path.write_text("1", encoding="utf-8"),
+        lambda: None,
+        lambda: playlist_config_path.write_text("22", encoding="utf-8"),
+        lambda: None,
+    ]
+
+    def sleep(_):
+        if not actions:
+            raise KeyboardInterrupt
+        actions.pop(0)()
+
+    with (
+        mock.patch(
+            "djtools.collection.playlist_builder.PLAYLIST_CONFIG_PATH",
+            playlist_config_path,
+        ),
+        mock.patch(
+            "djtools.collection.playlist_builder.load_playlist_config",
+            side_effect=[RuntimeError("Invalid YAML"), PlaylistConfig()],
+        ),
+        mock.patch("djtools.collection.playlist_builder.sleep", sleep),
+    ):
+        collection_playlists(config, path=output_path)
+
+    assert "Failed to rebuild playlists: Invalid YAML" in caplog.text
+    assert "the playlist config is empty" in caplog.text
+
+
+def test_collection_playlists_watch_writes_to_collection_path(
+    config, rekordbox_xml, playlist_config_obj, tmpdir
+):
+    """Test for the collection_playlists function."""
+    collection_path = Path(tmpdir) / "rekordbox.xml"
+    shutil.copy(rekordbox_xml, collection_path)
+    playlist_config_path = Path(tmpdir) / "collection_playlists.yaml"
+    playlist_template_path = Path(tmpdir) / "collection_playlists.j2"
+    playlist_template_path.write_text("", encoding="utf-8")
+    config.collection.collection_path = collection_path
+    config.collection.collection_playlists_watch = True
+    config.collection.playlist_config = playlist_config_obj
+
+    def touch(path):
+        stat = path.stat()
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    actions = [lambda: touch(collection_path), lambda: None, lambda: None]
+
+    def sleep(_):
+        if not actions:
+            raise KeyboardInterrupt
+        actions.pop(0)()
+
+    serialize = RekordboxCollection.serialize
+    serialized_paths = []
+
+    def mock_serialize(self, *args, **kwargs):
+        path = serialize(self, *args, **kwargs)
+        serialized_paths.append(path)
+        return path
+
+    with (
+        mock.patch(
+            "djtools.collection.playlist_builder.PLAYLIST_CONFIG_PATH",
+            playlist_config_path,
+        ),
+        mock.patch(
+            "djtools.collection.playlist_builder.PLAYLIST_TEMPLATE_PATH",
+            playlist_template_path,
+        ),
+        mock.patch("djtools.collection.playlist_builder.sleep", sleep),
+        mock.patch.object(RekordboxCollection, "serialize", mock_serialize),
+    ):
+        collection_playlists(config, path=collection_path)
+
+    # The missing playlist config is watched without error and writing the
+    # output over the collection doesn't trigger another rebuild.
+    assert serialized_paths == [collection_path, collection_path]
+
+
 def test_collection_playlists_removes_existing_playlist(
     config, playlist_config_obj, rekordbox_xml
 ):
@@ -0,0 +1,62 @@
+"""Testing for the playlist_builder_profile module."""
+
+import json
+from pathlib import Path
+from unittest import mock
+
+from djtools.collection.playlist_builder_profile import (
+    PlaylistBuilderProfile,
+)
+
+
+def test_playlistbuilderprofile(tmpdir, capsys):
+    """Test for the PlaylistBuilderProfile class."""
+    profile = PlaylistBuilderProfile()
+    profile.add_playlist("Dark & [2-5]", 0.5, 1, {"Dark": 2, "[2-5]": 3})
+    profile.add_playlist("Techno", 1.5, 4, {"Techno": 4})
+    profile.add_selector("[2-5]", 0.25, 3)
+    profile.add_filter("HipHopFilter", 0.125)
+    profile.add_filter("HipHopFilter", 0.125)
+    profile.print_report()
+    cap = capsys.readouterr()
+    assert "Combiner playlists profile (2.0000s total):" in cap.out
+    assert cap.out.index("Techno (4 tracks)") < cap.out.index(
+        "Dark & [2-5] (1 tracks)"
+    )
+    assert "Dark: 2, [2-5]: 3" in cap.out
+    assert "Selectors profile (0.2500s total):" in cap.out
+    assert "0.2500s  HipHopFilter" in cap.out
+
+    path = Path(tmpdir) / "profile.json"
+    profile.save(path)
+    with open(path, mode="r", encoding="utf-8") as _file:
+        report = json.load(_file)
+    assert report["playlists"]["Techno"] == {
+        "seconds": 1.5,
+        "tracks": 4,
+        "operands": {"Techno": 4},
+    }
+    assert report["selectors"] == {"[2-5]": {"seconds": 0.25, "tracks": 3}}
+    assert report["filters"] == {"HipHopFilter": 0.25}
+
+
+def test_playlistbuilderprofile_skips_empty_sections(capsys):
+    """Test for the PlaylistBuilderProfile class."""
+    profile = PlaylistBuilderProfile()
+    profile.add_filter("HipHopFilter", 0.125)
+    profile.print_report()
+    cap = capsys.readouterr()
+    assert "Combiner playlists profile" not in cap.out
+    assert "Selectors profile" not in cap.out
+    assert "Filters profile (0.1250s total):" in cap.out
+
+
+def test_playlistbuilderprofile_save_fails(tmpdir, caplog):
+    """Test for the PlaylistBuilderProfile class."""
+    caplog.set_level("WARNING")
+    path = Path(tmpdir) / "profile.json"
+    with mock.patch("builtins.open", side_effect=OSError("disk full")):
+        PlaylistBuilderProfile().save(path)
+    assert caplog.records[0].message == (
+        f"Failed to write the playlist builder profile {path}: disk full"
+    )
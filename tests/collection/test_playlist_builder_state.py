@@ -0,0 +1,86 @@
+"""Testing for the playlist_builder_state module."""
+
+import json
+from pathlib import Path
+from unittest import mock
+
+from djtools.collection.playlist_builder_state import (
+    PlaylistBuilderState,
+    STATE_VERSION,
+)
+
+
+def test_playlistbuilderstate(tmpdir):
+    """Test for the PlaylistBuilderState class."""
+    collection_path = Path(tmpdir) / "rekordbox.xml"
+    dependencies = {"Dark": "abc", "[2-5]": "def"}
+
+    # There are no results to reuse the first time.
+    state = PlaylistBuilderState(collection_path)
+    assert state.get_result("Dark & [2-5]", dependencies) is None
+    state.set_result("Dark & [2-5]", dependencies, ["1", "2"])
+    state.set_result("Dark", {"Dark": "abc"}, ["1"])
+    state.save()
+    assert (tmpdir / "rekordbox.xml.playlist_builder.json").exists()
+
+    # Results are only reused if their dependencies haven't changed.
+    state = PlaylistBuilderState(collection_path)
+    assert state.get_result("Dark & [2-5]", dependencies) == ["1", "2"]
+    assert state.get_result("Dark", {"Dark": "xyz"}) is None
+    assert state.reused == 1
+    state.save()
+
+    # Results that weren't reused or evaluated again are discarded.
+    state = PlaylistBuilderState(collection_path)
+    assert state.get_result("Dark", {"Dark": "abc"}) is None
+    assert state.get_result("Dark & [2-5]", dependencies) == ["1", "2"]
+
+    # Rebuilding ignores every stored result.
+    state = PlaylistBuilderState(collection_path, rebuild=True)
+    assert state.get_result("Dark & [2-5]", dependencies) is None
+
+
+def test_playlistbuilderstate_discards_other_versions(tmpdir):
+    """Test for the PlaylistBuilderState class."""
+    collection_path = Path(tmpdir) / "rekordbox.xml"
+    with open(
+        tmpdir / "rekordbox.xml.playlist_builder.json",
+        mode="w",
+        encoding="utf-8",
+    ) as _file:
+        json.dump(
+            {
+                "version": STATE_VERSION + 1,
+                "results": {"Dark": {"dependencies": {}, "tracks": ["1"]}},
+            },
+            _file,
+        )
+    state = PlaylistBuilderState(collection_path)
+    assert state.get_result("Dark", {}) is None
+
+
+def test_playlistbuilderstate_load_fails(tmpdir, caplog):
+    """Test for the PlaylistBuilderState class."""
+    caplog.set_level("WARNING")
+    collection_path = Path(tmpdir) / "rekordbox.xml"
+    state_path = tmpdir / "rekordbox.xml.playlist_builder.json"
+    state_path.write("not json")
+    state = PlaylistBuilderState(collection_path)
+    assert state.get_result("Dark", {}) is None
+    assert caplog.records[0].message.startswith(
+        f"Failed to load the playlist builder state {state_path}"
+    )
+
+
+def test_playlistbuilderstate_save_fails(tmpdir, caplog):
+    """Test for the PlaylistBuilderState class."""
+    caplog.set_level("WARNING")
+    state = PlaylistBuilderState(Path(tmpdir) / "rekordbox.xml")
+    with mock.patch(
+        "djtools.collection.playlist_builder_state.os.replace",
+        side_effect=OSError("disk full"),
+    ):
+        state.save()
+    assert caplog.records[0].message.startswith(
+        "Failed to write the playlist builder state"
+    )
@@ -11,6 +11,7 @@ from djtools.collection.playlist_filters import (
     PlaylistFilter,
     TransitionTrackFilter,
 )
+from djtools.collection.rekordbox_collection import RekordboxCollection
 from djtools.collection.rekordbox_playlist import RekordboxPlaylist
 from djtools.collection.rekordbox_track import RekordboxTrack
 
@@ -263,3 +264,136 @@ def test_transitiontrackfilter_filters_tracks(
     ):
         result = track_filter.filter_track(rekordbox_track)
     assert result == expected
+
+
+@pytest.mark.parametrize("techno", [True, False])
+def test_playlistfilter_filter_tracks(techno, rekordbox_track):
+    """Test for the PlaylistFilter class."""
+    track_filter = MinimalDeepTechFilter()
+    tracks = {rekordbox_track.get_id(): rekordbox_track}
+    with (
+        mock.patch.object(track_filter, "_techno", techno, create=True),
+        mock.patch.object(track_filter, "_house", not techno, create=True),
+        mock.patch.object(
+            RekordboxTrack,
+            "get_genre_tags",
+            lambda x: ["Techno", "Minimal Deep Tech"],
+        ),
+        mock.patch.object(
+            MinimalDeepTechFilter,
+            "filter_track",
+            side_effect=MinimalDeepTechFilter.filter_track,
+            autospec=True,
+        ) as mock_filter_track,
+    ):
+        expected = tracks if techno else {}
+        assert track_filter.filter_tracks(tracks) == expected
+
+        # Decisions are reused for the same playlist state.
+        assert track_filter.filter_tracks(tracks) == expected
+        mock_filter_track.assert_called_once()
+
+
+def test_playlistfilter_filter_tracks_without_memoization(rekordbox_track):
+    """Test for the PlaylistFilter class."""
+
+    class CustomFilter(PlaylistFilter):
+        "PlaylistFilter implementation."
+
+        def filter_track(self, track):
+            "Filters tracks."
+            return True
+
+        def is_filter_playlist(self, playlist):
+            "Determines if playlist should have its tracks filtered."
+            return True
+
+    track_filter = CustomFilter()
+    tracks = {rekordbox_track.get_id(): rekordbox_track}
+    with mock.patch.object(
+        CustomFilter, "filter_track", return_value=True
+    ) as mock_filter_track:
+        assert track_filter.filter_tracks(tracks) == tracks
+        assert track_filter.filter_tracks(tracks) == tracks
+    assert mock_filter_track.call_count == 2
+
+
+def test_complextrackfilter_filter_tracks_across_playlists(
+    rekordbox_collection,
+):
+    """Test for the ComplexTrackFilter class."""
+    tracks = rekordbox_collection.get_tracks()
+    track_filter = ComplexTrackFilter(min_tags_for_complex_track=2)
+    folder = RekordboxPlaylist.new_playlist(
+        "complex",
+        playlists=[
+            RekordboxPlaylist.new_playlist(name, tracks=tracks)
+            for name in ["Techno", "House", "Dubstep"]
+        ],
+    )
+    folder.set_parent()
+    expected = {
+        track_id: track
+        for track_id, track in tracks.items()
+        if track_filter.filter_track(track)
+    }
+    with mock.patch.object(
+        ComplexTrackFilter,
+        "filter_track",
+        side_effect=ComplexTrackFilter.filter_track,
+        autospec=True,
+    ) as mock_filter_track:
+        for playlist in folder:
+            assert track_filter.is_filter_playlist(playlist)
+            assert (
+                track_filter.filter_tracks(playlist.get_tracks()) == expected
+            )
+
+    # Every complex playlist shares the decision for each track.
+    assert mock_filter_track.call_count == len(tracks)
+
+
+def test_transitiontrackfilter_filter_tracks_across_playlists(rekordbox_xml):
+    """Test for the TransitionTrackFilter class."""
+    tracks = RekordboxCollection(rekordbox_xml).get_tracks()
+    comments = ["[130 / 140]", "[Techno / Dubstep]", ""]
+    for index, track in enumerate(tracks.values()):
+        track._Comments = comments[  # pylint: disable=protected-access
+            index % len(comments)
+        ]
+    track_filter = TransitionTrackFilter()
+    folder = RekordboxPlaylist.new_playlist(
+        "transitions",
+        playlists=[
+            RekordboxPlaylist.new_playlist(name, tracks=tracks)
+            for name in ["genres", "tempos", "more genres", "more tempos"]
+        ],
+    )
+    folder.set_parent()
+    expected = {}
+    for playlist_type, comment in [
+        ("genre", comments[1]),
+        ("tempo", comments[0]),
+    ]:
+        expected[playlist_type] = {
+            track_id: track
+            for track_id, track in tracks.items()
+            if track.get_comments() == comment
+        }
+    with mock.patch.object(
+        TransitionTrackFilter,
+        "filter_track",
+        side_effect=TransitionTrackFilter.filter_track,
+        autospec=True,
+    ) as mock_filter_track:
+        for playlist in folder:
+            assert track_filter.is_filter_playlist(playlist)
+            assert (
+                track_filter.filter_tracks(playlist.get_tracks())
+                == expected[
+                    "genre" if "genres" in playlist.get_name() else "tempo"
+                ]
+            )
+
+    # Each track is decided once for each type of transition playlist.
+    assert mock_filter_track.call_count == 2 * len(tracks)
@@ -1,10 +1,20 @@
 """Testing for the collection module."""
 
+import gc
+import io
+import os
+import shutil
+import tracemalloc
+from unittest import mock
+
 import bs4
+import pytest
 
+from djtools.collection.config import CollectionLoader
 from djtools.collection.rekordbox_collection import (
     CustomSubstitution,
     RekordboxCollection,
+    StreamingXMLWriter,
     UnsortedAttributes,
 )
 from djtools.collection.rekordbox_playlist import RekordboxPlaylist
@@ -66,6 +76,43 @@ def test_rekordboxcollection_get_playlists(rekordbox_xml):
     for playlist in dark_playlists:
         assert playlist.get_name() == "Dark"
 
+    # The ROOT playlist isn't one of the collection's playlists.
+    assert not collection.get_playlists("ROOT")
+
+    # Playlists are returned in the order of a depth-first traversal.
+    expected = []
+    stack = list(reversed(list(collection.get_playlists())))
+    while stack:
+        playlist = stack.pop()
+        expected.append(playlist)
+        if playlist.is_folder():
+            stack.extend(reversed(list(playlist)))
+    assert collection.get_playlists("*", glob=True) == expected
+
+
+def test_rekordboxcollection_get_playlists_by_path(rekordbox_xml):
+    """Test RekordboxCollection class."""
+    collection = RekordboxCollection(path=rekordbox_xml)
+    assert not collection.get_playlists_by_path([])
+    assert collection.get_playlists_by_path(["My Tags", "Dark"]) == [
+        playlist
+        for playlist in collection.get_playlists("Dark")
+        if playlist.get_parent().get_name() == "My Tags"
+    ]
+    assert not collection.get_playlists_by_path(["Genres", "Dark"])
+
+
+def test_rekordboxcollection_remove_playlist(rekordbox_xml):
+    """Test RekordboxCollection class."""
+    collection = RekordboxCollection(path=rekordbox_xml)
+    num_playlists = len(collection.get_playlists())
+    test_playlist = RekordboxPlaylist.new_playlist("TEST", tracks={})
+    collection.add_playlist(test_playlist)
+    assert collection.get_playlists_by_path(["TEST"]) == [test_playlist]
+    collection.remove_playlist(test_playlist)
+    assert not collection.get_playlists("TEST")
+    assert len(collection.get_playlists()) == num_playlists
+
 
 def test_rekordboxcollection_get_tracks(
     rekordbox_xml, rekordbox_collection_tag
@@ -89,6 +136,65 @@ def test_rekordboxcollection_get_tracks(
     )
 
 
+@pytest.mark.parametrize(
+    "loader", [CollectionLoader.BEAUTIFULSOUP, CollectionLoader.ITERPARSE]
+)
+def test_rekordboxcollection_releases_xml_document(loader, tmpdir):
+    """Test RekordboxCollection class."""
+    # Retaining the parsed document would cost several times this much.
+    max_bytes_per_track = 4096
+    num_tracks = 1000
+    tracks = "".join(
+        f"""    <TRACK Artist="Artist {i}" AverageBpm="128.00" """
+        f"""Comments=" /* Dark / Groovy */ " DateAdded="2023-06-24" """
+        f"""Genre="Techno / House" Label="Label" """
+        f"""Location="file://localhost/track{i}.mp3" Tonality="7A" """
+        f"""Rating="255" TrackID="{i}" TrackNumber="{i}" Year="2023">\n"""
+        f"""      <TEMPO Inizio="0.025" Bpm="128.00" Metro="4/4" """
+        f"""Battito="1"/>\n"""
+        f"""    </TRACK>\n"""
+        for i in range(num_tracks)
+    )
+    playlist_tracks = "".join(
+        f"""        <TRACK Key="{i}"/>\n""" for i in range(num_tracks)
+    )
+    path = tmpdir / "collection.xml"
+    with open(path, mode="w", encoding="utf-8") as _file:
+        _file.write(
+            f"""<?xml version="1.0" encoding="UTF-8"?>\n\n"""
+            f"""<DJ_PLAYLISTS Version="1.0.0">\n"""
+            f"""  <PRODUCT Name="rekordbox" Version="6.6.4" """
+            f"""Company="AlphaTheta"/>\n"""
+            f"""  <COLLECTION Entries="{num_tracks}">\n{tracks}"""
+            f"""  </COLLECTION>\n"""
+            f"""  <PLAYLISTS>\n"""
+            f"""    <NODE Type="0" Name="ROOT" Count="1">\n"""
+            f"""      <NODE Name="All" Type="1" KeyType="0" """
+            f"""Entries="{num_tracks}">\n{playlist_tracks}"""
+            f"""      </NODE>\n"""
+            f"""    </NODE>\n"""
+            f"""  </PLAYLISTS>\n"""
+            f"""</DJ_PLAYLISTS>\n"""
+        )
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        collection = RekordboxCollection(path=path, loader=loader)
+        gc.collect()
+        retained_bytes, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert len(collection.get_tracks()) == num_tracks
+    assert retained_bytes < max_bytes_per_track * num_tracks
+
+    # The root and product Tags are still serialized.
+    RekordboxCollection.validate(
+        path, collection.serialize(path=tmpdir / "serialized.xml")
+    )
+
+
 def test_rekordboxcollection_serialization(rekordbox_xml):
     """Test RekordboxCollection class."""
     collection = RekordboxCollection(path=rekordbox_xml)
@@ -120,6 +226,334 @@ def test_rekordboxcollection_serialization(rekordbox_xml):
         assert False, "RekordboxCollection validation failed!"
 
 
+@pytest.mark.parametrize("loader", [CollectionLoader.ITERPARSE, "iterparse"])
+def test_rekordboxcollection_iterparse_loader(loader, rekordbox_xml, tmpdir):
+    """Test RekordboxCollection class."""
+    collection = RekordboxCollection(path=rekordbox_xml)
+    streamed_collection = RekordboxCollection(
+        path=rekordbox_xml, loader=loader
+    )
+
+    # The streamed collection deserializes the same tracks and playlists.
+    assert repr(streamed_collection) == repr(collection)
+    assert list(streamed_collection.get_tracks()) == list(
+        collection.get_tracks()
+    )
+    for track_id, track in collection.get_tracks().items():
+        assert str(streamed_collection.get_tracks()[track_id]) == str(track)
+    assert str(streamed_collection.get_playlists()) == str(
+        collection.get_playlists()
+    )
+
+    # Both loaders serialize byte-identical collections.
+    path = collection.serialize(path=tmpdir / "collection.xml")
+    streamed_path = streamed_collection.serialize(
+        path=tmpdir / "streamed_collection.xml"
+    )
+    with open(path, mode="rb") as _file:
+        expected = _file.read()
+    with open(streamed_path, mode="rb") as _file:
+        assert _file.read() == expected
+
+
+@pytest.mark.parametrize(
+    "loader", [CollectionLoader.BEAUTIFULSOUP, CollectionLoader.ITERPARSE]
+)
+def test_rekordboxcollection_lazy_tracks(loader, rekordbox_xml, tmpdir):
+    """Test RekordboxCollection class."""
+    collection = RekordboxCollection(path=rekordbox_xml)
+    lazy_collection = RekordboxCollection(
+        path=rekordbox_xml, loader=loader, lazy=True
+    )
+
+    # Lazily deserialized collections serialize byte-identical collections.
+    path = collection.serialize(path=tmpdir / "collection.xml")
+    lazy_path = lazy_collection.serialize(path=tmpdir / "lazy_collection.xml")
+    with open(path, mode="rb") as _file:
+        expected = _file.read()
+    with open(lazy_path, mode="rb") as _file:
+        assert _file.read() == expected
+
+    # Lazily deserialized tracks are the same as eagerly deserialized ones.
+    for track_id, track in collection.get_tracks().items():
+        assert repr(lazy_collection.get_tracks()[track_id]) == repr(track)
+
+
+@pytest.mark.parametrize(
+    "loader", [CollectionLoader.BEAUTIFULSOUP, CollectionLoader.ITERPARSE]
+)
+@pytest.mark.parametrize("lazy", [True, False])
+def test_rekordboxcollection_snapshot(loader, lazy, rekordbox_xml, tmpdir):
+    """Test RekordboxCollection class."""
+    xml_path = shutil.copy(rekordbox_xml, tmpdir / "collection.xml")
+    collection = RekordboxCollection(
+        path=xml_path, loader=loader, lazy=lazy, snapshot=True
+    )
+    assert (tmpdir / "collection.xml.snapshot").exists()
+
+    # The warm load doesn't parse the XML file.
+    with mock.patch.object(
+        RekordboxCollection, "_parse"
+    ) as mock_parse, mock.patch.object(
+        RekordboxCollection, "_iterparse"
+    ) as mock_iterparse:
+        snapshot_collection = RekordboxCollection(
+            path=xml_path, loader=loader, lazy=lazy, snapshot=True
+        )
+    mock_parse.assert_not_called()
+    mock_iterparse.assert_not_called()
+
+    # The snapshot deserializes the same collection.
+    assert repr(snapshot_collection) == repr(collection)
+    for track_id, track in collection.get_tracks().items():
+        assert repr(snapshot_collection.get_tracks()[track_id]) == repr(track)
+    assert str(snapshot_collection.get_playlists()) == str(
+        collection.get_playlists()
+    )
+    path = collection.serialize(path=tmpdir / "expected.xml")
+    snapshot_path = snapshot_collection.serialize(path=tmpdir / "snapshot.xml")
+    with open(path, mode="rb") as _file:
+        expected = _file.read()
+    with open(snapshot_path, mode="rb") as _file:
+        assert _file.read() == expected
+
+
+@pytest.mark.parametrize("lazy", [True, False])
+def test_rekordboxcollection_snapshot_invalidated(lazy, rekordbox_xml, tmpdir):
+    """Test RekordboxCollection class."""
+    xml_path = shutil.copy(rekordbox_xml, tmpdir / "collection.xml")
+    RekordboxCollection(path=xml_path, snapshot=True)
+
+    # Change the XML file without changing its size or modification time so
+    # that only the content hash differs.
+    stat = os.stat(xml_path)
+    with open(xml_path, mode="r", encoding="utf-8") as _file:
+        content = _file.read()
+    with open(xml_path, mode="w", encoding="utf-8") as _file:
+        _file.write(content.replace('Name="Hip Hop"', 'Name="Hip Hoq"'))
+    os.utime(xml_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+    # The XML file is parsed again (also when the lazy flag differs) and the
+    # snapshot is rewritten.
+    collection = RekordboxCollection(path=xml_path, lazy=lazy, snapshot=True)
+    assert collection.get_playlists("Hip Hoq")
+    with mock.patch.object(RekordboxCollection, "_parse") as mock_parse:
+        RekordboxCollection(path=xml_path, lazy=lazy, snapshot=True)
+    mock_parse.assert_not_called()
+
+
+def test_rekordboxcollection_snapshot_load_fails(
+    rekordbox_xml, tmpdir, caplog
+):
+    """Test RekordboxCollection class."""
+    caplog.set_level("WARNING")
+    xml_path = shutil.copy(rekordbox_xml, tmpdir / "collection.xml")
+    with open(tmpdir / "collection.xml.snapshot", mode="wb") as _file:
+        _file.write(b"not a snapshot")
+    collection = RekordboxCollection(path=xml_path, snapshot=True)
+    assert caplog.records[0].message.startswith(
+        "Failed to load the collection snapshot"
+    )
+    assert collection.get_tracks()
+
+    # The corrupt snapshot is replaced.
+    with mock.patch.object(RekordboxCollection, "_parse") as mock_parse:
+        RekordboxCollection(path=xml_path, snapshot=True)
+    mock_parse.assert_not_called()
+
+
+@mock.patch(
+    "djtools.collection.rekordbox_collection.os.replace",
+    side_effect=PermissionError("Permission denied"),
+)
+def test_rekordboxcollection_snapshot_write_fails(
+    mock_replace, rekordbox_xml, tmpdir, caplog
+):
+    """Test RekordboxCollection class."""
+    caplog.set_level("WARNING")
+    xml_path = shutil.copy(rekordbox_xml, tmpdir / "collection.xml")
+    collection = RekordboxCollection(path=xml_path, snapshot=True)
+    mock_replace.assert_called_once()
+    assert caplog.records[0].message.startswith(
+        "Failed to write the collection snapshot"
+    )
+    assert collection.get_tracks()
+    assert not (tmpdir / "collection.xml.snapshot").exists()
+
+
+def test_rekordboxcollection_serialization_copies_unchanged_elements(
+    rekordbox_xml, tmpdir
+):
+    """Test RekordboxCollection class."""
+    # pylint: disable=protected-access
+    xml_path = shutil.copy(rekordbox_xml, tmpdir / "collection.xml")
+    with open(xml_path, mode="rb") as _file:
+        expected = _file.read()
+    with mock.patch.object(
+        RekordboxCollection,
+        "_index_source",
+        autospec=True,
+        side_effect=RekordboxCollection._index_source,
+    ) as mock_index_source:
+        collection = RekordboxCollection(path=xml_path)
+
+        # The XML file isn't indexed until the collection is serialized.
+        mock_index_source.assert_not_called()
+
+        # An unmodified collection is copied from the XML file without
+        # serializing any of its tracks.
+        with mock.patch.object(
+            RekordboxTrack, "serialize_attrs"
+        ) as mock_serialize_attrs:
+            path = collection.serialize(path=tmpdir / "unchanged.xml")
+        mock_serialize_attrs.assert_not_called()
+        with open(path, mode="rb") as _file:
+            assert _file.read() == expected
+
+        # Overwriting the XML file that's being copied from works too,
+        # without indexing it again.
+        assert collection.serialize() == xml_path
+        mock_index_source.assert_called_once()
+    assert not (tmpdir / "collection.xml.tmp").exists()
+    with open(xml_path, mode="rb") as _file:
+        assert _file.read() == expected
+
+
+def test_rekordboxcollection_serialization_with_modified_elements(
+    rekordbox_xml, tmpdir
+):
+    """Test RekordboxCollection class."""
+    xml_path = shutil.copy(rekordbox_xml, tmpdir / "collection.xml")
+    full_xml_path = shutil.copy(rekordbox_xml, tmpdir / "full_collection.xml")
+    collections = [
+        RekordboxCollection(path=xml_path),
+        RekordboxCollection(path=full_xml_path),
+    ]
+    for collection in collections:
+        next(iter(collection.get_tracks().values())).set_track_number(42)
+        collection.get_playlists("Genres")[0].add_playlist(
+            RekordboxPlaylist.new_playlist(
+                "New", tracks=collection.get_tracks()
+            )
+        )
+
+    # Changing the XML file after deserializing it prevents copying from it.
+    stat = os.stat(full_xml_path)
+    os.utime(full_xml_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+
+    # Modified tracks and playlists are serialized again while the rest are
+    # copied, resulting in the same XML as serializing everything again.
+    path, full_path = [
+        collection.serialize(path=tmpdir / f"{index}.xml")
+        for index, collection in enumerate(collections)
+    ]
+    with open(full_path, mode="r", encoding="utf-8") as _file:
+        expected = _file.read()
+    with open(path, mode="r", encoding="utf-8") as _file:
+        assert _file.read() == expected
+    assert 'TrackNumber="42"' in expected
+    assert '<NODE Name="New"' in expected
+
+
+@pytest.mark.parametrize(
+    "old,new",
+    [
+        # A NODE that isn't recognized, but its end is.
+        ('<NODE Name="Genres"', "<NODE Name='Genres'"),
+        # A NODE that isn't recognized at all.
+        ('<NODE Name="Dark" ', "<NODE Name='Dark' "),
+        # The end of a NODE isn't recognized.
+        ("    </NODE>\n  </PLAYLISTS>", "    </NODE >\n  </PLAYLISTS>"),
+        # TRACKs that aren't deserialized.
+        (
+            '<COLLECTION Entries="4">',
+            '<COLLECTION Entries="4">\n<TRACK Name="No ID"/>\n'
+            '<TRACK TrackID="5" Name="No Location"/>',
+        ),
+    ],
+)
+def test_rekordboxcollection_serialization_with_unrecognized_elements(
+    old, new, rekordbox_xml, tmpdir
+):
+    """Test RekordboxCollection class."""
+    with open(rekordbox_xml, mode="r", encoding="utf-8") as _file:
+        content = _file.read()
+    assert old in content
+    with open(tmpdir / "collection.xml", mode="w", encoding="utf-8") as _file:
+        _file.write(content.replace(old, new, 1))
+    collection = RekordboxCollection(path=tmpdir / "collection.xml")
+    path = collection.serialize(path=tmpdir / "serialized_collection.xml")
+
+    # Elements that couldn't be matched are serialized again.
+    expected = bs4.BeautifulSoup(content, features="xml").prettify(
+        formatter=UnsortedAttributes(
+            indent=2,
+            entity_substitution=CustomSubstitution.substitute_xml,
+        )
+    )
+    with open(path, mode="r", encoding="utf-8") as _file:
+        assert _file.read() == expected
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 1 << 20])
+def test_rekordboxcollection_validate_normalizes_whitespace(
+    chunk_size, tmpdir
+):
+    """Test RekordboxCollection class."""
+    input_xml = tmpdir / "input.xml"
+    output_xml = tmpdir / "output.xml"
+    with open(input_xml, mode="w", encoding="utf-8") as _file:
+        _file.write(
+            '<?xml version="1.0" encoding="UTF-8"?>\n\n<A>\n  <B x="1"/>\n</A>'
+        )
+    with open(output_xml, mode="w", encoding="utf-8") as _file:
+        _file.write(
+            '<?xml version="1.0" encoding="utf-8"?>\n<A>\n\t<B  x="1"/> </A>\n'
+        )
+    RekordboxCollection.validate(input_xml, output_xml, chunk_size=chunk_size)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 1 << 20])
+@pytest.mark.parametrize(
+    "output,expected",
+    [
+        (
+            '<A>\n  <B x="1"/>\n  <B x="3"/>\n</A>\n',
+            r'at line 3, column 7 in the <B> element \("<B x="2"/>"\) of .* '
+            r'and at line 3, column 7 in the <B> element \("<B x="3"/>"\)',
+        ),
+        (
+            '<A>\n  <B x="1"/>\n',
+            r'at line 3, column 0 in the <B> element \("<B x="2"/>"\) of .* '
+            r"and at the end of",
+        ),
+        (
+            '<A>\n  <B x="1"/>\n  <B\n    y="2"/>\n</A>\n',
+            r'at line 3, column 4 in the <B> element \("<B x="2"/>"\) of .* '
+            r'and at line 4, column 1 \("y="2"/>"\)',
+        ),
+    ],
+)
+def test_rekordboxcollection_validate_reports_first_difference(
+    chunk_size, output, expected, tmpdir
+):
+    """Test RekordboxCollection class."""
+    input_xml = tmpdir / "input.xml"
+    output_xml = tmpdir / "output.xml"
+    with open(input_xml, mode="w", encoding="utf-8") as _file:
+        _file.write('<A>\n  <B x="1"/>\n  <B x="2"/>\n</A>\n')
+    with open(output_xml, mode="w", encoding="utf-8") as _file:
+        _file.write(output)
+    with pytest.raises(
+        AssertionError,
+        match=r"Failed RekordboxCollection validation! The first difference "
+        f"is {expected}",
+    ):
+        RekordboxCollection.validate(
+            input_xml, output_xml, chunk_size=chunk_size
+        )
+
+
 def test_rekordboxcollection_set_tracks(rekordbox_xml):
     """Test RekordboxCollection class."""
     collection = RekordboxCollection(path=rekordbox_xml)
@@ -152,6 +586,50 @@ def test_customsubstitution():
     assert result == expected
 
 
+def test_rekordboxcollection_serialization_matches_prettify(
+    rekordbox_xml, tmpdir
+):
+    """Test RekordboxCollection class."""
+    collection = RekordboxCollection(path=rekordbox_xml)
+    collection.add_playlist(
+        RekordboxPlaylist.new_playlist("Empty Folder", playlists=[])
+    )
+    collection.add_playlist(
+        RekordboxPlaylist.new_playlist(
+            'Bob\'s "cute" & <furry> playlist',
+            tracks=collection.get_tracks(),
+        )
+    )
+    path = collection.serialize(path=tmpdir / "collection.xml")
+    with open(path, mode="r", encoding="utf-8") as _file:
+        written = _file.read()
+
+    # The collection is written exactly as prettifying its document would.
+    expected = bs4.BeautifulSoup(written, features="xml").prettify(
+        formatter=UnsortedAttributes(
+            indent=2,
+            entity_substitution=CustomSubstitution.substitute_xml,
+        )
+    )
+    assert written == expected
+
+
+def test_streamingxmlwriter():
+    """Test StreamingXMLWriter class."""
+    _file = io.StringIO()
+    writer = StreamingXMLWriter(_file)
+    writer.write_declaration()
+    writer.start_tag("NODE", {"Z_attr": "<&>", "A_attr": 1})
+    writer.empty_tag("TRACK", {"Key": "1", "Rating": None})
+    writer.end_tag("NODE")
+    assert _file.getvalue() == (
+        '<?xml version="1.0" encoding="utf-8"?>\n'
+        '<NODE Z_attr="&lt;&amp;&gt;" A_attr="1">\n'
+        '  <TRACK Key="1" Rating/>\n'
+        "</NODE>\n"
+    )
+
+
 def test_unsortedattributes_formatter():
     """Test UnsortedAttributes class."""
     expected = '<NODE Z_attr="" A_attr="">\n</NODE>\n'
@@ -98,6 +98,24 @@ def test_rekordboxplaylist_get_tracks(rekordbox_track):
     assert playlist.get_tracks() == tracks
 
 
+def test_rekordboxplaylist_is_dirty(rekordbox_track):
+    """Test RekordboxPlaylist class."""
+    playlist = RekordboxPlaylist.new_playlist("TEST", tracks={})
+    folder = RekordboxPlaylist.new_playlist("FOLDER", playlists=[])
+    assert not playlist.is_dirty()
+    assert not folder.is_dirty()
+
+    # Modifying a playlist only makes that playlist dirty.
+    folder.add_playlist(playlist)
+    assert folder.is_dirty()
+    assert not playlist.is_dirty()
+    playlist.set_tracks({rekordbox_track.get_id(): rekordbox_track})
+    assert playlist.is_dirty()
+    folder = RekordboxPlaylist.new_playlist("FOLDER", playlists=[playlist])
+    folder.remove_playlist(playlist)
+    assert folder.is_dirty()
+
+
 @pytest.mark.parametrize(
     "playlist,expected", [("Genres", True), ("Hip Hop", False)]
 )
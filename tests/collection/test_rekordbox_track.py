@@ -1,6 +1,7 @@
 """Testing for the tracks module."""
 
 import os
+from copy import copy
 from datetime import datetime
 from pathlib import Path
 
@@ -13,6 +14,7 @@ from djtools.collection.rekordbox_track import RekordboxTrack
     "method,expected",
     [
         ("get_artists", "A Tribe Called Quest"),
+        ("get_bit_rate", 0),
         ("get_bpm", 86),
         ("get_comments", " /* Gangsta */ "),
         ("get_date_added", datetime(2022, 6, 24)),
@@ -21,8 +23,10 @@ from djtools.collection.rekordbox_track import RekordboxTrack
         ("get_key", "7B"),
         ("get_label", "Label"),
         ("get_location", "track2.mp3"),
+        ("get_play_count", 0),
         ("get_rating", 0),
         ("get_tags", ["Hip Hop", "R&B", "Gangsta"]),
+        ("get_total_time", 0),
         ("get_year", "2022"),
     ],
 )
@@ -39,6 +43,81 @@ def test_rekordboxtrack_get_methods(method, expected, rekordbox_track):
         assert _method() == expected
 
 
+@pytest.mark.parametrize(
+    "method",
+    [
+        "get_artists",
+        "get_bit_rate",
+        "get_bpm",
+        "get_comments",
+        "get_date_added",
+        "get_genre_tags",
+        "get_id",
+        "get_key",
+        "get_label",
+        "get_location",
+        "get_play_count",
+        "get_rating",
+        "get_tags",
+        "get_total_time",
+        "get_year",
+    ],
+)
+def test_rekordboxtrack_lazy_get_methods(method, rekordbox_track_tag):
+    """Test RekordboxTrack class."""
+    track = RekordboxTrack(rekordbox_track_tag)
+    lazy_track = RekordboxTrack(rekordbox_track_tag, lazy=True)
+
+    # Lazily deserialized attributes are decoded upon first access and cached
+    # for subsequent accesses.
+    expected = getattr(track, method)()
+    assert getattr(lazy_track, method)() == expected
+    assert getattr(lazy_track, method)() == expected
+
+
+@pytest.mark.parametrize("lazy", [True, False])
+def test_rekordboxtrack_optional_integer_get_methods(
+    lazy, rekordbox_track_tag
+):
+    """Test RekordboxTrack class."""
+    track_tag = copy(rekordbox_track_tag)
+    track_tag["BitRate"] = "320"
+    track_tag["PlayCount"] = "7"
+    track_tag["TotalTime"] = "245"
+    track = RekordboxTrack(track_tag, lazy=lazy)
+    assert track.get_bit_rate() == 320
+    assert track.get_play_count() == 7
+    assert track.get_total_time() == 245
+
+
+def test_rekordboxtrack_lazy_serialization(rekordbox_track_tag):
+    """Test RekordboxTrack class."""
+    track = RekordboxTrack(rekordbox_track_tag)
+    lazy_track = RekordboxTrack(rekordbox_track_tag, lazy=True)
+
+    # Attributes are decoded upon first access.
+    # pylint: disable=protected-access,no-member
+    assert lazy_track._Rating == rekordbox_track_tag["Rating"]
+    lazy_track.get_rating()
+    assert lazy_track._Rating == 0
+
+    # Lazily deserialized tracks serialize whether or not their attributes
+    # have been decoded.
+    assert lazy_track.serialize() == rekordbox_track_tag
+    assert str(lazy_track) == str(track)
+
+    # Representing a lazily deserialized track decodes all its attributes.
+    assert repr(lazy_track) == repr(track)
+    assert lazy_track.serialize() == rekordbox_track_tag
+
+    # Setting attributes that haven't been decoded yet replaces them.
+    lazy_track = RekordboxTrack(rekordbox_track_tag, lazy=True)
+    lazy_track.set_location("path/to.mp3")
+    lazy_track.set_track_number(42)
+    assert lazy_track.get_location() == Path("path/to.mp3")
+    assert 'TrackNumber="42"' in str(lazy_track)
+
+
 def test_rekordboxtrack_serialization(rekordbox_track_tag):
     """Test RekordboxTrack class."""
     track = RekordboxTrack(rekordbox_track_tag)
@@ -65,16 +144,67 @@ def test_rekordboxtrack_serialization(rekordbox_track_tag):
     assert track.serialize() == rekordbox_track_tag
 
 
+def test_rekordboxtrack_slots(rekordbox_track_tag):
+    """Test RekordboxTrack class."""
+    track = RekordboxTrack(rekordbox_track_tag)
+    assert not track.__dict__
+    track_tag = copy(rekordbox_track_tag)
+    track_tag["Unknown"] = "value"
+    track = RekordboxTrack(track_tag)
+    assert track.__dict__ == {"_Unknown": "value"}
+    assert track.serialize() == track_tag
+    assert list(track.serialize().attrs) == list(track_tag.attrs)
+
+
+def test_rekordboxtrack_normalized_tags(rekordbox_track_tag):
+    """Test RekordboxTrack class."""
+    track = RekordboxTrack(rekordbox_track_tag)
+    assert track.get_lowercase_genre_tags() == ("hip hop", "r&b")
+    assert track.get_other_tag_set() == frozenset(["Gangsta"])
+
+    # Normalized tags are cached until the tags are replaced.
+    assert track.get_other_tag_set() is track.get_other_tag_set()
+    track._Tags = [  # pylint: disable=protected-access
+        "Hip Hop",
+        "R&B",
+        "Boom Bap",
+    ]
+    assert track.get_other_tag_set() == frozenset(["Boom Bap"])
+
+
+def test_rekordboxtrack_set_genre_tags(rekordbox_track_tag):
+    """Test RekordboxTrack class."""
+    track = RekordboxTrack(rekordbox_track_tag)
+    genre_tags = track.get_genre_tags()
+    assert track.get_other_tag_set() == frozenset(["Gangsta"])
+    assert not track.is_dirty()
+
+    # Setting the genre tags invalidates the normalized tags, even when the
+    # list of genre tags is modified in place.
+    genre_tags.append("Trap")
+    track.set_genre_tags(genre_tags)
+    assert track.is_dirty()
+    assert track.get_genre_tags() == ["Hip Hop", "R&B", "Trap"]
+    assert track.get_tags() == ["Hip Hop", "R&B", "Trap", "Gangsta"]
+    assert track.get_lowercase_genre_tags() == ("hip hop", "r&b", "trap")
+    assert track.get_other_tag_set() == frozenset(["Gangsta"])
+    assert track.serialize()["Genre"] == "Hip Hop / R&B / Trap"
+
+
 def test_rekordboxtrack_set_location(rekordbox_track_tag):
     """Test RekordboxTrack class."""
     track = RekordboxTrack(rekordbox_track_tag)
+    assert not track.is_dirty()
     track.set_location("path/to.mp3")
     assert track.get_location() == Path("path/to.mp3")
+    assert track.is_dirty()
 
 
 def test_rekordboxtrack_set_track_number(rekordbox_track_tag):
     """Test RekordboxTrack class."""
     track = RekordboxTrack(rekordbox_track_tag)
+    assert not track.is_dirty()
     track_number = 42
     track.set_track_number(track_number)
     assert f'TrackNumber="{track_number}"' in str(track)
+    assert track.is_dirty()
@@ -0,0 +1,165 @@
+"""Testing for the selector_index module."""
+
+import re
+from datetime import datetime
+from unittest import mock
+
+import pytest
+
+from djtools.collection.rekordbox_collection import RekordboxCollection
+from djtools.collection.rekordbox_track import RekordboxTrack
+from djtools.collection.selector_index import SelectorIndex
+
+
+@pytest.mark.parametrize(
+    "low,high", [(0, 0), (2, 5), (80, 180), (140, 140), (2021, 2023)]
+)
+def test_selectorindex_get_numerical_tracks(low, high, rekordbox_collection):
+    """Test SelectorIndex class."""
+    tracks = rekordbox_collection.get_tracks()
+    index = SelectorIndex(tracks)
+    values = set(map(str, range(low, high + 1)))
+    assert index.get_numerical_tracks(low, high) == {
+        track_id: track
+        for track_id, track in tracks.items()
+        if values.intersection(
+            map(
+                str,
+                [round(track.get_bpm()), track.get_rating(), track.get_year()],
+            )
+        )
+    }
+
+
+@pytest.mark.parametrize("inequality", [None, ">", ">=", "<", "<="])
+@pytest.mark.parametrize(
+    "date,date_format",
+    [
+        (datetime(2021, 1, 1), "%Y"),
+        (datetime(2023, 6, 1), "%Y-%m"),
+        (datetime(2023, 6, 18), "%Y-%m-%d"),
+        (datetime(2022, 6, 24, 8, 30), "%Y-%m-%d"),
+    ],
+)
+def test_selectorindex_get_date_tracks(
+    inequality, date, date_format, rekordbox_collection
+):
+    """Test SelectorIndex class."""
+    operators = {
+        None: lambda x, y: x == y,
+        ">": lambda x, y: x > y,
+        ">=": lambda x, y: x >= y,
+        "<": lambda x, y: x < y,
+        "<=": lambda x, y: x <= y,
+    }
+    tracks = rekordbox_collection.get_tracks()
+    index = SelectorIndex(tracks)
+    if not inequality:
+        date = datetime.strptime(date.strftime(date_format), date_format)
+    expected = {
+        track_id: track
+        for track_id, track in tracks.items()
+        if track.get_date_added()
+        and operators[inequality](
+            datetime.strptime(
+                track.get_date_added().strftime(date_format), date_format
+            ),
+            date,
+        )
+    }
+    assert index.get_date_tracks(inequality, date, date_format) == expected
+
+
+@pytest.mark.parametrize(
+    "value,expected",
+    [
+        ("140", (140, 140)),
+        ("0", (0, 0)),
+        ("0140", None),
+        (("2021", "2022", "2023"), (2021, 2023)),
+        ((), None),
+    ],
+)
+def test_selectorindex_get_numerical_range(value, expected):
+    """Test SelectorIndex class."""
+    assert SelectorIndex.get_numerical_range(value) == expected
+
+
+def test_collection_to_selector_index(rekordbox_xml):
+    """Test Collection.to_selector_index method."""
+    collection = RekordboxCollection(rekordbox_xml)
+    index = collection.to_selector_index()
+    assert len(index) == len(collection.get_tracks())
+
+    # The index is cached until the tracks of the collection are modified.
+    assert collection.to_selector_index() is index
+    tracks = dict(list(collection.get_tracks().items())[:1])
+    collection.set_tracks(tracks)
+    index = collection.to_selector_index()
+    assert len(index) == 1
+    assert collection.to_selector_index() is index
+
+    # Replacing the tracks with as many tracks or modifying a track with a
+    # setter also invalidates the index.
+    tracks = dict(
+        list(RekordboxCollection(rekordbox_xml).get_tracks().items())[1:2]
+    )
+    collection.set_tracks(tracks)
+    index = collection.to_selector_index()
+    track_id, track = next(iter(tracks.items()))
+    assert index.get_string_tracks("get_artists", track.get_artists())
+    track.set_location(track.get_location())
+    assert collection.to_selector_index() is not index
+    assert track_id in collection.to_selector_index().get_string_tracks(
+        "get_artists", track.get_artists()
+    )
+
+
+def test_selectorindex_builds_indexes_on_demand(rekordbox_collection):
+    """Test SelectorIndex class."""
+    index = SelectorIndex(rekordbox_collection.get_tracks())
+    with (
+        mock.patch.object(RekordboxTrack, "get_bpm") as mock_get_bpm,
+        mock.patch.object(
+            RekordboxTrack, "get_date_added"
+        ) as mock_get_date_added,
+    ):
+        index.get_string_tracks("get_label", "*")
+    mock_get_bpm.assert_not_called()
+    mock_get_date_added.assert_not_called()
+
+
+@pytest.mark.parametrize(
+    "getter,selector_value",
+    [
+        ("get_artists", "Carbon"),
+        ("get_artists", "carbon"),
+        ("get_artists", "*Tribe*"),
+        ("get_artists", "A*Quest"),
+        ("get_artists", "*r*"),
+        ("get_artists", "tribe*|carbon"),
+        ("get_comments", "*dark*"),
+        ("get_comments", "*/ groovy*"),
+        ("get_comments", "*(atmos|classic)*"),
+        ("get_key", "7*"),
+        ("get_label", "*label"),
+        ("get_label", "*nothing*"),
+    ],
+)
+def test_selectorindex_get_string_tracks(
+    getter, selector_value, rekordbox_collection
+):
+    """Test SelectorIndex class."""
+    tracks = rekordbox_collection.get_tracks()
+    index = SelectorIndex(tracks)
+    exp = re.compile(r".*".join(selector_value.lower().split("*")))
+    expected = {}
+    for track_id, track in tracks.items():
+        value = getattr(track, getter)()
+        if not value:
+            continue
+        if ("*" in selector_value and re.search(exp, value.lower())) or (
+            value.lower() == selector_value.lower()
+        ):
+            expected[track_id] = track
+    assert index.get_string_tracks(getter, selector_value) == expected
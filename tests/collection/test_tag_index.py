@@ -0,0 +1,147 @@
+"""Testing for the tag_index module."""
+
+from unittest import mock
+
+import pytest
+
+from djtools.collection.tag_index import (
+    TagIndex,
+    difference,
+    intersection,
+    iter_ordinals,
+    popcount,
+    to_bitset,
+    union,
+)
+
+
+@pytest.mark.parametrize(
+    "operator,expected",
+    [(intersection, 0b0100), (union, 0b1110), (difference, 0b0010)],
+)
+def test_bitset_operators(operator, expected):
+    """Test for the bitset operator functions."""
+    assert operator(0b0110, 0b1100) == expected
+
+
+@pytest.mark.parametrize("ordinals", [[], [0], [3, 1, 7], [8, 64, 200]])
+def test_to_bitset_round_trips(ordinals):
+    """Test for the to_bitset and iter_ordinals functions."""
+    bitset = to_bitset(ordinals)
+    assert list(iter_ordinals(bitset)) == sorted(ordinals)
+    assert popcount(bitset) == len(ordinals)
+
+
+def test_tagindex():
+    """Test for the TagIndex class."""
+    tracks = {str(x): x for x in range(5)}
+    tags_tracks = {
+        "House": {"3": 3, "1": 1},
+        "Techno": {"4": 4, "9": 9},
+    }
+    index = TagIndex(tags_tracks, tracks)
+    assert len(index) == len(tracks)
+    assert "House" in index
+    assert "Dubstep" not in index
+    assert list(index) == list(tags_tracks)
+    assert index.get_bitset("House") == 0b01010
+    assert index.get_bitset("Dubstep") == 0
+
+    # Tracks that aren't in the collection are assigned new ordinals.
+    bitset = index.get_bitset("Techno")
+    assert len(index) == len(tracks) + 1
+    assert index.to_tracks(bitset) == {"4": 4, "9": 9}
+    bitset = union(index.get_bitset("House"), bitset)
+    assert index.to_tracks(bitset) == {"1": 1, "3": 3, "4": 4, "9": 9}
+
+
+@pytest.mark.parametrize(
+    "pattern,expected",
+    [
+        ("*House", {"1", "2"}),
+        ("Bass*", {"2", "3"}),
+        ("B*s H*", {"2"}),
+        ("Zouk*", set()),
+        ("(Deep|Acid)*", {"1", "4"}),
+    ],
+)
+def test_tagindex_get_wildcard_bitset(pattern, expected):
+    """Test for the TagIndex class."""
+    tags_tracks = {
+        "Acid House": {"1": None},
+        "Bass House": {"2": None},
+        "Bassline": {"3": None},
+        "Deep": {"4": None},
+    }
+    index = TagIndex(tags_tracks)
+    bitset = index.get_wildcard_bitset(pattern)
+    assert set(index.to_tracks(bitset)) == expected
+    with mock.patch.object(TagIndex, "get_bitset") as mock_get_bitset:
+        assert index.get_wildcard_bitset(pattern) == bitset
+    mock_get_bitset.assert_not_called()
+
+    # The tags matching a pattern are only resolved once.
+    tags = index.get_wildcard_tags(pattern)
+    with mock.patch("djtools.collection.tag_index.re.compile") as mock_compile:
+        assert index.get_wildcard_tags(pattern) is tags
+    mock_compile.assert_not_called()
+
+
+def test_tagindex_from_bitsets():
+    """Test for the TagIndex class."""
+    tracks = {str(x): x for x in range(4)}
+    tags_tracks = {
+        "Acid House": {"3": 3, "1": 1},
+        "Bass House": {"2": 2},
+        "Techno": {"0": 0, "3": 3},
+    }
+    index = TagIndex(tags_tracks, tracks)
+    bitsets = index.to_bitsets()
+    copy = TagIndex.from_bitsets(bitsets)
+    assert list(copy) == list(index)
+    assert copy.to_bitsets() == bitsets
+    assert copy.get_wildcard_bitset("*House") == index.get_wildcard_bitset(
+        "*House"
+    )
+    assert index.to_tracks(copy.get_bitset("Techno")) == {"0": 0, "3": 3}
+
+
+def test_tagindex_fingerprints():
+    """Test for the TagIndex class."""
+    tags_tracks = {"Acid House": {"1": 1}, "Bass House": {"2": 2}}
+    index = TagIndex(tags_tracks)
+    fingerprint = index.get_fingerprint("Acid House")
+    wildcard_fingerprint = index.get_wildcard_fingerprint("*House")
+    assert fingerprint != index.get_fingerprint("Bass House")
+    assert index.get_fingerprint("Dubstep") == TagIndex({}).get_fingerprint(
+        "Dubstep"
+    )
+
+    # Fingerprints change with the tracks having a tag.
+    tags_tracks["Acid House"]["3"] = 3
+    index = TagIndex(tags_tracks)
+    assert index.get_fingerprint("Acid House") != fingerprint
+    assert index.get_wildcard_fingerprint("*House") != wildcard_fingerprint
+    index.get_bitset("Acid House")
+    assert index.get_tracks(["3", "1", "4"]) == {"3": 3, "1": 1}
+
+
+def test_tagindex_set_tags_tracks():
+    """Test for the TagIndex class."""
+    tracks = {str(x): x for x in range(4)}
+    house_tracks = {"3": 3, "1": 1}
+    index = TagIndex({"House": house_tracks, "[2]": {"2": 2}}, tracks)
+    assert index.get_wildcard_bitset("*") == 0b1110
+    bitset = index.get_bitset("House")
+
+    # The bitsets of tags with the same tracks are kept and the others are
+    # built again.
+    index.set_tags_tracks({"House": house_tracks, "[2]": {"0": 0}})
+    with mock.patch(
+        "djtools.collection.tag_index.to_bitset", side_effect=to_bitset
+    ) as mock_to_bitset:
+        assert index.get_bitset("House") == bitset
+        mock_to_bitset.assert_not_called()
+        assert index.get_bitset("[2]") == 0b0001
+    assert index.get_wildcard_bitset("*") == 0b1011
+    assert index.to_tracks(0b1011) == {"0": 0, "1": 1, "3": 3}
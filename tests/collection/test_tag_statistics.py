@@ -0,0 +1,75 @@
+"""Testing for the tag_statistics module."""
+
+import json
+from collections import defaultdict
+
+from djtools.collection.rekordbox_collection import RekordboxCollection
+from djtools.collection.tag_statistics import TagStatistics
+
+
+def test_tagstatistics(rekordbox_xml):
+    """Test for the TagStatistics class."""
+    collection = RekordboxCollection(path=rekordbox_xml)
+    playlists = collection.get_playlists("Genres")[0]
+    statistics = TagStatistics(playlists)
+    assert {item["name"] for item in statistics.statistics} == {
+        playlist.get_name() for playlist in playlists
+    }
+    for item in statistics.statistics:
+        playlist = playlists.get_playlists(item["name"])[0]
+        assert item["path"] == ["Genres", item["name"]]
+        assert item["tracks"] == len(playlist.get_tracks())
+        expected = {"genre": defaultdict(int), "other": defaultdict(int)}
+        for track in playlist.get_tracks().values():
+            for tag in track.get_tags():
+                tag_subset = (
+                    "genre" if tag in track.get_genre_tags() else "other"
+                )
+                expected[tag_subset][tag] += 1
+        assert item["genre"] == expected["genre"]
+        assert item["other"] == expected["other"]
+        assert list(item["genre"]) == sorted(item["genre"])
+
+
+def test_tagstatistics_save(rekordbox_xml):
+    """Test for the TagStatistics class."""
+    collection = RekordboxCollection(path=rekordbox_xml)
+    statistics = TagStatistics(collection.get_playlists("Genres")[0])
+    path = rekordbox_xml.parent / "statistics.json"
+    statistics.save(path)
+    with open(path, mode="r", encoding="utf-8") as _file:
+        assert json.load(_file) == statistics.statistics
+
+    path = rekordbox_xml.parent / "statistics.csv"
+    statistics.save(path)
+    lines = path.read_text(encoding="utf-8").splitlines()
+    assert lines[0] == "playlist,tag_type,tag,tracks"
+    assert len(lines) == 1 + sum(
+        len(item["genre"]) + len(item["other"])
+        for item in statistics.statistics
+    )
+
+    # Failing to write the statistics is logged rather than raised.
+    statistics.save(rekordbox_xml.parent / "missing" / "statistics.json")
+
+
+def test_tagstatistics_counts_tracks(rekordbox_xml):
+    """Test for the TagStatistics class.
+
+    A tag repeated on a track counts the track once.
+    """
+    collection = RekordboxCollection(path=rekordbox_xml)
+    playlists = collection.get_playlists("Genres")[0]
+    playlist = next(
+        playlist
+        for playlist in playlists
+        if not playlist.is_folder() and playlist.get_tracks()
+    )
+    tracks = playlist.get_tracks()
+    track = next(iter(tracks.values()))
+    genre_tag = track.get_genre_tags()[0]
+    track.set_genre_tags(track.get_genre_tags() + [genre_tag])
+    statistics = TagStatistics(playlist)
+    assert statistics.statistics[0]["genre"][genre_tag] == sum(
+        genre_tag in _track.get_genre_tags() for _track in tracks.values()
+    )
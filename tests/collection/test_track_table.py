@@ -0,0 +1,111 @@
+"""Testing for the track_table module."""
+
+from datetime import datetime
+from unittest import mock
+
+import pytest
+
+from djtools.collection.rekordbox_collection import RekordboxCollection
+from djtools.collection.track_table import TrackTable
+
+
+def test_tracktable(rekordbox_collection):
+    """Test TrackTable class."""
+    tracks = rekordbox_collection.get_tracks()
+    table = TrackTable(tracks)
+    assert len(table) == len(tracks)
+    assert table.ids.tolist() == list(tracks)
+    for row, track in enumerate(tracks.values()):
+        assert table.bpm[row] == track.get_bpm()
+        assert table.rating[row] == track.get_rating()
+        assert table.year[row] == int(track.get_year())
+        assert (
+            table.date_added[row]
+            == (track.get_date_added() - datetime(1970, 1, 1)).days
+        )
+        assert table.play_count[row] == track.get_play_count()
+        assert table.bit_rate[row] == track.get_bit_rate()
+        assert table.total_time[row] == track.get_total_time()
+        assert table.get_track_tags(row) == track.get_tags()
+    assert table.tags == sorted(
+        {tag for track in tracks.values() for tag in track.get_tags()}
+    )
+    assert table.tag_indptr[-1] == len(table.tag_indices)
+
+
+def test_tracktable_get_rows(rekordbox_collection):
+    """Test TrackTable class."""
+    tracks = rekordbox_collection.get_tracks()
+    table = TrackTable(tracks)
+    track_ids = list(tracks)[::-1]
+    assert table.ids[table.get_rows(track_ids)].tolist() == track_ids
+
+
+def test_tracktable_get_tag_counts(rekordbox_collection):
+    """Test TrackTable class."""
+    tracks = rekordbox_collection.get_tracks()
+    table = TrackTable(tracks)
+    expected = {}
+    for track in tracks.values():
+        for tag in track.get_tags():
+            expected[tag] = expected.get(tag, 0) + 1
+    assert table.get_tag_counts() == expected
+
+
+@pytest.mark.parametrize("tag", ["Techno", "Dark", "nonexistent tag"])
+def test_tracktable_get_tag_mask(tag, rekordbox_collection):
+    """Test TrackTable class."""
+    tracks = rekordbox_collection.get_tracks()
+    table = TrackTable(tracks)
+    mask = table.get_tag_mask(tag)
+    assert mask.dtype == bool
+    assert table.get_tracks(mask) == {
+        track_id: track
+        for track_id, track in tracks.items()
+        if tag in track.get_tags()
+    }
+
+
+def test_tracktable_missing_numpy(rekordbox_collection):
+    """Test TrackTable class."""
+    with mock.patch("djtools.collection.track_table.np", None):
+        with pytest.raises(RuntimeError, match="NumPy is required"):
+            TrackTable(rekordbox_collection.get_tracks())
+
+
+def test_tracktable_of_no_tracks():
+    """Test TrackTable class."""
+    table = TrackTable({})
+    assert not len(table)  # pylint: disable=use-implicit-booleaness-not-len
+    assert table.tags == []
+    assert table.tag_indptr.tolist() == [0]
+    assert not table.get_tag_mask("Techno").any()
+
+
+def test_collection_to_table(rekordbox_xml):
+    """Test Collection.to_table method."""
+    collection = RekordboxCollection(rekordbox_xml)
+    table = collection.to_table()
+    assert table.ids.tolist() == list(collection.get_tracks())
+
+    # The table is cached until the tracks of the collection are modified.
+    assert collection.to_table() is table
+    tracks = dict(list(collection.get_tracks().items())[:1])
+    collection.set_tracks(tracks)
+    table = collection.to_table()
+    assert table.ids.tolist() == list(tracks)
+    assert collection.to_table() is table
+
+    # Replacing the tracks with as many tracks or modifying a track with a
+    # setter also invalidates the table.
+    tracks = dict(
+        list(RekordboxCollection(rekordbox_xml).get_tracks().items())[1:2]
+    )
+    collection.set_tracks(tracks)
+    table = collection.to_table()
+    assert table.ids.tolist() == list(tracks)
+    track = next(iter(tracks.values()))
+    track.set_genre_tags(["Dubstep"])
+    table = collection.to_table()
+    assert table.get_track_tags(0)[0] == "Dubstep"
+    assert collection.to_table() is table
@@ -80,7 +80,8 @@ def test_parse_sync_command(
         assert "--dryrun" in cmd
 
 
-def test_rewrite_track_paths(config, rekordbox_xml):
+@pytest.mark.parametrize("snapshot", [True, False])
+def test_rewrite_track_paths(snapshot, config, rekordbox_xml):
     """Test for the rewrite_track_paths function."""
     user_a_path = Path("/Volumes/first_user_usb/")
     user_b_path = Path("/Volumes/other_user_usb/")
@@ -89,6 +90,9 @@ def test_rewrite_track_paths(config, rekordbox_xml):
         Path(rekordbox_xml).read_text(encoding="utf-8"), encoding="utf-8"
     )
     config.sync.usb_path = user_a_path
+    config.collection.collection_snapshot = snapshot
+    snapshot_path = user_b_xml.with_name(f"{user_b_xml.name}.snapshot")
+    snapshot_path.unlink(missing_ok=True)
 
     # Write the second user's usb_path into each track.
     collection = RekordboxCollection(user_b_xml)
@@ -101,6 +105,7 @@ def test_rewrite_track_paths(config, rekordbox_xml):
 
     # Replaces all instances of user_b_path in user_b_xml with user_a_path.
     rewrite_track_paths(config, user_b_xml)
+    assert snapshot_path.exists() == snapshot
 
     # Assert user_a_path no longer appears and user_b_path is in every track.
     collection = RekordboxCollection(user_b_xml)
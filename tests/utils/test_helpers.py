@@ -289,6 +289,23 @@ def test_make_path_decorator(kwargs, expected_str_kwarg, expected_path_kwarg):
     foo("a string arg", "a string arg path", **kwargs)
 
 
+def test_make_path_decorator_matches_kwargs_by_name():
+    """Test for the make_path decorator function."""
+
+    @make_path
+    def foo(  # pylint: disable=disallowed-name
+        path_arg: Path,
+        path_kwarg: Optional[Path] = None,
+        int_kwarg: int = 0,
+    ):
+        assert isinstance(path_arg, Path)
+        assert isinstance(path_kwarg, Path)
+        assert isinstance(int_kwarg, int)
+
+    foo("a string arg path", int_kwarg=1, path_kwarg="a string kwarg path")
+    foo(path_arg="a string arg path", path_kwarg="a string kwarg path")
+
+
 @pytest.mark.parametrize(
     "arg, kwarg, expected",
     [